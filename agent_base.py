@@ -11,4 +11,9 @@ class Agent:
 
     async def run(self, input, context):
         # Default: subclasses should override
-        raise NotImplementedError("Subclasses must implement run()") 
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement run()")
+
+    async def generate(self, prompt, system=None, stream=False, max_output_tokens=1024):
+        # Model calls go through the shared LLM client (pooled connections, rate limits, retries)
+        from llm_client import complete
+        return await complete(prompt, system=system, stream=stream, max_output_tokens=max_output_tokens)
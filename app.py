@@ -1,10 +1,15 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from workflow_orchestrator import HealthWellnessWorkflow
+from checkin_scheduler import session_dispatcher
+from metrics import start_metrics_export
+from session_manager import SessionManager
+from utils.async_runner import get_background_loop, iterate_async, run_async
 import streamlit as st
-import asyncio
 import json
+import logging
+import os
+import secrets
 
 # Configure page
 st.set_page_config(
@@ -65,9 +70,29 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_checkin_inbox():
+    """Check-in messages delivered to each uid, kept until that user's page shows them."""
+    return {}
+
+@st.cache_resource
+def get_session_manager():
+    """One session manager per server process; agents and tools are shared by all users."""
+    # Stage banners cost I/O on every request; enable them with LOG_LEVEL=INFO
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'WARNING'), format='%(message)s')
+    start_metrics_export()
+    manager = SessionManager()
+    # Send due check-ins from the shared background loop, next to the sessions' own turns
+    inbox = get_checkin_inbox()
+    dispatcher = session_dispatcher(manager, lambda uid, response: inbox.setdefault(uid, []).append(response['response']))
+    get_background_loop().submit(dispatcher.run())
+    return manager
+
+sessions = get_session_manager()
+
 # Initialize session state
-if "workflow" not in st.session_state:
-    st.session_state.workflow = HealthWellnessWorkflow()
+if "uid" not in st.session_state:
+    st.session_state.uid = secrets.randbits(63)
 
 if "current_step" not in st.session_state:
     st.session_state.current_step = 1
@@ -94,6 +119,10 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+# Check-ins delivered since the page was last shown
+for checkin_message in get_checkin_inbox().pop(st.session_state.uid, []):
+    st.info(f"📅 {checkin_message}")
+
 # Progress bar
 progress_percentage = min((st.session_state.current_step - 1) * 25, 100)
 st.markdown(f"""
@@ -105,27 +134,34 @@ st.markdown(f"""
 </p>
 """, unsafe_allow_html=True)
 
-async def process_workflow_step(user_input, step):
-    """Process a single step in the workflow"""
+async def process_workflow_step(uid, user_input, step):
+    """Process a single step in the workflow.
+    
+    Runs on the shared background event loop, so it must not touch st.session_state.
+    """
     try:
         if step == 1:
-            response = await st.session_state.workflow.process_input(user_input)
+            response = await sessions.process_input(uid, user_input)
         elif step == 2:
             # If we're in goal collection stage
-            if st.session_state.workflow.current_stage == 'goal_collection':
-                response = await st.session_state.workflow.process_input(user_input)
+            if sessions.get_stage(uid) == 'goal_collection':
+                response = await sessions.process_input(uid, user_input)
             else:
                 # Skip goal collection if goal was already detected
-                response = await st.session_state.workflow.process_input(user_input)
+                response = await sessions.process_input(uid, user_input)
         elif step == 3:
-            response = await st.session_state.workflow.process_input(user_input)
-        elif step == 4:
-            response = await st.session_state.workflow.process_input("generate plans")
+            response = await sessions.process_input(uid, user_input)
         
         return response
     except Exception as e:
         return {"error": str(e)}
 
+PLAN_TITLES = {'meal_plan': "### 🍽️ Your Meal Plan", 'workout_plan': "### 🏋️ Your Workout Plan"}
+
+def render_plan_days(plan, days):
+    """Render the plan days received so far as markdown"""
+    return "\n\n".join([PLAN_TITLES[plan]] + [f"**Day {i}:** {day}" for i, day in enumerate(days, 1)])
+
 # Step 1: Initial Health Information
 if st.session_state.current_step == 1:
     st.markdown('<div class="step-container">', unsafe_allow_html=True)
@@ -149,20 +185,15 @@ if st.session_state.current_step == 1:
                 
                 # Process with workflow
                 with st.spinner("Processing your information..."):
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        response = loop.run_until_complete(process_workflow_step(initial_input, 1))
-                        st.session_state.step_responses[1] = response
-                        
-                        # Move to next appropriate step
-                        if st.session_state.workflow.current_stage == 'goal_collection':
-                            st.session_state.current_step = 2
-                        else:
-                            st.session_state.current_step = 3
-                        st.rerun()
-                    finally:
-                        loop.close()
+                    response = run_async(process_workflow_step(st.session_state.uid, initial_input, 1))
+                    st.session_state.step_responses[1] = response
+                    
+                    # Move to next appropriate step
+                    if sessions.get_stage(st.session_state.uid) == 'goal_collection':
+                        st.session_state.current_step = 2
+                    else:
+                        st.session_state.current_step = 3
+                    st.rerun()
             else:
                 st.error("Please enter your health information before proceeding.")
     
@@ -196,15 +227,10 @@ elif st.session_state.current_step == 2:
                 
                 # Process with workflow
                 with st.spinner("Analyzing your goals..."):
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        response = loop.run_until_complete(process_workflow_step(goals_input, 2))
-                        st.session_state.step_responses[2] = response
-                        st.session_state.current_step = 3
-                        st.rerun()
-                    finally:
-                        loop.close()
+                    response = run_async(process_workflow_step(st.session_state.uid, goals_input, 2))
+                    st.session_state.step_responses[2] = response
+                    st.session_state.current_step = 3
+                    st.rerun()
             else:
                 st.error("Please enter your goals before proceeding.")
     
@@ -241,15 +267,10 @@ elif st.session_state.current_step == 3:
                 
                 # Process with workflow
                 with st.spinner("Setting up your profile..."):
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        response = loop.run_until_complete(process_workflow_step(profile_input, 3))
-                        st.session_state.step_responses[3] = response
-                        st.session_state.current_step = 4
-                        st.rerun()
-                    finally:
-                        loop.close()
+                    response = run_async(process_workflow_step(st.session_state.uid, profile_input, 3))
+                    st.session_state.step_responses[3] = response
+                    st.session_state.current_step = 4
+                    st.rerun()
             else:
                 st.error("Please enter your profile information before proceeding.")
     
@@ -269,17 +290,26 @@ elif st.session_state.current_step == 4:
             st.rerun()
     
     with col2:
-        if st.button("Generate Plans 🚀", type="primary"):
-            # Generate final plans
-            with st.spinner("Generating your personalized plans... This may take a moment."):
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    response = loop.run_until_complete(process_workflow_step("", 4))
-                    st.session_state.final_response = response
-                    st.rerun()
-                finally:
-                    loop.close()
+        generate_clicked = st.button("Generate Plans 🚀", type="primary")
+    
+    if generate_clicked:
+        # Stream the plans into the page, rendering each day as soon as it is generated
+        status = st.empty()
+        live_boxes = {'meal_plan': st.empty(), 'workout_plan': st.empty()}
+        live_days = {'meal_plan': [], 'workout_plan': []}
+        status.info("⏳ Generating your personalized plans...")
+        response = None
+        try:
+            for chunk in iterate_async(sessions.process_input_stream(st.session_state.uid, "generate plans")):
+                if chunk['type'] == 'plan_day':
+                    live_days[chunk['plan']].append(chunk['text'])
+                    live_boxes[chunk['plan']].markdown(render_plan_days(chunk['plan'], live_days[chunk['plan']]))
+                elif chunk['type'] == 'result':
+                    response = chunk['response']
+        except Exception as e:
+            response = {"error": str(e)}
+        st.session_state.final_response = response
+        st.rerun()
     
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -317,7 +347,7 @@ if st.session_state.final_response:
     
     # Reset button
     if st.button("Start Over", type="secondary"):
-        st.session_state.workflow = HealthWellnessWorkflow()
+        sessions.reset(st.session_state.uid)
         st.session_state.current_step = 1
         st.session_state.user_inputs = {"initial": "", "goals": "", "profile": ""}
         st.session_state.final_response = None
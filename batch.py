@@ -0,0 +1,251 @@
+"""
+Offline batch mode: run intake profiles through the workflow in bulk.
+
+Reads a JSONL file of intake records such as
+    
+    {"id": "emp-001", "initial": "I want to get fit", "goals": "lose 5kg in 2 months", "profile": "beginner, vegetarian"}
+
+and runs each one through the same stages as the Streamlit wizard: initial
+message, goals, profile, then plan generation. Results are appended to the
+output JSONL as each session finishes. The input is read one line at a time,
+so only the records currently in flight are held in memory.
+
+Usage:
+    python batch.py intake.jsonl results.jsonl [--concurrency 8] [--checkpoint results.jsonl.ckpt]
+
+Re-running the same command after an interruption skips the records the
+checkpoint marks as finished and appends the rest to the output.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+from metrics import start_metrics_export
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+
+RESULT_FIELDS = ('goal', 'user_profile', 'diet_preferences', 'meal_plan', 'workout_plan', 'pending_plans')
+
+
+class BatchCheckpoint:
+    """
+    Records which input lines are finished so an interrupted batch can resume.
+    
+    Sessions finish out of order, so the checkpoint is a watermark (every line
+    below it is finished) plus the finished lines above it. The file is
+    replaced atomically after every finished record.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.watermark = 0
+        self.done: Set[int] = set()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.watermark = data['watermark']
+            self.done = set(data['done'])
+    
+    def is_done(self, line_no: int) -> bool:
+        return line_no < self.watermark or line_no in self.done
+    
+    def mark_done(self, line_no: int):
+        self.done.add(line_no)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+        self.save()
+    
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'watermark': self.watermark, 'done': sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+
+class ThroughputReport:
+    """
+    Counts finished sessions and reports throughput in sessions per minute.
+    """
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+    
+    @property
+    def finished(self) -> int:
+        return self.succeeded + self.failed
+    
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'elapsed_seconds': round(elapsed, 3),
+            'sessions_per_minute': round(self.finished / elapsed * 60, 1) if elapsed > 0 else 0.0
+        }
+    
+    def __str__(self):
+        report = self.as_dict()
+        return (
+            f"📊 {report['succeeded']} succeeded, {report['failed']} failed, {report['skipped']} skipped "
+            f"in {report['elapsed_seconds']:.1f}s ({report['sessions_per_minute']} sessions/min)"
+        )
+
+
+def read_records(path: str, checkpoint: BatchCheckpoint) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (line number, line) for each unfinished, non-blank input line.
+    """
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f):
+            if checkpoint.is_done(line_no):
+                continue
+            line = line.strip()
+            if not line:
+                checkpoint.mark_done(line_no)
+                continue
+            yield line_no, line
+
+
+def record_uid(record: Dict[str, Any], line_no: int, keep_sessions: bool) -> int:
+    """
+    Session uid for a record: its uid, else (for sessions that are kept) a
+    stable hash of its id, else its line number. Kept sessions outlive the
+    batch, so a line number would continue the session of whichever
+    record had that line in an earlier batch.
+    """
+    if record.get('uid') is not None:
+        return int(record['uid'])
+    if not keep_sessions:
+        return line_no
+    if record.get('id') is None:
+        raise ValueError("records need a uid or id when sessions are kept")
+    digest = hashlib.blake2b(f"batch:{record['id']}".encode('utf-8'), digest_size=8).digest()
+    # Positive and within SQLite's signed 64-bit INTEGER
+    return int.from_bytes(digest, 'big') >> 1
+
+
+async def run_record(manager: SessionManager, uid: int, record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one intake record through the workflow stages and collect the resulting plans.
+    """
+    await manager.process_input(uid, record['initial'])
+    if manager.get_stage(uid) == 'goal_collection' and record.get('goals'):
+        await manager.process_input(uid, record['goals'])
+    if manager.get_stage(uid) == 'profile_setup' and record.get('profile'):
+        await manager.process_input(uid, record['profile'])
+    if manager.get_stage(uid) == 'plan_generation':
+        await manager.process_input(uid, "generate plans")
+    
+    snapshot = manager.get_context(uid).snapshot()
+    result = {field: snapshot[field] for field in RESULT_FIELDS}
+    result['stage'] = manager.get_stage(uid)
+    return result
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    manager: Optional[SessionManager] = None,
+    concurrency: int = 8,
+    checkpoint_path: Optional[str] = None,
+    keep_sessions: bool = False,
+    report_every: int = 100
+) -> ThroughputReport:
+    """
+    Process every unfinished record in input_path, at most concurrency at a time.
+    
+    Each output line holds the record's input line number and id (and the
+    session uid when sessions are kept), the final stage, the collected plans, and an error message if the record failed.
+    Sessions use the record's uid; see record_uid for records without one.
+    """
+    manager = manager if manager is not None else SessionManager(store=InMemorySessionStore())
+    checkpoint = BatchCheckpoint(checkpoint_path)
+    report = ThroughputReport()
+    report.skipped = checkpoint.watermark + len(checkpoint.done)
+    
+    async def process(line_no: int, line: str, output) -> None:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {'line': line_no}
+        uid = None
+        try:
+            record = json.loads(line)
+            result['id'] = record.get('id')
+            uid = record_uid(record, line_no, keep_sessions)
+            if keep_sessions:
+                result['uid'] = uid
+            result.update(await run_record(manager, uid, record))
+            report.succeeded += 1
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+            report.failed += 1
+        finally:
+            # Keep only in-flight sessions in memory
+            if uid is not None and keep_sessions:
+                manager.release(uid)
+            elif uid is not None:
+                manager.reset(uid)
+        result['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+        checkpoint.mark_done(line_no)
+        if report_every and report.finished % report_every == 0:
+            print(report, file=sys.stderr, flush=True)
+    
+    with open(output_path, 'a', encoding='utf-8') as output:
+        in_flight: Set[asyncio.Task] = set()
+        for line_no, line in read_records(input_path, checkpoint):
+            if len(in_flight) >= concurrency:
+                _, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.add(asyncio.create_task(process(line_no, line, output)))
+        if in_flight:
+            await asyncio.wait(in_flight)
+    
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run intake profiles through the Health & Wellness workflow in bulk")
+    parser.add_argument('input', help="JSONL file of {id, initial, goals, profile} records")
+    parser.add_argument('output', help="JSONL file results are appended to")
+    parser.add_argument('--concurrency', type=int, default=8, help="sessions processed at once (default 8)")
+    parser.add_argument('--checkpoint', help="checkpoint file for resuming (default: <output>.ckpt)")
+    parser.add_argument('--keep-sessions', action='store_true',
+                        help="persist each session to SESSION_DB_PATH so users can continue later "
+                             "(records then need a uid or id)")
+    args = parser.parse_args(argv)
+    
+    # Per-stage banners would cost I/O for every record, so they are off unless LOG_LEVEL=INFO
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'WARNING'), format='%(message)s')
+    start_metrics_export()
+    
+    manager = SessionManager() if args.keep_sessions else SessionManager(store=InMemorySessionStore())
+    print(f"🚀 Processing {args.input} with concurrency {args.concurrency}...")
+    report = asyncio.run(run_batch(
+        args.input,
+        args.output,
+        manager=manager,
+        concurrency=args.concurrency,
+        checkpoint_path=args.checkpoint or args.output + '.ckpt',
+        keep_sessions=args.keep_sessions
+    ))
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark for the check-in scheduler at scale.
+
+Schedules a million check-ins (a mix of daily, weekly and one-off) spread
+over the next week, then times finding the next due check-in and claiming
+batches of due ones, which should not depend on how many are scheduled.
+
+Usage:
+    python -m benchmarks.checkin_scheduler [--checkins 1000000] [--batch 100]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from checkin_scheduler import CheckinStore
+
+DAY = 86400.0
+INTERVALS = (0.0, DAY, 7 * DAY)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check-in scheduling at scale")
+    parser.add_argument('--checkins', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--claims', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        store = CheckinStore(os.path.join(directory, 'checkins.db'))
+        start = time.perf_counter()
+        chunk = 100_000
+        for offset in range(0, args.checkins, chunk):
+            store.add_many([
+                (uid, now + rng.uniform(0, 7 * DAY), rng.choice(INTERVALS), "Time for your wellness check-in!")
+                for uid in range(offset, min(offset + chunk, args.checkins))
+            ])
+        print(f"scheduled {store.count():,} check-ins in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            store.next_due()
+        print(f"{'next_due()':<22} {(time.perf_counter() - start) * 1000:>8.3f} us")
+
+        # Claim batches as a dispatcher would while the day's check-ins fall due
+        claimed, latencies = 0, []
+        for step in range(1, args.claims + 1):
+            start = time.perf_counter()
+            claimed += len(store.claim_due(now + step * 60, args.batch))
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"{'claim_due() batch':<22} {sum(latencies) / len(latencies) * 1000:>8.3f} ms mean, "
+              f"{latencies[int(len(latencies) * 0.95)] * 1000:.3f} ms p95 ({claimed:,} claimed, batch {args.batch})")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
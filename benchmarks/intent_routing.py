@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for the intent router.
+
+Builds routers with a growing number of synthetic routes and measures the
+cost of routing a typical message. Compiled routing should stay flat as the
+table grows; the per-route keyword scan it replaced grows linearly.
+
+Usage:
+    python -m benchmarks.intent_routing
+"""
+import timeit
+
+from intent_router import ROUTES, IntentRouter
+
+ROUTE_COUNTS = (4, 50, 200, 800)
+MESSAGES = [
+    "My knee hurts a bit after yesterday's squats, should I skip today?",
+    "Can you suggest a high protein meal for dinner tonight?",
+    "I walked 8000 steps today and feel great about my progress so far",
+]
+NUMBER = 2000
+
+
+def _synthetic_routes(count: int):
+    routes = [dict(route) for route in ROUTES]
+    for i in range(len(routes), count):
+        routes.append({
+            'intent': f'intent_{i}',
+            'stages': ('real_time_delivery',),
+            'agent': f'agent_{i}',
+            'terms': {f'term{i}a': 1.0, f'term{i}b': 1.0, f'term{i}c': 0.5, f'phrase {i} words': 2.0}
+        })
+    return routes
+
+
+def _keyword_scan(routes, text):
+    # The previous approach: lower-case and scan each route's keywords in turn
+    for route in routes:
+        if any(term in text.lower() for term in route['terms']):
+            return route['intent']
+    return None
+
+
+def main():
+    print(f"{'routes':>8} {'compiled µs':>12} {'scan µs':>10}")
+    compiled_costs = []
+    for count in ROUTE_COUNTS:
+        routes = _synthetic_routes(count)
+        router = IntentRouter(routes)
+        router.route(MESSAGES[0], 'real_time_delivery')  # build the stage table
+        
+        compiled = timeit.timeit(
+            lambda: [router.route(m, 'real_time_delivery') for m in MESSAGES], number=NUMBER
+        ) / (NUMBER * len(MESSAGES)) * 1e6
+        scan = timeit.timeit(
+            lambda: [_keyword_scan(routes, m) for m in MESSAGES], number=NUMBER // 10
+        ) / (NUMBER // 10 * len(MESSAGES)) * 1e6
+        compiled_costs.append(compiled)
+        print(f"{count:>8} {compiled:>12.2f} {scan:>10.2f}")
+    
+    growth = compiled_costs[-1] / compiled_costs[0]
+    print(f"compiled routing cost growth from {ROUTE_COUNTS[0]} to {ROUTE_COUNTS[-1]} routes: {growth:.2f}x")
+    assert growth < 2.0, "routing cost should not grow with the number of routes"
+
+
+if __name__ == "__main__":
+    main()
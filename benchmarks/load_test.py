@@ -0,0 +1,146 @@
+"""
+Load test: many concurrent simulated sessions against the fake LLM backend.
+
+Agents and tools are minimal implementations that call the model through
+Agent.generate()/Tool.generate(), with LLM_BACKEND=fake so no network or API
+quota is used. Every session runs the four-step onboarding concurrently on
+one SessionManager; the report shows throughput, onboarding latency
+percentiles, failures and peak memory.
+
+Usage:
+    python -m benchmarks.load_test [--sessions 10000] [--latency lognormal:0.8:0.4]
+        [--spike-rate 0.01] [--spike-seconds 5] [--error-rate 0.001] [--seed 1]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from types import SimpleNamespace
+
+from agent_base import Agent
+from goal_extractor import GoalExtractor
+from intent_router import IntentRouter
+from llm_client import get_llm_client
+from prompt_builder import PromptBuilder
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+from speculation import PlanSpeculator
+from stage_machine import BackgroundStages
+from tool_base import Tool
+
+ONBOARDING = (
+    "i am fat",
+    "I want to lose 10 lbs in 3 months",
+    "I am a beginner, no dietary restrictions",
+    "generate plans"
+)
+
+
+class SimAgent(Agent):
+    async def run(self, input, context):
+        return await self.generate(f"User: {input}", system=self.description)
+
+
+class SimGoalTool(Tool):
+    async def run(self, input, context):
+        return {'goals': json.loads(await self.generate(f"Extract the goal as JSON: {input}"))}
+
+
+class SimPlanTool(Tool):
+    async def run(self, input, context):
+        text = await self.generate(input, stream=True)
+        return [line for line in text.splitlines() if line.strip()]
+
+
+class SimTool(Tool):
+    async def run(self, input, context):
+        return await self.generate(f"{self.description}: {input}")
+
+
+def sim_components(speculate: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(
+        main_agent=SimAgent("WellnessPlanner", "Health and wellness coach"),
+        specialized_agents={
+            name: SimAgent(name, f"{name.replace('_', ' ')} specialist")
+            for name in ('injury_support', 'nutrition_expert', 'escalation')
+        },
+        tools={
+            'goal_analyzer': SimGoalTool("GoalAnalyzer", "Extract goals"),
+            'meal_planner': SimPlanTool("MealPlanner", "Create meal plans"),
+            'workout_recommender': SimPlanTool("WorkoutRecommender", "Create workout plans"),
+            'progress_tracker': SimTool("ProgressTracker", "Track progress"),
+            'checkin_scheduler': SimTool("CheckinScheduler", "Schedule check-ins")
+        },
+        tool_cache=None,
+        intent_router=IntentRouter(),
+        prompt_builder=PromptBuilder(),
+        goal_extractor=GoalExtractor(),
+        speculator=PlanSpeculator(enabled=speculate),
+        background_stages=BackgroundStages()
+    )
+
+
+async def run_load(sessions: int):
+    manager = SessionManager(components=sim_components(), store=InMemorySessionStore())
+    latencies, failures = [], 0
+
+    async def onboard(uid: int):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            for user_input in ONBOARDING:
+                await manager.process_input(uid, user_input)
+        except Exception:
+            failures += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(onboard(uid) for uid in range(sessions)))
+    elapsed = time.perf_counter() - start
+    return manager, sorted(latencies), failures, elapsed, get_llm_client().stats()
+
+
+def _percentile(values, q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent simulated sessions on the fake LLM backend")
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--latency', default='lognormal:0.8:0.4', help="fake LLM latency distribution")
+    parser.add_argument('--spike-rate', type=float, default=0.01)
+    parser.add_argument('--spike-seconds', type=float, default=5.0)
+    parser.add_argument('--error-rate', type=float, default=0.001)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    os.environ.update({
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_LATENCY': args.latency,
+        'FAKE_LLM_SPIKE_RATE': str(args.spike_rate),
+        'FAKE_LLM_SPIKE_SECONDS': str(args.spike_seconds),
+        'FAKE_LLM_ERROR_RATE': str(args.error_rate),
+        'FAKE_LLM_SEED': str(args.seed)
+    })
+    # Injected failures would otherwise log a warning per failed plan
+    logging.getLogger('workflow_orchestrator').setLevel(logging.ERROR)
+    manager, latencies, failures, elapsed, llm_stats = asyncio.run(run_load(args.sessions))
+    completed = sum(1 for uid in range(args.sessions) if manager.get_stage(uid) == 'real_time_delivery')
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"sessions:             {args.sessions} ({completed} onboarded, {failures} failed)")
+    print(f"fake LLM:             {args.latency}, spikes {args.spike_rate:.1%} x {args.spike_seconds:.0f}s, errors {args.error_rate:.1%}")
+    print(f"wall time:            {elapsed:.1f} s ({args.sessions / elapsed:,.0f} sessions/s)")
+    print(f"onboarding latency:   p50 {_percentile(latencies, 0.5):.2f} s, p95 {_percentile(latencies, 0.95):.2f} s, p99 {_percentile(latencies, 0.99):.2f} s")
+    print(f"LLM calls:            {llm_stats['requests']} ({llm_stats['failures']} failed, {llm_stats['spikes']} spikes, peak {llm_stats['max_in_flight']} in flight)")
+    print(f"goal fast path:       {manager.components.goal_extractor.stats()['hit_rate']:.0%} of goal-collection turns")
+    print(f"peak memory (RSS):    {peak_rss_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
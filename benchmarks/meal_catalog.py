@@ -0,0 +1,58 @@
+"""
+Benchmark for catalog meal plan assembly.
+
+Assembles 7-day meal plans for users with varied goals and dietary
+constraints, as CatalogMealPlannerTool does in place of a model call, and
+reports the time per plan.
+
+Usage:
+    python -m benchmarks.meal_catalog [--plans 500]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from meal_catalog import MealCatalog, nutrition_targets, parse_dietary
+
+DIETS = (
+    "", "vegetarian", "vegan", "pescatarian, no dairy", "no nuts or peanuts",
+    "gluten-free", "vegetarian, lactose intolerant", "allergic to shellfish and eggs", "low carb"
+)
+GOALS = (
+    {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'},
+    {'quantity': 5, 'metric': 'kg', 'duration': '8 weeks', 'goal_type': 'gain'},
+    {'goal_type': 'maintain'}
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catalog meal plan assembly latency")
+    parser.add_argument('--plans', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    start = time.perf_counter()
+    catalog = MealCatalog()
+    print(f"catalog of {len(catalog.meals)} meals built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    timings, failed = [], 0
+    for seed in range(args.plans):
+        dietary = parse_dietary(rng.choice(DIETS))
+        targets = nutrition_targets(rng.choice(GOALS))
+        start = time.perf_counter()
+        try:
+            catalog.assemble_week(dietary, targets, seed=seed)
+        except ValueError:
+            failed += 1
+            continue
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    print(f"{len(timings)} plans ({failed} left to the model)")
+    print(f"mean {statistics.mean(timings) * 1000:.2f} ms  p50 {timings[len(timings) // 2] * 1000:.2f} ms  "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
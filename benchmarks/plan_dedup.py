@@ -0,0 +1,104 @@
+"""
+Memory benchmark for plan deduplication.
+
+Builds meal and workout plans for many users with the local catalog and
+exercise library, then measures with tracemalloc how much memory each session
+holding its plans takes, with a separate copy of every plan per session
+(PLAN_DEDUP=0) and with plans interned in the shared plan store. Users with
+similar goals and constraints share most plan days, so the shared footprint
+per session keeps shrinking as sessions are added.
+
+Usage:
+    python -m benchmarks.plan_dedup [--sessions 4000]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from context import UserSessionContext
+from meal_catalog import MealCatalog, nutrition_targets, parse_dietary
+from plan_store import get_plan_store
+from workout_library import WorkoutLibrary, settings_for
+
+DIETS = (
+    "", "vegetarian", "vegan", "pescatarian, no dairy", "no nuts or peanuts",
+    "gluten-free", "vegetarian, lactose intolerant", "low carb"
+)
+PROFILES = (
+    "Beginner, no equipment", "Intermediate, home gym with dumbbells",
+    "Advanced, full gym access", "Beginner, resistance bands"
+)
+GOALS = (
+    {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'},
+    {'quantity': 5, 'metric': 'kg', 'duration': '8 weeks', 'goal_type': 'gain'},
+    {'goal_type': 'maintain'}
+)
+
+
+def build_plans(sessions: int):
+    """
+    Plan text for each user, kept as UTF-8 bytes so every session gets fresh strings, as if
+    each plan had just been generated.
+    """
+    rng = random.Random(1)
+    catalog, library = MealCatalog(), WorkoutLibrary()
+    plans = []
+    for uid in range(sessions):
+        context = UserSessionContext(uid=uid, goal=rng.choice(GOALS), user_profile=rng.choice(PROFILES))
+        try:
+            meal_plan = catalog.assemble_week(parse_dietary(rng.choice(DIETS)), nutrition_targets(context.goal), seed=uid)
+        except ValueError:
+            meal_plan = []
+        workout_plan = library.weekly_plan(settings_for(context))
+        plans.append(([day.encode() for day in meal_plan], [day.encode() for day in workout_plan]))
+    return plans
+
+
+def per_session_bytes(plans, shared: bool, checkpoints, with_plans: bool = True):
+    store = get_plan_store()
+    store.enabled = shared
+    contexts = []
+    results = {}
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for uid, (meal_plan, workout_plan) in enumerate(plans, 1):
+        context = UserSessionContext(uid=uid)
+        if with_plans:
+            context.meal_plan = [day.decode() for day in meal_plan] or None
+            context.workout_plan = [day.decode() for day in workout_plan]
+        contexts.append(context)
+        if uid in checkpoints:
+            results[uid] = (tracemalloc.get_traced_memory()[0] - before) / uid
+    tracemalloc.stop()
+    stats = store.stats()
+    del contexts
+    return results, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-session memory with and without plan deduplication")
+    parser.add_argument('--sessions', type=int, default=4000)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    plans = build_plans(args.sessions)
+    print(f"built plans for {args.sessions} users in {time.perf_counter() - start:.1f} s")
+    checkpoints = sorted({max(args.sessions // 16, 1), args.sessions // 4, args.sessions})
+
+    # Sessions without plans, to report what the plans themselves add per session
+    empty, _ = per_session_bytes(plans, shared=False, checkpoints=checkpoints, with_plans=False)
+    copies, _ = per_session_bytes(plans, shared=False, checkpoints=checkpoints)
+    shared, stats = per_session_bytes(plans, shared=True, checkpoints=checkpoints)
+
+    print("plan memory per session:")
+    print(f"{'sessions':>10} {'copies':>12} {'shared':>12} {'saved':>7}")
+    for count in checkpoints:
+        copied, interned = copies[count] - empty[count], shared[count] - empty[count]
+        print(f"{count:>10,} {copied / 1024:>9.2f} KB {interned / 1024:>9.2f} KB {1 - interned / copied:>7.0%}")
+    print(f"plan store: {stats['plans']:,} plans, {stats['days']:,} unique days, "
+          f"{stats['stored_chars'] / max(stats['plan_chars'], 1):.0%} of the plan text kept")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark for concurrent plan generation.
+
+Mocks the meal planner and workout recommender with fixed latencies and
+checks that handle_plan_generation takes about as long as the slower tool,
+not the sum of both.
+
+Usage:
+    python -m benchmarks.plan_generation
+"""
+import asyncio
+import contextlib
+import io
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from workflow_orchestrator import HealthWellnessWorkflow
+
+MEAL_LATENCY = 0.30
+WORKOUT_LATENCY = 0.50
+ROUNDS = 5
+
+
+def _slow_tool(latency: float, result):
+    async def run(input, context):
+        await asyncio.sleep(latency)
+        return result
+    return AsyncMock(side_effect=run)
+
+
+async def _time_plan_generation(meal_latency: float, workout_latency: float) -> float:
+    workflow = HealthWellnessWorkflow()
+    workflow.tools['meal_planner'] = SimpleNamespace(run=_slow_tool(meal_latency, ['meal day'] * 7))
+    workflow.tools['workout_recommender'] = SimpleNamespace(run=_slow_tool(workout_latency, ['workout day'] * 7))
+    workflow.context.goal = {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+    
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await workflow.handle_plan_generation()
+    return time.perf_counter() - start
+
+
+async def main():
+    timings = [await _time_plan_generation(MEAL_LATENCY, WORKOUT_LATENCY) for _ in range(ROUNDS)]
+    wall = min(timings)
+    sequential = MEAL_LATENCY + WORKOUT_LATENCY
+    slowest = max(MEAL_LATENCY, WORKOUT_LATENCY)
+    
+    print(f"meal planner latency:       {MEAL_LATENCY * 1000:.0f} ms")
+    print(f"workout recommender latency: {WORKOUT_LATENCY * 1000:.0f} ms")
+    print(f"sequential (sum):           {sequential * 1000:.0f} ms")
+    print(f"concurrent (measured):      {wall * 1000:.0f} ms over {ROUNDS} rounds (best)")
+    
+    # Allow some scheduling overhead, but wall time must track the slower tool
+    assert wall < slowest + 0.1, f"plan generation took {wall:.3f}s, expected ~{slowest:.3f}s"
+    print("✅ wall time is the max of the two latencies, not the sum")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Benchmark for the progress analytics engine.
+
+Builds synthetic progress stores (two months of weight and step logs with
+missed days) and compares analyzing each user in turn with one batch call
+over all of them, as a coach dashboard would.
+
+Usage:
+    python -m benchmarks.progress_analytics [--users 10000]
+"""
+import argparse
+import random
+import time
+
+from progress_analytics import analyze, analyze_many
+from progress_store import DAY_SECONDS, ProgressStore
+
+NOW = 1_700_000_000.0
+DAYS = 60
+
+
+def build_stores(users: int, seed: int = 1):
+    rng = random.Random(seed)
+    stores, goals = {}, {}
+    for uid in range(users):
+        store = ProgressStore()
+        start, rate = rng.uniform(150, 250), rng.uniform(-0.3, 0.1)
+        for day in range(DAYS):
+            timestamp = NOW - (DAYS - 1 - day) * DAY_SECONDS
+            if rng.random() < 0.8:
+                store.append('lbs', start + rate * day + rng.gauss(0, 0.5), timestamp=timestamp)
+            if rng.random() < 0.5:
+                store.append('steps', rng.gauss(8000, 1500), timestamp=timestamp + 3600)
+        stores[uid] = store
+        goals[uid] = {'quantity': 10, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+    return stores, goals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-user vs batch progress analytics")
+    parser.add_argument('--users', type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    stores, goals = build_stores(args.users)
+    points = sum(len(store) for store in stores.values())
+    print(f"{args.users} users, {points:,} measurements")
+
+    start = time.perf_counter()
+    for uid, store in stores.items():
+        analyze(store, goals[uid], now=NOW)
+    per_user = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyze_many(stores, goals, now=NOW)
+    batch = time.perf_counter() - start
+
+    print(f"{'per-user analyze()':<24} {per_user * 1000:>9.0f} ms  ({per_user / args.users * 1e6:.0f} us/user)")
+    print(f"{'analyze_many()':<24} {batch * 1000:>9.0f} ms  ({batch / args.users * 1e6:.0f} us/user)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark for delta responses.
+
+Simulates a long session (plans generated once, then many real-time turns)
+and compares the serialized response size and encode time of 'full' versus
+'delta' response modes.
+
+Usage:
+    python -m benchmarks.response_size
+"""
+import asyncio
+import contextlib
+import io
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from workflow_orchestrator import HealthWellnessWorkflow
+
+TURNS = 500
+PLAN_DAY = "Breakfast: Oatmeal with berries and nuts, Lunch: Grilled chicken salad, Dinner: Baked salmon with vegetables. " * 4
+
+
+async def _run_session(response_mode: str):
+    workflow = HealthWellnessWorkflow(response_mode=response_mode)
+    workflow.main_agent = SimpleNamespace(run=AsyncMock(return_value="Keep going!"))
+    workflow.tools['meal_planner'] = SimpleNamespace(run=AsyncMock(return_value=[PLAN_DAY] * 7))
+    workflow.tools['workout_recommender'] = SimpleNamespace(run=AsyncMock(return_value=[PLAN_DAY] * 7))
+    workflow.context.goal = {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+    workflow.context.handoff_logs = [f"handoff {i}" for i in range(200)]
+    workflow.context.progress_logs = [{'date': f"day {i}", 'weight': '180'} for i in range(365)]
+    workflow.current_stage = 'plan_generation'
+    
+    total_bytes = 0
+    encode_time = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        await workflow.process_input("generate plans")
+        for _ in range(TURNS):
+            response = await workflow.process_input("how am I doing today?")
+            start = time.perf_counter()
+            total_bytes += len(json.dumps(response, default=str))
+            encode_time += time.perf_counter() - start
+    return total_bytes, encode_time
+
+
+async def main():
+    full_bytes, full_time = await _run_session('full')
+    delta_bytes, delta_time = await _run_session('delta')
+    
+    print(f"{TURNS} real-time turns after plan generation")
+    print(f"full:  {full_bytes / TURNS:10.0f} bytes/turn  {full_time / TURNS * 1e6:8.1f} µs encode/turn")
+    print(f"delta: {delta_bytes / TURNS:10.0f} bytes/turn  {delta_time / TURNS * 1e6:8.1f} µs encode/turn")
+    print(f"size reduction: {full_bytes / delta_bytes:.0f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
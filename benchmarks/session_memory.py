@@ -0,0 +1,60 @@
+"""
+Load test for SessionManager memory use.
+
+Creates a large number of sessions on one manager and measures, with
+tracemalloc, how much memory each extra session adds, its plans included.
+Agents, tools and plan text are shared, so the growth should stay at a few KB
+per session.
+
+Usage:
+    python -m benchmarks.session_memory [sessions]
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmarks.suite import plans_for
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+
+SESSIONS = 20000
+BUDGET_BYTES_PER_SESSION = 8 * 1024
+
+
+def main(sessions: int = SESSIONS):
+    manager = SessionManager(store=InMemorySessionStore())
+    
+    # Warm up so one-off allocations do not count against each session
+    for uid in range(100):
+        manager.get_context(uid)
+    
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for uid in range(100, 100 + sessions):
+        context = manager.get_context(uid)
+        context.goal = {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+        context.user_profile = "Beginner, works from home, 30 minutes a day, no dietary restrictions"
+        context.meal_plan, context.workout_plan = plans_for(uid)
+    elapsed = time.perf_counter() - start
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    per_session = (after - before) / sessions
+    stats = manager.stats()
+    print(f"sessions:                   {len(manager)}")
+    print(f"memory growth per session:  {per_session / 1024:.2f} KB (tracemalloc)")
+    print(f"reported session size:      {stats['avg_session_bytes'] / 1024:.2f} KB (deep sizeof, plans excluded)")
+    print(f"plan store share:           {stats['avg_plan_bytes'] / 1024:.2f} KB/session "
+          f"({stats['plan_store_bytes'] / 1024:.0f} KB shared)")
+    print(f"creation cost:              {stats['avg_creation_us']:.1f} µs/session")
+    print(f"create + populate:          {elapsed / sessions * 1e6:.1f} µs/session")
+    
+    assert per_session < BUDGET_BYTES_PER_SESSION, (
+        f"{per_session:.0f} bytes per session exceeds budget of {BUDGET_BYTES_PER_SESSION}"
+    )
+    print("✅ per-session memory within budget")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SESSIONS)
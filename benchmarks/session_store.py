@@ -0,0 +1,105 @@
+"""
+Benchmark for SQLiteSessionStore as it grows.
+
+Fills a fresh database with realistic sessions in steps up to hundreds of
+thousands of users, and at each size measures:
+
+- restore: loading a random user's session on their first request
+- turn write: persisting one turn's changes (a new meal plan and stage)
+- full write: re-serializing the whole session, for comparison
+
+Usage:
+    python -m benchmarks.session_store [max_users]
+"""
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from context import UserSessionContext
+from session_store import SQLiteSessionStore
+
+SIZES = (1_000, 10_000, 100_000, 300_000)
+SAMPLES = 500
+
+
+def _sample_context(uid: int) -> UserSessionContext:
+    context = UserSessionContext(uid=uid, name=f"user{uid}")
+    context.goal = {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+    context.user_profile = "Beginner, works from home, 30 minutes a day, no dietary restrictions"
+    context.diet_preferences = "vegetarian"
+    context.meal_plan = [f"Day {day}: oatmeal, lentil salad, vegetable curry with rice" for day in range(1, 8)]
+    context.workout_plan = [f"Day {day}: 30 min brisk walk, bodyweight circuit" for day in range(1, 8)]
+    context.progress_logs = [{'text': 'walked 8000 steps', 'timestamp': f"2026-01-{i + 1:02d}T08:00:00"} for i in range(10)]
+    return context
+
+
+def _fill(path: str, start: int, stop: int, template: dict):
+    """
+    Bulk-insert sessions directly, which is much faster than saving them one by one.
+    """
+    encoded = {field: json.dumps(value, separators=(',', ':')) for field, value in template.items()}
+    encoded['_current_stage'] = json.dumps('real_time_delivery')
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO session_fields (uid, field, value) VALUES (?, ?, ?)",
+            ((uid, field, value if field != 'uid' else str(uid))
+             for uid in range(start, stop) for field, value in encoded.items())
+        )
+    conn.close()
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.99)] * 1e6)
+
+
+def main(max_users: int = SIZES[-1]):
+    sizes = [size for size in SIZES if size < max_users] + [max_users]
+    rng = random.Random(0)
+    template = _sample_context(0).snapshot()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sessions.db')
+        store = SQLiteSessionStore(path)
+        filled = 0
+        print(f"{'users':>8}  {'restore p50/p99':>18}  {'turn write p50/p99':>20}  {'full write p50/p99':>20}")
+        for size in sizes:
+            _fill(path, filled, size, template)
+            filled = size
+
+            restore, turn, full = [], [], []
+            for _ in range(SAMPLES):
+                uid = rng.randrange(size)
+
+                start = time.perf_counter()
+                context, stage = store.load(uid)
+                restore.append(time.perf_counter() - start)
+
+                version = context.version
+                context.meal_plan = [f"Day {day}: new plan {rng.random()}" for day in range(1, 8)]
+                start = time.perf_counter()
+                store.save_changes(uid, context, 'real_time_delivery', version, stage_changed=False)
+                turn.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                store.save(uid, context, stage)
+                full.append(time.perf_counter() - start)
+
+            print(
+                f"{size:>8}  "
+                f"{'%.0f / %.0f µs' % _percentiles(restore):>18}  "
+                f"{'%.0f / %.0f µs' % _percentiles(turn):>20}  "
+                f"{'%.0f / %.0f µs' % _percentiles(full):>20}"
+            )
+
+        store.close()
+        print(f"database size: {os.path.getsize(path) / 1024 / 1024:.1f} MB for {filled} users")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1])
@@ -0,0 +1,66 @@
+"""
+Benchmark for speculative plan prefetch.
+
+Simulated users go through onboarding on the fake LLM backend, pausing to
+type between turns as a real user would. With speculation on, plan drafts
+start as soon as the goal is known and restart when the profile arrives, so
+the "generate plans" turn only waits for whatever is still running. The
+report compares that turn's latency with speculation off and on.
+
+Usage:
+    python -m benchmarks.speculation [--sessions 200] [--think-seconds 3] [--latency lognormal:2:0.3]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+from benchmarks.load_test import ONBOARDING, sim_components
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+
+
+async def run_sessions(sessions: int, think_seconds: float, speculate: bool, seed: int):
+    manager = SessionManager(components=sim_components(speculate), store=InMemorySessionStore())
+    rng = random.Random(seed)
+    plan_turns = []
+
+    async def onboard(uid: int, think: list):
+        for user_input, pause in zip(ONBOARDING, think):
+            await asyncio.sleep(pause)
+            start = time.perf_counter()
+            await manager.process_input(uid, user_input)
+            if user_input == "generate plans":
+                plan_turns.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(
+        onboard(uid, [rng.uniform(0.5, 1.5) * think_seconds for _ in ONBOARDING]) for uid in range(sessions)
+    ))
+    return sorted(plan_turns), manager.components.speculator.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan generation latency with and without speculative drafts")
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--think-seconds', type=float, default=3.0, help="mean pause before each user turn")
+    parser.add_argument('--latency', default='lognormal:2:0.3', help="fake LLM latency distribution")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    os.environ.update({'LLM_BACKEND': 'fake', 'FAKE_LLM_LATENCY': args.latency, 'FAKE_LLM_SEED': str(args.seed)})
+    logging.getLogger('workflow_orchestrator').setLevel(logging.ERROR)
+
+    for speculate in (False, True):
+        turns, stats = asyncio.run(run_sessions(args.sessions, args.think_seconds, speculate, args.seed))
+        label = 'speculative' if speculate else 'on demand'
+        line = (f"{label:<12} 'generate plans' turn: p50 {turns[len(turns) // 2]:.2f} s, "
+                f"p95 {turns[int(len(turns) * 0.95)]:.2f} s")
+        if speculate:
+            line += f"  (drafts used {stats['hit_rate']:.0%}, {stats['restarted']} restarted, {stats['stale']} stale)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
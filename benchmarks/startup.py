@@ -0,0 +1,176 @@
+"""
+Startup-time budget check for the CLI and the Streamlit app.
+
+Measures, in fresh interpreters:
+- import time of the workflow modules (via python -X importtime)
+- time for `python main.py` to print its banner and exit on 'quit'
+- time for a Streamlit server to answer its health check (if streamlit is installed)
+
+Results are compared against STARTUP_BUDGET_MS and can be written to a
+markdown report with --write-report.
+
+Usage:
+    python -m benchmarks.startup [--write-report benchmarks/startup_report.md]
+"""
+import argparse
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+# Budgets in milliseconds, measured as the best of RUNS cold interpreter starts
+STARTUP_BUDGET_MS = {
+    'python (empty interpreter)': None,
+    'import workflow_orchestrator': 400,
+    'import session_manager': 400,
+    'python main.py (banner, then quit)': 600,
+    'streamlit server ready': 5000
+}
+
+
+def _run(args, stdin=None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        args, cwd=ROOT, input=stdin, capture_output=True, text=True
+    )
+
+
+def _best_wall_ms(args, stdin=None) -> float:
+    best = float('inf')
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = _run(args, stdin)
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+        best = min(best, elapsed)
+    return best
+
+
+def import_profile(module: str, top: int = 10):
+    """
+    Return (total ms, [(cumulative ms, module name)]) for importing a module.
+    """
+    best_total, best_rows = float('inf'), []
+    for _ in range(RUNS):
+        result = _run([sys.executable, '-X', 'importtime', '-c', f'import {module}'])
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative_us, name = line[len('import time:'):].split('|')
+            rows.append((int(cumulative_us) / 1000, name))
+        total = next((ms for ms, name in rows if name.strip() == module), 0.0)
+        if total < best_total:
+            best_total, best_rows = total, rows
+    best_rows.sort(reverse=True)
+    return best_total, best_rows[:top]
+
+
+def streamlit_ready_ms():
+    """
+    Time until a cold Streamlit server answers its health check, or None if streamlit is not installed.
+    """
+    if _run([sys.executable, '-c', 'import streamlit']).returncode != 0:
+        return None
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', 'app.py', '--server.headless', 'true',
+         '--server.port', str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < 60:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.05)
+        return None
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def measure():
+    results = {
+        'python (empty interpreter)': _best_wall_ms([sys.executable, '-c', 'pass']),
+        'import workflow_orchestrator': import_profile('workflow_orchestrator')[0],
+        'import session_manager': import_profile('session_manager')[0],
+        'python main.py (banner, then quit)': _best_wall_ms([sys.executable, 'main.py'], stdin='quit\n'),
+        'streamlit server ready': streamlit_ready_ms()
+    }
+    return results
+
+
+def render_report(results, top_imports) -> str:
+    lines = [
+        "# Startup Time Report",
+        "",
+        "Generated by `python -m benchmarks.startup --write-report benchmarks/startup_report.md`.",
+        f"Best of {RUNS} cold interpreter starts on Python {platform.python_version()} ({platform.system()} {platform.machine()}).",
+        "Times vary with the machine and its load, often by a third between runs on a busy host:",
+        "rerun the command for current numbers. The budgets, not these figures, are what the check enforces.",
+        "",
+        "| Measurement | Measured (ms) | Budget (ms) | Status |",
+        "|---|---:|---:|---|"
+    ]
+    for name, budget in STARTUP_BUDGET_MS.items():
+        measured = results.get(name)
+        if measured is None:
+            lines.append(f"| {name} | not measured | {budget or '-'} | skipped |")
+            continue
+        status = 'ok' if budget is None or measured <= budget else 'OVER BUDGET'
+        lines.append(f"| {name} | {measured:.0f} | {budget or '-'} | {status} |")
+    if any(results.get(name) is None for name in STARTUP_BUDGET_MS):
+        lines += ["", "Skipped rows could not be measured where this report was generated (e.g. streamlit not installed)."]
+    lines += [
+        "",
+        "## Slowest imports for `workflow_orchestrator` (cumulative ms)",
+        "",
+        "| Module | Cumulative (ms) |",
+        "|---|---:|"
+    ]
+    lines += [f"| `{name.strip()}` | {ms:.1f} |" for ms, name in top_imports]
+    lines += [
+        "",
+        "Agents, tools and their LLM SDK clients are not imported at startup; they load on first use",
+        "through `utils.lazy.LazyRegistry`, so they do not appear above.",
+        ""
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--write-report', metavar='PATH', help='write a markdown report to PATH')
+    args = parser.parse_args()
+    
+    results = measure()
+    _, top_imports = import_profile('workflow_orchestrator')
+    report = render_report(results, top_imports)
+    print(report)
+    if args.write_report:
+        with open(args.write_report, 'w', encoding='utf-8') as f:
+            f.write(report)
+    
+    over = [
+        name for name, budget in STARTUP_BUDGET_MS.items()
+        if budget is not None and results.get(name) is not None and results[name] > budget
+    ]
+    if over:
+        print(f"❌ over startup budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark for streamed plan generation.
+
+Mocks the plan tools with a fake model that emits one token every
+TOKEN_DELAY seconds, then compares time-to-first-token and time to the first
+complete plan day against the time a non-streaming caller waits for the
+whole response.
+
+Usage:
+    python -m benchmarks.streaming
+"""
+import asyncio
+import contextlib
+import io
+import time
+from types import SimpleNamespace
+
+from utils.streaming import emit_text, measure_stream
+from workflow_orchestrator import HealthWellnessWorkflow
+
+TOKEN_DELAY = 0.005
+TOKENS_PER_DAY = 30
+
+
+def _fake_model_tool(label: str):
+    async def run(input, context):
+        days = []
+        for day in range(1, 8):
+            text = f"Day {day}\n" + ' '.join(f"{label}{i}" for i in range(TOKENS_PER_DAY))
+            for token in text.split(' '):
+                emit_text(token + ' ')
+                await asyncio.sleep(TOKEN_DELAY)
+            emit_text('\n')
+            days.append(text)
+        return days
+    return SimpleNamespace(run=run)
+
+
+def _workflow() -> HealthWellnessWorkflow:
+    workflow = HealthWellnessWorkflow()
+    workflow.tools['meal_planner'] = _fake_model_tool('meal')
+    workflow.tools['workout_recommender'] = _fake_model_tool('set')
+    workflow.context.goal = {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+    workflow.current_stage = 'plan_generation'
+    return workflow
+
+
+async def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        await _workflow().process_input("generate plans")
+        blocking = time.perf_counter() - start
+        timings, chunks = await measure_stream(_workflow().process_input_stream("generate plans"))
+    
+    days = sum(1 for chunk in chunks if chunk['type'] == 'plan_day')
+    print(f"blocking process_input:        {blocking * 1000:7.0f} ms until anything is shown")
+    print(f"streamed time to first token:  {timings['time_to_first_token'] * 1000:7.0f} ms")
+    print(f"streamed time to first day:    {timings['time_to_first_plan_day'] * 1000:7.0f} ms")
+    print(f"streamed total:                {timings['total'] * 1000:7.0f} ms ({days} plan days)")
+    assert timings['time_to_first_token'] < blocking / 10
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,311 @@
+"""
+Orchestrator benchmark suite with regression gates.
+
+Agents and tools are replaced with AsyncMocks (as in test_mock_workflow.py),
+optionally sleeping for a fake LLM latency, and three things are measured:
+
+- process_input throughput for each workflow stage (calls/s, no LLM latency)
+- end-to-end latency of the four-step onboarding (initial message, goals,
+  profile, plan generation) with the configured fake LLM latency
+- memory per session, plans included, as the number of sessions on one SessionManager grows
+
+Results are compared with a JSON baseline; any metric worse than the
+baseline by more than the threshold fails the run with exit status 1.
+Baselines are machine specific, so regenerate one with --update-baseline
+when moving to new hardware.
+
+Usage:
+    python -m benchmarks.suite                      # compare with benchmarks/baseline.json
+    python -m benchmarks.suite --update-baseline --repeat 3   # record a new baseline, best of 3 runs
+    python -m benchmarks.suite --llm-latency 0.2 --threshold 0.3 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from unittest.mock import AsyncMock
+
+from goal_extractor import GoalExtractor
+from intent_router import IntentRouter
+from prompt_builder import PromptBuilder
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+from speculation import PlanSpeculator
+from stage_machine import BackgroundStages
+from workflow_orchestrator import HealthWellnessWorkflow
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# One representative input per stage
+STAGE_INPUTS = {
+    'user_starts_chat': "i am fat",
+    'goal_collection': "I want to lose 10 lbs in 2 months",
+    'profile_setup': "Beginner, works from home, no dietary restrictions",
+    'plan_generation': "generate plans",
+    'real_time_delivery': "What should I eat for dinner tonight?",
+    'progress_tracking': "Weighed 180 lbs today and walked 8000 steps",
+    'specialized_help': "I need to talk to a human coach",
+    'ongoing_support': "Please schedule a weekly check-in"
+}
+
+ONBOARDING = (
+    "i am fat",
+    "I want to lose weight",
+    "I am a beginner, no dietary restrictions",
+    "generate plans"
+)
+
+SESSION_COUNTS = (1000, 5000, 20000)
+ROUNDS = 5
+WARMUP_SECONDS = 2.0
+
+
+def _mock(result, latency: float) -> AsyncMock:
+    async def run(input, context):
+        if latency:
+            await asyncio.sleep(latency)
+        return result
+    return AsyncMock(side_effect=run)
+
+
+def mock_components(latency: float = 0.0) -> SimpleNamespace:
+    """
+    Shared workflow components whose agents and tools answer after latency seconds.
+    """
+    agent = SimpleNamespace(run=_mock("Mock agent response", latency))
+    return SimpleNamespace(
+        main_agent=agent,
+        specialized_agents={
+            name: SimpleNamespace(run=_mock(f"Mock {name} response", latency))
+            for name in ('injury_support', 'nutrition_expert', 'escalation')
+        },
+        tools={
+            'goal_analyzer': SimpleNamespace(run=_mock({'goals': {'goal_type': 'weight loss', 'metric': 'weight'}}, latency)),
+            'meal_planner': SimpleNamespace(run=_mock([f"Day {day}: meals" for day in range(1, 8)], latency)),
+            'workout_recommender': SimpleNamespace(run=_mock([f"Day {day}: workout" for day in range(1, 8)], latency)),
+            'progress_tracker': SimpleNamespace(run=_mock("Progress recorded", latency)),
+            'checkin_scheduler': SimpleNamespace(run=_mock("Weekly on Monday", latency))
+        },
+        tool_cache=None,
+        intent_router=IntentRouter(),
+        prompt_builder=PromptBuilder(),
+        goal_extractor=GoalExtractor(),
+        speculator=PlanSpeculator(enabled=False),
+        background_stages=BackgroundStages()
+    )
+
+
+async def stage_throughput(iterations: int) -> Dict[str, float]:
+    """
+    process_input calls per second for each stage, with no LLM latency.
+    
+    Stages are timed round-robin for ROUNDS rounds and the best round is
+    kept, so a burst of machine noise does not land on a single stage. Warm-up
+    rounds run first for WARMUP_SECONDS, since an idle CPU starts out slow.
+    """
+    components = mock_components()
+    workflows = {stage: HealthWellnessWorkflow(components=components) for stage in STAGE_INPUTS}
+    
+    async def timed_round() -> Dict[str, float]:
+        timings = {}
+        for stage, user_input in STAGE_INPUTS.items():
+            workflow = workflows[stage]
+            goal = None if stage == 'user_starts_chat' else {'goal_type': 'weight loss'}
+            start = time.perf_counter()
+            for _ in range(iterations):
+                workflow.current_stage = stage
+                workflow.context.goal = goal
+                await workflow.process_input(user_input)
+            timings[stage] = time.perf_counter() - start
+        return timings
+    
+    warmup_until = time.perf_counter() + WARMUP_SECONDS
+    while time.perf_counter() < warmup_until:
+        await timed_round()
+    
+    best: Dict[str, float] = {}
+    for _ in range(ROUNDS):
+        for stage, elapsed in (await timed_round()).items():
+            best[stage] = min(best.get(stage, elapsed), elapsed)
+    return {stage: iterations / elapsed for stage, elapsed in best.items()}
+
+
+async def onboarding_latency(runs: int, latency: float) -> Dict[str, float]:
+    """
+    Wall time of the four-step onboarding for a new session, in seconds.
+    """
+    manager = SessionManager(components=mock_components(latency), store=InMemorySessionStore())
+    timings = []
+    for uid in range(runs):
+        start = time.perf_counter()
+        for user_input in ONBOARDING:
+            await manager.process_input(uid, user_input)
+        timings.append(time.perf_counter() - start)
+        assert manager.get_stage(uid) == 'real_time_delivery'
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    }
+
+
+def plans_for(uid: int):
+    """
+    A meal and a workout plan drawn from a few variants per day, so sessions share
+    some plans and days through the plan store, as users with similar inputs do.
+    """
+    meal = [f"Day {day}: Breakfast: oats with berries. Lunch: lentil salad {(uid + day) % 5}. Dinner: salmon and greens {uid % 4}"
+            for day in range(1, 8)]
+    workout = [f"Day {day}: 3x12 squats, 3x10 push-ups, 20 min walk, variant {(uid * day) % 6}" for day in range(1, 8)]
+    return meal, workout
+
+
+def memory_per_session(sessions: int) -> float:
+    """
+    Bytes of memory each populated session adds to a SessionManager, including
+    what its plans add to the shared plan store.
+    """
+    manager = SessionManager(components=mock_components(), store=InMemorySessionStore())
+    for uid in range(100):
+        manager.get_context(-uid - 1)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for uid in range(sessions):
+        context = manager.get_context(uid)
+        context.goal = {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+        context.user_profile = "Beginner, works from home, 30 minutes a day, no dietary restrictions"
+        context.meal_plan, context.workout_plan = plans_for(uid)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / sessions
+
+
+def run_suite(iterations: int, runs: int, latency: float, session_counts=SESSION_COUNTS) -> Dict[str, Dict[str, Any]]:
+    """
+    Run every benchmark. Each metric records its value, unit and whether
+    higher or lower is better.
+    """
+    metrics: Dict[str, Dict[str, Any]] = {}
+    for stage, rate in asyncio.run(stage_throughput(iterations)).items():
+        metrics[f'throughput.{stage}'] = {'value': rate, 'unit': 'calls/s', 'better': 'higher'}
+    for name, value in asyncio.run(onboarding_latency(runs, latency)).items():
+        metrics[f'onboarding.{name}'] = {'value': value, 'unit': 's', 'better': 'lower'}
+    for count in session_counts:
+        metrics[f'memory.per_session.{count}'] = {'value': memory_per_session(count), 'unit': 'bytes', 'better': 'lower'}
+    return metrics
+
+
+def best_of(reports: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Merge several suite runs, keeping each metric's best value. This is the
+    statistic stage_throughput already applies to its rounds, so a baseline
+    recorded this way is what a quiet run of the same tree can reach.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for metrics in reports:
+        for name, metric in metrics.items():
+            kept = merged.get(name)
+            pick = max if metric['better'] == 'higher' else min
+            if kept is None or pick(kept['value'], metric['value']) != kept['value']:
+                merged[name] = metric
+    return merged
+
+
+def compare(metrics: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float):
+    """
+    Return (rows, regressions) comparing each metric with its baseline value.
+    """
+    rows, regressions = [], []
+    for name, metric in metrics.items():
+        base = baseline.get(name)
+        if base is None or not base['value']:
+            rows.append((name, metric, None, None, 'new'))
+            continue
+        change = (metric['value'] - base['value']) / base['value']
+        worse = -change if metric['better'] == 'higher' else change
+        status = 'REGRESSION' if worse > threshold else 'ok'
+        if status == 'REGRESSION':
+            regressions.append(name)
+        rows.append((name, metric, base['value'], change, status))
+    return rows, regressions
+
+
+def _format(value: float, unit: str) -> str:
+    if unit == 's':
+        return f"{value * 1000:.1f} ms"
+    if unit == 'bytes':
+        return f"{value / 1024:.2f} KB"
+    return f"{value:,.0f} {unit}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Orchestrator benchmark suite with regression gates")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--update-baseline', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed relative regression (default 0.25)")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="fake LLM latency per call in seconds (default 0.05)")
+    parser.add_argument('--iterations', type=int, default=1000, help="process_input calls per stage and round (default 1000)")
+    parser.add_argument('--runs', type=int, default=20, help="onboarding runs (default 20)")
+    parser.add_argument('--repeat', type=int, help="run the suite this many times and keep each metric's best value "
+                                                   "(default: as many as the baseline was recorded with, else 1)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if not args.update_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    repeat = args.repeat or (baseline['environment'].get('repeat', 1) if baseline else 1)
+
+    metrics = best_of([run_suite(args.iterations, args.runs, args.llm_latency) for _ in range(max(repeat, 1))])
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': f"{platform.system()} {platform.machine()}",
+            'llm_latency': args.llm_latency,
+            'repeat': repeat
+        },
+        'metrics': metrics
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if baseline is None:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        for name, metric in metrics.items():
+            print(f"{name:<40} {_format(metric['value'], metric['unit']):>16}")
+        print(f"✅ Baseline written to {args.baseline}")
+        return 0
+
+    if baseline['environment'].get('llm_latency') != args.llm_latency:
+        print(f"⚠️ Baseline was recorded with --llm-latency {baseline['environment'].get('llm_latency')}")
+    if baseline['environment'].get('repeat', 1) != repeat:
+        print(f"⚠️ Baseline was recorded with --repeat {baseline['environment'].get('repeat', 1)}")
+
+    rows, regressions = compare(metrics, baseline['metrics'], args.threshold)
+    print(f"{'metric':<40} {'current':>16} {'baseline':>16} {'change':>8}  status")
+    for name, metric, base, change, status in rows:
+        base_text = _format(base, metric['unit']) if base is not None else '-'
+        change_text = f"{change:+.0%}" if change is not None else '-'
+        print(f"{name:<40} {_format(metric['value'], metric['unit']):>16} {base_text:>16} {change_text:>8}  {status}")
+
+    if regressions:
+        print(f"❌ {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
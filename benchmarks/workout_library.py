@@ -0,0 +1,51 @@
+"""
+Benchmark for the workout library.
+
+Builds weekly workout plans for users with varied goals, levels and equipment,
+then reports an injury for each and rebuilds only the affected days, as the
+workflow does when the injury support agent is consulted.
+
+Usage:
+    python -m benchmarks.workout_library [--users 1000]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from workout_library import adapt_plan, get_library, settings_for
+
+GOALS = ({'goal_type': 'lose'}, {'goal_type': 'gain'}, {'goal_type': 'maintain'})
+PROFILES = ("beginner, no equipment", "intermediate with dumbbells and bands", "advanced, I train at the gym")
+INJURIES = ("bad knee", "my lower back hurts", "sprained wrist", "sore shoulder", "twisted ankle")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Workout plan build and injury rebuild latency")
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    library = get_library()
+    contexts = [
+        SimpleNamespace(uid=uid, goal=rng.choice(GOALS), user_profile=rng.choice(PROFILES), injury_notes=None)
+        for uid in range(args.users)
+    ]
+
+    start = time.perf_counter()
+    plans = [library.weekly_plan(settings_for(context)) for context in contexts]
+    build = time.perf_counter() - start
+
+    for context in contexts:
+        context.injury_notes = rng.choice(INJURIES)
+    start = time.perf_counter()
+    rebuilt_days = sum(len(adapt_plan(plan, context)[1]) for plan, context in zip(plans, contexts))
+    rebuild = time.perf_counter() - start
+
+    print(f"{'weekly plan':<16} {build / args.users * 1000:>7.3f} ms/user")
+    print(f"{'injury rebuild':<16} {rebuild / args.users * 1000:>7.3f} ms/user  "
+          f"({rebuilt_days / args.users:.1f} of 7 days rebuilt on average)")
+
+
+if __name__ == "__main__":
+    main()
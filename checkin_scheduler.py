@@ -0,0 +1,503 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+from metrics import CHECKINS
+from tool_base import Tool
+
+logger = logging.getLogger(__name__)
+
+# Check-ins claimed and delivered per batch, and the longest the dispatcher sleeps between polls (seconds)
+DEFAULT_BATCH_SIZE = int(os.getenv('CHECKIN_BATCH_SIZE', '100'))
+DEFAULT_POLL_SECONDS = float(os.getenv('CHECKIN_POLL_SECONDS', '30'))
+
+DEFAULT_MESSAGE = "Time for your wellness check-in!"
+
+_UNIT_SECONDS = {'minute': 60.0, 'hour': 3600.0, 'day': 86400.0, 'week': 7 * 86400.0, 'month': 30 * 86400.0}
+_ADVERBS = {'hourly': 'hour', 'daily': 'day', 'nightly': 'day', 'weekly': 'week', 'monthly': 'month'}
+_WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+_PARTS_OF_DAY = {'morning': 9, 'noon': 12, 'afternoon': 14, 'evening': 18, 'night': 20}
+
+_EVERY = re.compile(r'\bevery\s+(?:(\d+|other)\s+)?(minute|hour|day|week|month)s?\b')
+_ADVERB = re.compile(r'\b(' + '|'.join(_ADVERBS) + r')\b')
+_WEEKDAY = re.compile(r'\b(?:every|on)\s+(' + '|'.join(_WEEKDAYS) + r')s?\b')
+_PART_OF_DAY = re.compile(r'\bevery\s+(' + '|'.join(_PARTS_OF_DAY) + r')\b')
+_IN = re.compile(r'\bin\s+(\d+|an?)\s+(minute|hour|day|week)s?\b')
+_TOMORROW = re.compile(r'\btomorrow\b')
+_CHECKINS = r"(?:check[- ]?ins?|reminders?)"
+# A cancel verb governing check-ins or reminders: "cancel my daily check-ins", "no more reminders", "reminders off"
+_CANCEL = re.compile(
+    r"\b(?:cancel|stop|end|remove|delete|disable|pause|turn off|unsubscribe from)\s+"
+    r"(?:(?:all|any|my|the|these|those|of|daily|weekly|monthly|scheduled|recurring)\s+){0,3}(?:" + _CHECKINS + r"|schedule)\b"
+    r"|\bno more\s+" + _CHECKINS + r"\b"
+    r"|\b(?:don't|do not) (?:schedule|send)(?: me)? (?:any\s+)?(?:more\s+)?" + _CHECKINS + r"\b"
+    r"|\b(?:don't|do not) (?:want|need) (?:any\s+)?(?:more\s+)?" + _CHECKINS + r"\b"
+    r"|\b" + _CHECKINS + r"\s+off\b"
+)
+# An explicit request to schedule, which wins over a cancel verb elsewhere in the message
+_SCHEDULE_REQUEST = re.compile(
+    r"(?<!n't )(?<!not )\b(?:schedule|set up|book|add)\s+(?:a|an|another|one|me|my|weekly|daily|monthly|regular)\b"
+    r"|(?<!n't )(?<!not )\bremind me\b"
+)
+# Occurrences of the same rule due within this many seconds of each other are treated as one check-in
+_SAME_TIME_SECONDS = 60.0
+_AT = re.compile(r'\bat\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\b|\b(?:in the\s+)?(morning|noon|afternoon|evening|night)\b')
+
+
+class Checkin(NamedTuple):
+    id: int
+    uid: int
+    due_ts: float
+    interval: float
+    message: str
+
+
+class CheckinRule(NamedTuple):
+    due_ts: float
+    # Seconds between occurrences; 0 for a one-off check-in
+    interval: float
+    description: str
+    # False for recurring check-ins that start one interval from now rather than at a set time
+    anchored: bool = True
+
+
+def _time_of_day(text: str) -> Optional[tuple]:
+    match = _AT.search(text)
+    if match is None:
+        return None
+    if match.group(4):
+        return _PARTS_OF_DAY[match.group(4)], 0
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if match.group(3) == 'pm' and hour < 12:
+        hour += 12
+    elif match.group(3) == 'am' and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _next_at(now: datetime, hour: int, minute: int, weekday: Optional[int] = None) -> datetime:
+    """
+    The first time after now at hour:minute, on the given weekday if any.
+    """
+    due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if weekday is not None:
+        due += timedelta(days=(weekday - due.weekday()) % 7)
+    if due <= now:
+        due += timedelta(days=7 if weekday is not None else 1)
+    return due
+
+
+def _format_interval(interval: float) -> str:
+    for unit in ('month', 'week', 'day', 'hour', 'minute'):
+        count = interval / _UNIT_SECONDS[unit]
+        if count >= 1 and count == int(count):
+            return f"every {unit}" if count == 1 else f"every {int(count)} {unit}s"
+    return f"every {interval:g} seconds"
+
+
+def parse_schedule(text: str, now: Optional[float] = None, default_interval: float = _UNIT_SECONDS['week']) -> CheckinRule:
+    """
+    Read when to check in from free text, in local time: recurring ("daily at 8am",
+    "every 3 days", "every Monday evening", "weekly") or one-off ("tomorrow at 9",
+    "in 2 hours"). Anything without a time or recurrence defaults to a recurring
+    check-in every default_interval seconds (a week), starting one interval from now.
+    Raises ValueError for recurrences less than one unit apart ("every 0 days").
+    """
+    now_dt = datetime.fromtimestamp(time.time() if now is None else now)
+    lowered = text.lower()
+    at = _time_of_day(lowered)
+
+    weekday = _WEEKDAY.search(lowered)
+    every = _EVERY.search(lowered)
+    adverb = _ADVERB.search(lowered)
+    part_of_day = _PART_OF_DAY.search(lowered)
+    anchored = True
+    if weekday:
+        hour, minute = at or (9, 0)
+        due = _next_at(now_dt, hour, minute, _WEEKDAYS.index(weekday.group(1)))
+        interval = _UNIT_SECONDS['week']
+        recurrence = f"every {weekday.group(1).capitalize()} at {hour:02d}:{minute:02d}"
+    elif every or adverb or part_of_day:
+        if every:
+            count = 2 if every.group(1) == 'other' else int(every.group(1) or 1)
+            if count < 1:
+                raise ValueError(f"check-ins need to be at least one {every.group(2)} apart")
+            interval = count * _UNIT_SECONDS[every.group(2)]
+        else:
+            interval = _UNIT_SECONDS[_ADVERBS[adverb.group(1)] if adverb else 'day']
+        if at is not None and interval >= _UNIT_SECONDS['day']:
+            due = _next_at(now_dt, *at)
+            recurrence = f"{_format_interval(interval)} at {at[0]:02d}:{at[1]:02d}"
+        else:
+            due = now_dt + timedelta(seconds=interval)
+            recurrence = _format_interval(interval)
+            anchored = False
+    else:
+        interval = 0.0
+        in_match = _IN.search(lowered)
+        if in_match:
+            count = 1 if in_match.group(1) in ('a', 'an') else int(in_match.group(1))
+            due = now_dt + timedelta(seconds=count * _UNIT_SECONDS[in_match.group(2)])
+        elif _TOMORROW.search(lowered):
+            hour, minute = at or (9, 0)
+            due = (now_dt + timedelta(days=1)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        elif at is not None:
+            due = _next_at(now_dt, *at)
+        else:
+            interval = default_interval
+            due = now_dt + timedelta(seconds=interval)
+            anchored = False
+        if not interval:
+            return CheckinRule(due.timestamp(), 0.0, f"once on {due.strftime('%a %d %b at %H:%M')}")
+        recurrence = _format_interval(interval)
+    description = f"{recurrence}, next on {due.strftime('%a %d %b at %H:%M')}"
+    return CheckinRule(due.timestamp(), interval, description, anchored)
+
+
+def is_cancel_request(text: str) -> bool:
+    """
+    Whether a check-in message asks to stop check-ins ("cancel my check-ins", "no more reminders").
+    Requests to schedule are never cancels, even when they mention stopping something else.
+    """
+    lowered = text.lower()
+    return _SCHEDULE_REQUEST.search(lowered) is None and _CANCEL.search(lowered) is not None
+
+
+def same_rule(checkin: Checkin, rule: CheckinRule) -> bool:
+    """
+    Whether a scheduled check-in already follows the rule: same recurrence, and
+    for rules with a set time, occurrences at the same point of each cycle.
+    """
+    if checkin.interval != rule.interval:
+        return False
+    if not rule.interval:
+        return abs(checkin.due_ts - rule.due_ts) <= _SAME_TIME_SECONDS
+    if not rule.anchored:
+        return True
+    offset = (checkin.due_ts - rule.due_ts) % rule.interval
+    return min(offset, rule.interval - offset) <= _SAME_TIME_SECONDS
+
+
+def next_occurrence(due_ts: float, interval: float, now: float) -> float:
+    """
+    The first occurrence of a recurring check-in after now. Occurrences missed
+    while nothing was dispatching are skipped rather than sent in a burst.
+    """
+    return due_ts + interval * (math.floor((now - due_ts) / interval) + 1)
+
+
+class CheckinStore:
+    """
+    Persisted schedule of check-ins for every user, in SQLite (WAL mode).
+
+    Rows are indexed by due time, so the next due time and each batch of due
+    check-ins are found with an index seek however many are scheduled.
+    claim_due() reads a batch and, in the same transaction, deletes its
+    one-off check-ins and moves recurring ones to their next occurrence, so a
+    claimed check-in is never claimed again: after a crash or restart a batch
+    is delivered at most once, and several dispatchers can share one database.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path if path is not None else default_store_path()
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[float], None]] = []
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkins ("
+            "id INTEGER PRIMARY KEY, uid INTEGER NOT NULL, due_ts REAL NOT NULL, "
+            "interval REAL NOT NULL DEFAULT 0, message TEXT NOT NULL, fired INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS checkins_due ON checkins (due_ts)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS checkins_uid ON checkins (uid)")
+
+    def add_listener(self, listener: Callable[[float], None]):
+        """
+        Call listener(due_ts) whenever a check-in is scheduled through this store.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[float], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def add(self, uid: int, due_ts: float, interval: float = 0.0, message: str = DEFAULT_MESSAGE) -> int:
+        if interval < 0:
+            raise ValueError("check-in interval must not be negative")
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO checkins (uid, due_ts, interval, message) VALUES (?, ?, ?, ?)",
+                (uid, due_ts, interval, message)
+            )
+        for listener in list(self._listeners):
+            listener(due_ts)
+        return cursor.lastrowid
+
+    def add_many(self, rows: List[tuple]):
+        """
+        Schedule (uid, due_ts, interval, message) rows in one transaction.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT INTO checkins (uid, due_ts, interval, message) VALUES (?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if rows:
+            earliest = min(row[1] for row in rows)
+            for listener in list(self._listeners):
+                listener(earliest)
+
+    def for_user(self, uid: int) -> List[Checkin]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, uid, due_ts, interval, message FROM checkins WHERE uid = ? ORDER BY due_ts", (uid,)
+            ).fetchall()
+        return [Checkin(*row) for row in rows]
+
+    def cancel(self, uid: int, checkin_id: Optional[int] = None) -> int:
+        """
+        Cancel one of a user's check-ins, or all of them. Returns the number cancelled.
+        """
+        with self._lock:
+            if checkin_id is None:
+                cursor = self._conn.execute("DELETE FROM checkins WHERE uid = ?", (uid,))
+            else:
+                cursor = self._conn.execute("DELETE FROM checkins WHERE uid = ? AND id = ?", (uid, checkin_id))
+        return cursor.rowcount
+
+    def next_due(self, uid: Optional[int] = None) -> Optional[float]:
+        """
+        When the next check-in is due, for every user or only for uid.
+        """
+        with self._lock:
+            if uid is None:
+                return self._conn.execute("SELECT MIN(due_ts) FROM checkins").fetchone()[0]
+            return self._conn.execute("SELECT MIN(due_ts) FROM checkins WHERE uid = ?", (uid,)).fetchone()[0]
+
+    def claim_due(self, now: float, limit: int = DEFAULT_BATCH_SIZE, uid: Optional[int] = None) -> List[Checkin]:
+        """
+        Claim up to limit check-ins due at or before now, earliest first: every
+        user's, or only uid's so other users' check-ins are left for their own dispatcher.
+        """
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so two dispatchers cannot claim the same rows
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if uid is None:
+                    rows = self._conn.execute(
+                        "SELECT id, uid, due_ts, interval, message FROM checkins WHERE due_ts <= ? ORDER BY due_ts LIMIT ?",
+                        (now, limit)
+                    ).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        "SELECT id, uid, due_ts, interval, message FROM checkins WHERE uid = ? AND due_ts <= ? "
+                        "ORDER BY due_ts LIMIT ?",
+                        (uid, now, limit)
+                    ).fetchall()
+                claimed = [Checkin(*row) for row in rows]
+                self._conn.executemany(
+                    "DELETE FROM checkins WHERE id = ?", [(c.id,) for c in claimed if not c.interval]
+                )
+                self._conn.executemany(
+                    "UPDATE checkins SET due_ts = ?, fired = fired + 1 WHERE id = ?",
+                    [(next_occurrence(c.due_ts, c.interval, now), c.id) for c in claimed if c.interval]
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM checkins").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store: Optional[CheckinStore] = None
+_default_store_lock = threading.Lock()
+
+
+def default_store_path() -> str:
+    return os.getenv('CHECKIN_DB_PATH', 'checkins.db')
+
+
+def has_default_store() -> bool:
+    """
+    Whether the default store is open in this process or exists on disk, i.e.
+    whether any check-ins can be due, without creating the database to find out.
+    """
+    return _default_store is not None or os.path.exists(default_store_path())
+
+
+def get_default_store() -> CheckinStore:
+    """
+    The process-wide check-in store at CHECKIN_DB_PATH, opened on first use.
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CheckinStore()
+        return _default_store
+
+
+class CheckinDispatcher:
+    """
+    Sends due check-ins through deliver(checkin) in batches.
+
+    run() claims up to batch_size due check-ins at a time and delivers each
+    batch concurrently, then sleeps until the next check-in is due (at most
+    poll_interval seconds, so check-ins scheduled by other processes are
+    picked up too). Scheduling through the same store wakes it early.
+    Delivery failures are logged and counted; a claimed check-in is not retried.
+    A dispatcher given a uid only claims and waits for that user's check-ins.
+    """
+
+    def __init__(
+        self,
+        store: CheckinStore,
+        deliver: Callable[[Checkin], Awaitable[Any]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        poll_interval: float = DEFAULT_POLL_SECONDS,
+        clock: Callable[[], float] = time.time,
+        uid: Optional[int] = None
+    ):
+        self.store = store
+        self.uid = uid
+        self.deliver = deliver
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped = False
+        self._stats = {'batches': 0, 'delivered': 0, 'failed': 0}
+
+    def _on_schedule(self, due_ts: float):
+        # May be called from any thread
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def dispatch_due(self, now: Optional[float] = None) -> int:
+        """
+        Deliver every check-in due at now, batch by batch. Returns the number delivered.
+        """
+        now = self.clock() if now is None else now
+        delivered = 0
+        while True:
+            batch = self.store.claim_due(now, self.batch_size, uid=self.uid)
+            if not batch:
+                break
+            self._stats['batches'] += 1
+            results = await asyncio.gather(*(self.deliver(checkin) for checkin in batch), return_exceptions=True)
+            for checkin, result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    self._stats['failed'] += 1
+                    CHECKINS.inc(event='failed')
+                    logger.warning("⚠️ Check-in %s for user %s failed: %s", checkin.id, checkin.uid, result)
+                else:
+                    delivered += 1
+                    CHECKINS.inc(event='delivered')
+            if len(batch) < self.batch_size:
+                break
+        self._stats['delivered'] += delivered
+        return delivered
+
+    async def run(self):
+        """
+        Dispatch check-ins until stop() is called. The dispatcher listens to
+        the store for new check-ins only while it runs.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopped = False
+        self.store.add_listener(self._on_schedule)
+        try:
+            while not self._stopped:
+                self._wake.clear()
+                await self.dispatch_due()
+                next_due = self.store.next_due(self.uid)
+                delay = self.poll_interval if next_due is None else min(max(next_due - self.clock(), 0.0), self.poll_interval)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.store.remove_listener(self._on_schedule)
+
+    def stop(self):
+        self._stopped = True
+        self.store.remove_listener(self._on_schedule)
+        self._on_schedule(0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+
+def session_dispatcher(manager, notify: Callable[[int, Dict[str, Any]], Any], store: Optional[CheckinStore] = None, **kwargs) -> CheckinDispatcher:
+    """
+    A dispatcher that delivers check-ins through a SessionManager's workflows and
+    passes each response to notify(uid, response), e.g. to push it to the user.
+    """
+    async def deliver(checkin: Checkin):
+        response = await manager.deliver_checkin(checkin.uid, checkin.message)
+        result = notify(checkin.uid, response)
+        if asyncio.iscoroutine(result):
+            await result
+
+    return CheckinDispatcher(store if store is not None else get_default_store(), deliver, **kwargs)
+
+
+class CheckinSchedulerTool(Tool):
+    """
+    Schedules check-ins from requests such as "remind me every Monday at 8am"
+    in the persisted check-in store; a CheckinDispatcher sends them when due.
+    Requests to stop ("cancel my check-ins") cancel all of the user's check-ins,
+    and a rule the user already has is not scheduled twice.
+    """
+
+    # Every call changes the schedule
+    cacheable = False
+
+    def __init__(self, store: Optional[CheckinStore] = None):
+        super().__init__("CheckinScheduler", "Schedule recurring progress check-ins")
+        self._store = store
+
+    @property
+    def store(self) -> CheckinStore:
+        return self._store if self._store is not None else get_default_store()
+
+    async def run(self, input, context):
+        if is_cancel_request(input):
+            cancelled = self.store.cancel(context.uid)
+            CHECKINS.inc(cancelled, event='cancelled')
+            if not cancelled:
+                return "You have no check-ins scheduled."
+            return f"Cancelled {cancelled} check-in{'s' if cancelled != 1 else ''}."
+        try:
+            rule = parse_schedule(input)
+        except ValueError as e:
+            return f"I couldn't schedule that: {e}."
+        existing = next((checkin for checkin in self.store.for_user(context.uid) if same_rule(checkin, rule)), None)
+        if existing is not None:
+            next_on = datetime.fromtimestamp(existing.due_ts).strftime('%a %d %b at %H:%M')
+            return f"You already have this check-in, next on {next_on}."
+        self.store.add(context.uid, rule.due_ts, rule.interval)
+        CHECKINS.inc(event='scheduled')
+        return f"Check-in scheduled: {rule.description}"
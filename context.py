@@ -1,5 +1,45 @@
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+import weakref
+from pydantic import BaseModel, PrivateAttr, field_serializer
+from typing import Any, ClassVar, Optional, List, Dict, Tuple
+from plan_store import get_plan_store, plain
+from progress_store import ProgressStore
+
+
+def _tracking(base: type, mutators: Tuple[str, ...]) -> type:
+    """
+    Build a subclass of list or dict whose mutating methods mark the field
+    holding it as changed on its context. Copies and pickles are plain.
+    """
+    def wrap(method):
+        def mutate(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            owner = self._owner()
+            if owner is not None:
+                owner.mark_changed(self._field)
+            return result
+        mutate.__name__ = method.__name__
+        return mutate
+
+    def __init__(self, items, owner: "UserSessionContext", field: str):
+        base.__init__(self, items)
+        self._owner = weakref.ref(owner)
+        self._field = field
+
+    namespace = {name: wrap(getattr(base, name)) for name in mutators}
+    namespace.update(
+        __slots__=('_owner', '_field'),
+        __init__=__init__,
+        __reduce__=lambda self: (base, (base(self),)),
+        __copy__=lambda self: base(self),
+    )
+    return type(f"Tracked{base.__name__.capitalize()}", (base,), namespace)
+
+
+_TrackedList = _tracking(list, (
+    'append', 'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse',
+    '__setitem__', '__delitem__', '__iadd__', '__imul__'))
+_TrackedDict = _tracking(dict, (
+    'pop', 'popitem', 'clear', 'update', 'setdefault', '__setitem__', '__delitem__', '__ior__'))
 
 class UserSessionContext(BaseModel):
     name: str = "Anonymous"
@@ -12,4 +52,149 @@ class UserSessionContext(BaseModel):
     injury_notes: Optional[str] = None
     handoff_logs: List[str] = []
     progress_logs: List[Dict[str, str]] = []
+    pending_plans: List[str] = []
+    progress_summary: Dict[str, Any] = {}
+
+    # Only the most recent log entries stay in the live context; numeric
+    # measurements are kept in the compact progress store instead
+    MAX_PROGRESS_LOGS: ClassVar[int] = 20
+    MAX_HANDOFF_LOGS: ClassVar[int] = 50
+
+    # Plans are interned in the shared plan store, so sessions with the same
+    # plan days hold references to one copy; snapshots resolve them to lists.
+    # meal_plan and workout_plan therefore hold a read-only plan_store.Plan, not
+    # a list (unless PLAN_DEDUP=0): index, iterate and compare it like a list, but
+    # assign a new list to change a plan, and use plain() where a list is needed.
+    PLAN_FIELDS: ClassVar[Tuple[str, ...]] = ('meal_plan', 'workout_plan')
+    TRACKED_FIELDS: ClassVar[Tuple[str, ...]] = ('goal', 'handoff_logs', 'progress_logs', 'pending_plans', 'progress_summary')
+
+    # Change tracking: every field assignment bumps the version so callers can
+    # ask for just the fields changed since a version they already have. List and
+    # dict fields are held in tracking containers, so appending to a log or
+    # updating the goal in place counts as a change too.
+    _version: int = PrivateAttr(default=0)
+    _field_versions: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _progress_store: Optional[ProgressStore] = PrivateAttr(default=None)
+    # Compacted prompt sections, keyed on the versions of the fields they came from
+    _prompt_cache: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    # Private attributes are read every turn (versions, prompt cache), so hot paths go
+    # straight to __pydantic_private__: pydantic's __getattr__ fallback for private
+    # attributes costs several microseconds per read.
+
+    def model_post_init(self, __context: Any):
+        # Plans restored from a session store arrive as lists
+        for field in self.PLAN_FIELDS:
+            value = self.__dict__[field]
+            if value is not None:
+                self.__dict__[field] = get_plan_store().intern(value)
+        for field in self.TRACKED_FIELDS:
+            self.__dict__[field] = self._track(field, self.__dict__[field])
+
+    def _track(self, field: str, value: Any) -> Any:
+        if isinstance(value, (_TrackedList, _TrackedDict)) and value._field == field and value._owner() is self:
+            return value
+        if isinstance(value, list):
+            return _TrackedList(value, self, field)
+        if isinstance(value, dict):
+            return _TrackedDict(value, self, field)
+        return value
+
+    @field_serializer(*PLAN_FIELDS)
+    def _serialize_plan(self, plan: Any) -> Any:
+        return plain(plan)
+
+    def __setattr__(self, name: str, value: Any):
+        if name in self.PLAN_FIELDS:
+            value = get_plan_store().intern(value)
+            changed = getattr(self, name) is not value
+        elif name in self.TRACKED_FIELDS:
+            # Assigning wraps the value in a new tracking container, so compare
+            # contents: reassigning an equal goal or log is not a change.
+            current = getattr(self, name)
+            value = self._track(name, value)
+            changed = current is not value and current != value
+        else:
+            changed = name in type(self).model_fields and getattr(self, name) is not value
+        super().__setattr__(name, value)
+        if changed:
+            self.mark_changed(name)
+
+    def mark_changed(self, *fields: str):
+        """
+        Record a change to fields. Assignments and in-place changes to list and dict
+        fields call this already; call it after mutating anything nested deeper.
+        """
+        private = self.__pydantic_private__
+        version = private['_version'] = private['_version'] + 1
+        versions = private['_field_versions']
+        for field in fields:
+            versions[field] = version
+
+    @property
+    def version(self) -> int:
+        return self.__pydantic_private__['_version']
+
+    def field_versions(self, *fields: str) -> Tuple[int, ...]:
+        """
+        Return the version at which each field last changed (0 if never).
+        """
+        versions = self.__pydantic_private__['_field_versions']
+        return tuple(versions.get(field, 0) for field in fields)
+
+    @property
+    def prompt_cache(self) -> Dict[str, Any]:
+        return self.__pydantic_private__['_prompt_cache']
+
+    def changes_since(self, version: int) -> Dict[str, Any]:
+        """
+        Return the fields changed after the given version.
+        """
+        return {
+            field: plain(getattr(self, field))
+            for field, field_version in self.__pydantic_private__['_field_versions'].items()
+            if field_version > version
+        }
+
+    @property
+    def progress_store(self) -> ProgressStore:
+        """
+        Numeric progress measurements, created on first use.
+        """
+        private = self.__pydantic_private__
+        if private['_progress_store'] is None:
+            private['_progress_store'] = ProgressStore()
+        return private['_progress_store']
+
+    @progress_store.setter
+    def progress_store(self, store: Optional[ProgressStore]):
+        self._progress_store = store
+
+    def has_progress_store(self) -> bool:
+        return self.__pydantic_private__['_progress_store'] is not None
+
+    def add_progress_log(self, entry: Dict[str, str]):
+        self.progress_logs.append(entry)
+        self.trim_logs()
+
+    def add_handoff_log(self, entry: str):
+        self.handoff_logs.append(entry)
+        self.trim_logs()
+
+    def trim_logs(self):
+        """
+        Drop the oldest log entries beyond the configured limits.
+        """
+        if len(self.progress_logs) > self.MAX_PROGRESS_LOGS:
+            del self.progress_logs[:-self.MAX_PROGRESS_LOGS]
+        if len(self.handoff_logs) > self.MAX_HANDOFF_LOGS:
+            del self.handoff_logs[:-self.MAX_HANDOFF_LOGS]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return every field as a plain dict, with plans resolved to lists.
+        """
+        snapshot = dict(self.__dict__)
+        for field in self.PLAN_FIELDS:
+            snapshot[field] = plain(snapshot[field])
+        return snapshot
 
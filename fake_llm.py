@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from llm_client import LLMError
+from prompt_builder import estimate_tokens
+from metrics import ERRORS, LLM_LATENCY, LLM_TOKENS
+from utils.streaming import emit_text
+
+FAKE_MODEL = 'fake'
+
+MEALS = (
+    ("Oatmeal with berries and walnuts", "Grilled chicken salad with quinoa", "Baked salmon with roasted vegetables"),
+    ("Greek yogurt with granola", "Lentil soup with whole-grain bread", "Turkey meatballs with zucchini noodles"),
+    ("Scrambled eggs with spinach on toast", "Chickpea and feta wrap", "Chicken stir-fry with brown rice"),
+    ("Banana and peanut butter smoothie", "Tuna salad with mixed greens", "Bean chili with a side salad"),
+    ("Cottage cheese with peaches", "Leftover chili with brown rice", "Shrimp with whole-wheat pasta"),
+    ("Avocado toast with a poached egg", "Quinoa bowl with black beans", "Tofu and vegetable curry"),
+    ("Berries and a protein bar", "Grilled vegetable panini", "Baked chicken with sweet potato")
+)
+
+WORKOUTS = (
+    "Full body circuit: squats, push-ups, rows, lunges, plank (3 rounds)",
+    "Cardio: 30-45 minutes brisk walking or cycling",
+    "Upper body strength: presses, rows, curls, triceps extensions",
+    "Cardio intervals: 20 minutes alternating fast and easy pace",
+    "Lower body strength: squats, deadlifts, calf raises",
+    "Active recovery: 30 minutes yoga or mobility work",
+    "Rest: light walk and stretching"
+)
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+_QUANTITY = re.compile(r'(\d+(?:\.\d+)?)\s*(kg|kgs|lbs?|pounds?|km|miles?|steps)\b', re.IGNORECASE)
+_DURATION = re.compile(r'(\d+\s*(?:days?|weeks?|months?|years?))', re.IGNORECASE)
+_GOAL_TYPES = (('gain', 'gain'), ('muscle', 'gain'), ('lose', 'lose'), ('loss', 'lose'), ('run', 'endurance'))
+
+
+def _choice_index(prompt: str, count: int) -> int:
+    digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+    return digest[0] % count
+
+
+def meal_plan_text(prompt: str) -> str:
+    """
+    Seven-day meal plan; the starting day of the rotation depends on the prompt.
+    """
+    offset = _choice_index(prompt, len(MEALS))
+    lines = []
+    for day in range(7):
+        breakfast, lunch, dinner = MEALS[(day + offset) % len(MEALS)]
+        lines.append(f"Day {day + 1}: Breakfast: {breakfast}, Lunch: {lunch}, Dinner: {dinner}")
+    return '\n'.join(lines)
+
+
+def workout_plan_text(prompt: str) -> str:
+    offset = _choice_index(prompt, len(WORKOUTS))
+    return '\n'.join(f"{DAYS[day]}: {WORKOUTS[(day + offset) % len(WORKOUTS)]}" for day in range(7))
+
+
+def goal_json(prompt: str) -> str:
+    """
+    Goal JSON in the shape the goal analyzer returns, parsed from the prompt.
+    """
+    quantity = _QUANTITY.search(prompt)
+    duration = _DURATION.search(prompt)
+    lowered = prompt.lower()
+    goal_type = next((kind for word, kind in _GOAL_TYPES if word in lowered), 'general wellness')
+    return json.dumps({
+        'quantity': float(quantity.group(1)) if quantity else None,
+        'metric': quantity.group(2).lower() if quantity else 'weight',
+        'duration': duration.group(1) if duration else None,
+        'goal_type': goal_type
+    })
+
+
+def coaching_text(prompt: str) -> str:
+    tips = (
+        "Great question! Focus on consistency: small daily habits add up.",
+        "Stay hydrated, aim for 7-9 hours of sleep, and keep moving every day.",
+        "Listen to your body and adjust intensity when you feel tired or sore.",
+        "Build meals around vegetables, lean protein and whole grains."
+    )
+    return tips[_choice_index(prompt, len(tips))]
+
+
+def respond(prompt: str) -> str:
+    """
+    Canned response for a prompt: a meal plan, workout plan, goal JSON or a coaching tip.
+    """
+    lowered = prompt.lower()
+    if 'meal' in lowered and 'plan' in lowered:
+        return meal_plan_text(prompt)
+    if 'workout' in lowered or 'exercise' in lowered:
+        return workout_plan_text(prompt)
+    if 'goal' in lowered and ('json' in lowered or 'analy' in lowered or 'extract' in lowered):
+        return goal_json(prompt)
+    return coaching_text(prompt)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Build a latency sampler from a spec such as 'fixed:0.2', 'uniform:0.1:0.5',
+    'normal:0.8:0.2', 'lognormal:0.8:0.5' (median seconds, sigma) or 'exponential:0.5' (mean).
+    """
+    kind, *args = spec.split(':')
+    values = [float(arg) for arg in args]
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'normal':
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal':
+        median, sigma = values
+        return lambda rng: median * rng.lognormvariate(0.0, sigma)
+    if kind == 'exponential':
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+
+class FakeLLMClient:
+    """
+    Local stand-in for LLMClient, for load tests and benchmarks.
+
+    Returns canned, prompt-dependent meal plans, workout plans, goal JSON and
+    coaching replies after a simulated latency. A spike_rate share of calls
+    adds spike_seconds of tail latency and an error_rate share fail with a
+    retryable LLMError. Streaming sends chunks of chunk_words words, paced at
+    tokens_per_second, after a time to first token of ttft_fraction of the
+    sampled latency. Given a seed, responses and the sequence of sampled
+    latencies are reproducible.
+    """
+
+    def __init__(
+        self,
+        latency: str = 'lognormal:0.8:0.4',
+        spike_rate: float = 0.0,
+        spike_seconds: float = 5.0,
+        error_rate: float = 0.0,
+        tokens_per_second: float = 200.0,
+        chunk_words: int = 16,
+        ttft_fraction: float = 0.3,
+        seed: Optional[int] = None,
+        model: str = FAKE_MODEL
+    ):
+        self.latency_spec = latency
+        self._sample_latency = parse_latency(latency)
+        self.spike_rate = spike_rate
+        self.spike_seconds = spike_seconds
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        self.chunk_words = chunk_words
+        self.ttft_fraction = ttft_fraction
+        self.model = model
+        self._rng = random.Random(seed)
+        self._stats = {'requests': 0, 'failures': 0, 'spikes': 0, 'tokens': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+    @classmethod
+    def from_env(cls) -> 'FakeLLMClient':
+        """
+        Configure from FAKE_LLM_LATENCY, FAKE_LLM_SPIKE_RATE, FAKE_LLM_SPIKE_SECONDS,
+        FAKE_LLM_ERROR_RATE, FAKE_LLM_TOKENS_PER_SECOND and FAKE_LLM_SEED.
+        """
+        seed = os.getenv('FAKE_LLM_SEED')
+        return cls(
+            latency=os.getenv('FAKE_LLM_LATENCY', 'lognormal:0.8:0.4'),
+            spike_rate=float(os.getenv('FAKE_LLM_SPIKE_RATE', '0')),
+            spike_seconds=float(os.getenv('FAKE_LLM_SPIKE_SECONDS', '5')),
+            error_rate=float(os.getenv('FAKE_LLM_ERROR_RATE', '0')),
+            tokens_per_second=float(os.getenv('FAKE_LLM_TOKENS_PER_SECOND', '200')),
+            seed=int(seed) if seed else None
+        )
+
+    def _plan_call(self):
+        """
+        Draw this call's latency and whether it fails.
+        """
+        latency = self._sample_latency(self._rng)
+        if self._rng.random() < self.spike_rate:
+            latency += self.spike_seconds
+            self._stats['spikes'] += 1
+        fails = self._rng.random() < self.error_rate
+        return latency, fails
+
+    def _start(self):
+        stats = self._stats
+        stats['requests'] += 1
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+
+    def _finish(self, started: float, status: int, text: str = '', prompt: str = ''):
+        self._stats['in_flight'] -= 1
+        LLM_LATENCY.observe(time.perf_counter() - started, model=self.model, status=status)
+        if status != 200:
+            self._stats['failures'] += 1
+            ERRORS.inc(component='llm', name=self.model)
+            return
+        tokens = estimate_tokens(prompt) + estimate_tokens(text)
+        self._stats['tokens'] += tokens
+        LLM_TOKENS.inc(tokens, model=self.model)
+
+    async def generate(self, prompt: str, system: Optional[str] = None, max_output_tokens: int = 1024) -> str:
+        latency, fails = self._plan_call()
+        started = time.perf_counter()
+        self._start()
+        try:
+            await asyncio.sleep(latency)
+        except BaseException:
+            self._finish(started, 499)
+            raise
+        if fails:
+            self._finish(started, 503)
+            raise LLMError("Injected fake model failure", status_code=503)
+        text = respond(prompt)
+        self._finish(started, 200, text, prompt)
+        return text
+
+    async def stream(self, prompt: str, system: Optional[str] = None, max_output_tokens: int = 1024) -> AsyncIterator[str]:
+        latency, fails = self._plan_call()
+        started = time.perf_counter()
+        self._start()
+        status = 499
+        try:
+            await asyncio.sleep(latency * self.ttft_fraction)
+            if fails:
+                status = 503
+                raise LLMError("Injected fake model failure", status_code=503)
+            text = respond(prompt)
+            # Words keep their trailing whitespace so the deltas join back into the text
+            words = re.findall(r'\S+\s*', text)
+            delay = self.chunk_words / self.tokens_per_second if self.tokens_per_second else 0.0
+            for i in range(0, len(words), self.chunk_words):
+                delta = ''.join(words[i:i + self.chunk_words])
+                emit_text(delta)
+                yield delta
+                if delay:
+                    await asyncio.sleep(delay)
+            status = 200
+        finally:
+            self._finish(started, status, text if status == 200 else '', prompt)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+    async def aclose(self):
+        pass
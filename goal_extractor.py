@@ -0,0 +1,150 @@
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+from pydantic import ValidationError
+from guardrails import GoalInput
+from metrics import GOAL_EXTRACTIONS
+
+# Fast-path results below this confidence go to the goal analyzer (the LLM) instead
+DEFAULT_MIN_CONFIDENCE = float(os.getenv('GOAL_FAST_PATH_CONFIDENCE', '0.8'))
+
+KG_PER_LB = 0.45359237
+LBS_PER_STONE = 14.0
+
+# Units accepted by GoalInput, plus stone, which is converted to lbs
+_UNITS = {
+    'kg': 'kg', 'kgs': 'kg', 'kilo': 'kg', 'kilos': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'lb': 'lbs', 'lbs': 'lbs', 'pound': 'lbs', 'pounds': 'lbs',
+    'stone': 'stone', 'stones': 'stone',
+    'cm': 'cm', 'centimeter': 'cm', 'centimeters': 'cm', 'centimetre': 'cm', 'centimetres': 'cm',
+    'inch': 'inches', 'inches': 'inches'
+}
+_NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12
+}
+_GOAL_TYPES = {
+    'lose': ('lose', 'losing', 'lost', 'drop', 'shed', 'cut', 'burn', 'reduce', 'slim down', 'trim'),
+    'gain': ('gain', 'gaining', 'put on', 'bulk', 'build', 'add'),
+    'maintain': ('maintain', 'keep', 'stay at', 'hold')
+}
+
+_NUMBER = r'\b(\d+(?:[.,]\d+)?|' + '|'.join(_NUMBER_WORDS) + r')'
+_QUANTITY_PATTERN = re.compile(
+    _NUMBER + r'\s*(?:-\s*)?(' + '|'.join(sorted(_UNITS, key=len, reverse=True)) + r')\b'
+)
+_DURATION_PATTERN = re.compile(
+    r'(?:in|within|over|by|for|next)\s+(?:the\s+next\s+)?' + _NUMBER + r'\s*(day|week|month|year)s?\b'
+)
+_GOAL_TYPE_PATTERNS = {
+    goal_type: re.compile(r'\b(?:' + '|'.join(re.escape(verb) for verb in verbs) + r')\b')
+    for goal_type, verbs in _GOAL_TYPES.items()
+}
+_NEGATION_PATTERN = re.compile(r"\b(?:not|don't|dont|never|no longer|without)\b")
+
+
+class GoalExtraction(NamedTuple):
+    goal: Optional[Dict[str, Any]]
+    confidence: float
+    reason: str = ''
+
+
+def _number(text: str) -> float:
+    return float(_NUMBER_WORDS[text]) if text in _NUMBER_WORDS else float(text.replace(',', '.'))
+
+
+def convert_weight(quantity: float, from_unit: str, to_unit: str) -> float:
+    """
+    Convert a weight between 'kg', 'lbs' and 'stone'.
+    """
+    lbs = {'lbs': quantity, 'kg': quantity / KG_PER_LB, 'stone': quantity * LBS_PER_STONE}[from_unit]
+    return {'lbs': lbs, 'kg': lbs * KG_PER_LB, 'stone': lbs / LBS_PER_STONE}[to_unit]
+
+
+class GoalExtractor:
+    """
+    Deterministic extractor for goals with a fixed shape, such as
+    "lose 20 pounds in 3 months", tried before the goal analyzer's model call.
+
+    Quantity, metric, duration and goal type are read with regular
+    expressions and validated against guardrails.GoalInput. Confidence is the
+    share of the four fields found, lowered when the input is ambiguous
+    (several quantities or goal types, or a negation); anything below
+    min_confidence goes to the model. Weights in stone are converted to lbs,
+    and weight_unit ('kg' or 'lbs', default GOAL_WEIGHT_UNIT) converts every
+    weight goal to one unit.
+    """
+
+    def __init__(self, min_confidence: float = DEFAULT_MIN_CONFIDENCE, weight_unit: Optional[str] = None):
+        self.min_confidence = min_confidence
+        self.weight_unit = weight_unit if weight_unit is not None else os.getenv('GOAL_WEIGHT_UNIT') or None
+        self._stats = {'attempts': 0, 'fast_path': 0, 'fallbacks': 0}
+
+    def extract(self, text: str) -> GoalExtraction:
+        """
+        Extract a goal and a confidence between 0 and 1. The goal is None if it
+        did not validate.
+        """
+        lowered = text.lower()
+        quantities = _QUANTITY_PATTERN.findall(lowered)
+        durations = _DURATION_PATTERN.findall(lowered)
+        goal_types = [goal_type for goal_type, pattern in _GOAL_TYPE_PATTERNS.items() if pattern.search(lowered)]
+
+        found = sum((bool(quantities), bool(durations), bool(goal_types)))
+        # The metric comes with the quantity, so a quantity counts for two fields
+        confidence = (found + bool(quantities)) / 4
+        reasons: List[str] = []
+        if len({(number, _UNITS[unit]) for number, unit in quantities}) > 1:
+            confidence -= 0.5
+            reasons.append('several quantities')
+        if len(goal_types) > 1:
+            confidence -= 0.5
+            reasons.append('several goal types')
+        if len(set(durations)) > 1:
+            confidence -= 0.25
+            reasons.append('several durations')
+        if _NEGATION_PATTERN.search(lowered):
+            confidence -= 0.5
+            reasons.append('negation')
+        if not (quantities and durations and goal_types):
+            reasons.append('missing ' + ', '.join(
+                name for name, present in (('quantity', quantities), ('duration', durations), ('goal type', goal_types))
+                if not present
+            ))
+            return GoalExtraction(None, max(confidence, 0.0), '; '.join(reasons))
+
+        number, unit = quantities[0]
+        quantity, metric = _number(number), _UNITS[unit]
+        if metric == 'stone':
+            quantity, metric = convert_weight(quantity, 'stone', 'lbs'), 'lbs'
+        if self.weight_unit in ('kg', 'lbs') and metric in ('kg', 'lbs') and metric != self.weight_unit:
+            quantity, metric = convert_weight(quantity, metric, self.weight_unit), self.weight_unit
+        count, period = durations[0]
+        count = _number(count)
+        duration = f"{count:g} {period}{'s' if count != 1 else ''}"
+
+        try:
+            goal = GoalInput(quantity=round(quantity, 1), metric=metric, duration=duration, goal_type=goal_types[0])
+        except ValidationError as error:
+            return GoalExtraction(None, 0.0, f"invalid: {error.errors()[0]['msg']}")
+        return GoalExtraction(goal.model_dump(), max(confidence, 0.0), '; '.join(reasons))
+
+    def fast_path(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the goal if it was extracted with enough confidence, else None
+        (the caller falls back to the model). Counts toward the hit rate.
+        """
+        extraction = self.extract(text)
+        self._stats['attempts'] += 1
+        if extraction.goal is not None and extraction.confidence >= self.min_confidence:
+            self._stats['fast_path'] += 1
+            GOAL_EXTRACTIONS.inc(path='fast')
+            return extraction.goal
+        self._stats['fallbacks'] += 1
+        GOAL_EXTRACTIONS.inc(path='llm')
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats['hit_rate'] = stats['fast_path'] / stats['attempts'] if stats['attempts'] else 0.0
+        return stats
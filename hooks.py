@@ -1,8 +1,32 @@
+import logging
+import time
 from agents import RunHooks
+from metrics import ERRORS, TOOL_LATENCY
+
+logger = logging.getLogger(__name__)
 
 class LoggingHooks(RunHooks):
     async def on_tool_start(self, tool_name: str, input: str):
-        print(f"Tool {tool_name} started with input: {input}")
+        logger.debug("Tool %s started with input: %s", tool_name, input)
+    
+    async def on_tool_end(self, tool_name: str, output: str):
+        logger.debug("Tool %s completed with output: %s", tool_name, output)
+
+class MetricsHooks(RunHooks):
+    """
+    Records tool latency in the metrics registry for tools run by an agent runner.
+    """
+    
+    def __init__(self):
+        self._started = {}
+    
+    async def on_tool_start(self, tool_name: str, input: str):
+        self._started.setdefault(tool_name, []).append(time.perf_counter())
     
     async def on_tool_end(self, tool_name: str, output: str):
-        print(f"Tool {tool_name} completed with output: {output}")
\ No newline at end of file
+        starts = self._started.get(tool_name)
+        if not starts:
+            return
+        TOOL_LATENCY.observe(time.perf_counter() - starts.pop(), tool=tool_name)
+        if isinstance(output, Exception):
+            ERRORS.inc(component='tool', name=tool_name)
@@ -0,0 +1,162 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Routing table: each intent maps to a specialized agent or a tool, lists the
+# stages it applies to (None means every stage) and weights the terms that
+# signal it. Multi-word terms are matched as whole phrases. Safety intents
+# have a higher priority: any match on them beats lower tiers whatever the
+# weights, so several food words cannot outvote one mention of pain.
+ROUTES = [
+    {
+        'intent': 'retry_plans',
+        'stages': ('real_time_delivery',),
+        'handler': 'plan_generation',
+        'terms': {'retry': 3.0, 'try again': 3.0, 'regenerate': 3.0}
+    },
+    {
+        'intent': 'escalation',
+        'stages': ('real_time_delivery',),
+        'agent': 'escalation',
+        'priority': 1,
+        'terms': {
+            'emergency': 3.0, 'urgent': 2.0, 'chest pain': 3.0,
+            'talk to a human': 3.0, 'speak to a human': 3.0, 'real person': 3.0, 'human coach': 3.0
+        }
+    },
+    {
+        'intent': 'injury',
+        'stages': ('real_time_delivery',),
+        'agent': 'injury_support',
+        'priority': 1,
+        'terms': {
+            'injury': 2.0, 'injuries': 2.0, 'injured': 2.0,
+            'pain': 2.0, 'pains': 2.0, 'painful': 2.0,
+            'hurt': 2.0, 'hurts': 2.0, 'hurting': 2.0,
+            'sprain': 2.0, 'sprained': 2.0, 'strain': 1.5, 'strained': 1.5,
+            'sore': 1.0, 'ache': 1.5, 'aches': 1.5, 'aching': 1.5
+        }
+    },
+    {
+        'intent': 'nutrition',
+        'stages': ('real_time_delivery',),
+        'agent': 'nutrition_expert',
+        'terms': {
+            'nutrition': 1.0, 'nutritional': 1.0, 'nutrient': 1.0, 'nutrients': 1.0,
+            'diet': 1.0, 'dietary': 1.0, 'dieting': 1.0, 'diets': 1.0,
+            'meal': 1.0, 'meals': 1.0, 'food': 1.0, 'foods': 1.0,
+            'calorie': 1.0, 'calories': 1.0, 'protein': 1.0, 'carbs': 1.0,
+            'recipe': 1.0, 'recipes': 1.0, 'snack': 0.5, 'snacks': 0.5
+        }
+    },
+    {
+        'intent': 'progress_stats',
+        'stages': ('real_time_delivery', 'progress_tracking', 'ongoing_support'),
+        'handler': 'progress_analytics',
+        'terms': {
+            'average': 1.5, 'averages': 1.5, 'trend': 1.5, 'trending': 1.5,
+            'streak': 2.0, 'streaks': 2.0, 'projected': 2.0, 'projection': 2.0,
+            'on track': 2.0, 'reach my goal': 2.0, 'rate of change': 2.0,
+            'stats': 1.5, 'statistics': 1.5, 'how much have i lost': 3.0
+        }
+    },
+    {
+        'intent': 'checkin',
+        'stages': ('ongoing_support',),
+        'tool': 'checkin_scheduler',
+        'response': "📅 {result}",
+        'terms': {
+            'schedule': 1.0, 'scheduled': 1.0, 'scheduling': 1.0,
+            'checkin': 1.0, 'checkins': 1.0, 'check-in': 1.0, 'check-ins': 1.0,
+            'check in': 1.0, 'reminder': 1.0, 'remind me': 1.0
+        }
+    }
+]
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+
+class RouteMatch(NamedTuple):
+    intent: str
+    score: float
+    agent: Optional[str] = None
+    tool: Optional[str] = None
+    handler: Optional[str] = None
+    response: Optional[str] = None
+
+
+class IntentRouter:
+    """
+    Routes user input to an intent in a single pass over its tokens.
+    
+    All route terms are compiled into one lookup table per stage, keyed by
+    token, so routing cost depends on the length of the input and not on the
+    number of routes. Terms match on word boundaries; among the matched
+    routes of the highest priority, the one with the highest total weight
+    wins, ties going to the route listed first.
+    """
+    
+    def __init__(self, routes: Iterable[dict] = ROUTES):
+        self.routes = [dict(route) for route in routes]
+        self._priorities = [route.get('priority', 0) for route in self.routes]
+        # Per-stage tables: token -> [(route index, weight)] and first token -> [(phrase tokens, route index, weight)]
+        self._tables: Dict[Optional[str], Tuple[dict, dict]] = {}
+    
+    def _table(self, stage: Optional[str]) -> Tuple[dict, dict]:
+        table = self._tables.get(stage)
+        if table is None:
+            terms: Dict[str, List[Tuple[int, float]]] = {}
+            phrases: Dict[str, List[Tuple[Tuple[str, ...], int, float]]] = {}
+            for index, route in enumerate(self.routes):
+                stages = route.get('stages')
+                if stage is not None and stages is not None and stage not in stages:
+                    continue
+                for term, weight in route['terms'].items():
+                    tokens = tuple(_TOKEN_PATTERN.findall(term.lower()))
+                    if len(tokens) == 1:
+                        terms.setdefault(tokens[0], []).append((index, weight))
+                    elif tokens:
+                        phrases.setdefault(tokens[0], []).append((tokens, index, weight))
+            table = self._tables[stage] = (terms, phrases)
+        return table
+    
+    def _score(self, text: str, stage: Optional[str]) -> Dict[int, float]:
+        terms, phrases = self._table(stage)
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        scores: Dict[int, float] = {}
+        for position, token in enumerate(tokens):
+            for index, weight in terms.get(token, ()):
+                scores[index] = scores.get(index, 0.0) + weight
+            for phrase, index, weight in phrases.get(token, ()):
+                if tuple(tokens[position:position + len(phrase)]) == phrase:
+                    scores[index] = scores.get(index, 0.0) + weight
+        return scores
+    
+    def route(self, text: str, stage: Optional[str] = None, exclude: Iterable[str] = ()) -> Optional[RouteMatch]:
+        """
+        Return the best matching route for the input, or None if nothing matched.
+        """
+        scores = self._score(text, stage)
+        best = best_rank = None
+        for index, score in scores.items():
+            if self.routes[index]['intent'] in exclude:
+                continue
+            rank = (self._priorities[index], score, -index)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = index, rank
+        if best is None:
+            return None
+        route = self.routes[best]
+        return RouteMatch(
+            intent=route['intent'],
+            score=scores[best],
+            agent=route.get('agent'),
+            tool=route.get('tool'),
+            handler=route.get('handler'),
+            response=route.get('response')
+        )
+    
+    def scores(self, text: str, stage: Optional[str] = None) -> Dict[str, float]:
+        """
+        Return the score of every matched intent, for debugging and tuning.
+        """
+        return {self.routes[index]['intent']: score for index, score in self._score(text, stage).items()}
@@ -0,0 +1,379 @@
+import asyncio
+import json
+import os
+import random
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+from metrics import ERRORS, LLM_LATENCY, LLM_TOKENS
+from prompt_builder import estimate_tokens
+from utils.deadline import DeadlineExceeded, remaining
+from utils.streaming import emit_text
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class LLMError(Exception):
+    """
+    Raised when a model request fails after all retries.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at rate_per_minute.
+
+    acquire() reserves its tokens and waits until the bucket has refilled
+    enough to cover them. A request larger than the bucket capacity is let
+    through once the bucket is full, so it cannot wait forever. Tokens may be charged after the fact with consume(), which
+    can leave the bucket in debt and delays the next callers instead.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        # Reserve the tokens up front, then sleep off the debt without holding
+        # anything: each waiter's debt includes everyone queued before it, so
+        # waiters still go in arrival order
+        self._refill()
+        self._tokens -= amount
+        if self._tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-self._tokens / self.rate)
+        except asyncio.CancelledError:
+            self._tokens += amount
+            raise
+
+    def consume(self, amount: float):
+        self._refill()
+        self._tokens -= amount
+
+
+class LLMClient:
+    """
+    Shared async client for the Gemini API.
+
+    All agents and tools send their model calls through one client so they
+    share a pool of keep-alive connections, a cap on requests in flight,
+    requests-per-minute and tokens-per-minute token buckets, and one retry
+    policy: 429 and 5xx responses and connection errors are retried with full
+    jitter exponential backoff, honouring Retry-After when the provider sends it.
+
+    Point base_url (LLM_BASE_URL) at a local server to test without the real API.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 16,
+        requests_per_minute: float = 60.0,
+        tokens_per_minute: float = 250000.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        timeout: float = 60.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.api_key = api_key if api_key is not None else os.getenv('GEMINI_API_KEY', '')
+        self.model = model or os.getenv('GEMINI_MODEL', DEFAULT_MODEL)
+        self.base_url = (base_url or os.getenv('LLM_BASE_URL', DEFAULT_BASE_URL)).rstrip('/')
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self._http = httpx.AsyncClient(
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0,
+            'tokens': 0,
+            'in_flight': 0,
+            'queue_depth': 0,
+            'max_queue_depth': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0
+        }
+
+    def _body(self, prompt: str, system: Optional[str], max_output_tokens: int) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+            'generationConfig': {'maxOutputTokens': max_output_tokens}
+        }
+        if system:
+            body['systemInstruction'] = {'parts': [{'text': system}]}
+        return body
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _request_timeout(self) -> Any:
+        """
+        Per-request timeout: the client default, cut short by the stage deadline if one is set.
+        """
+        left = remaining()
+        if left is None or left >= self.timeout:
+            return httpx.USE_CLIENT_DEFAULT
+        if left <= 0:
+            raise DeadlineExceeded("Deadline passed before the model request could start")
+        return left
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        # A retry that cannot finish before the deadline only delays the fallback
+        delay = self._backoff(attempt, response)
+        left = remaining()
+        if left is not None and delay >= left:
+            self._fail()
+            raise DeadlineExceeded(f"No time left to retry the model request after attempt {attempt + 1}")
+        return delay
+
+    async def _wait_for_capacity(self, estimated_tokens: int):
+        """
+        Queue until a concurrency slot and quota are available.
+        """
+        stats = self._stats
+        stats['queue_depth'] += 1
+        stats['max_queue_depth'] = max(stats['max_queue_depth'], stats['queue_depth'])
+        start = time.monotonic()
+        try:
+            await self._slots.acquire()
+            try:
+                await self.request_bucket.acquire(1)
+                await self.token_bucket.acquire(estimated_tokens)
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            stats['queue_depth'] -= 1
+        waited = time.monotonic() - start
+        stats['wait_seconds'] += waited
+        stats['max_wait_seconds'] = max(stats['max_wait_seconds'], waited)
+        stats['in_flight'] += 1
+
+    def _fail(self):
+        self._stats['failures'] += 1
+        ERRORS.inc(component='llm', name=self.model)
+
+    def _release(self):
+        self._stats['in_flight'] -= 1
+        self._slots.release()
+
+    def _charge_usage(self, usage: Dict[str, Any], estimated_tokens: int):
+        used = usage.get('totalTokenCount', estimated_tokens)
+        self._stats['tokens'] += used
+        LLM_TOKENS.inc(used, model=self.model)
+        if used > estimated_tokens:
+            self.token_bucket.consume(used - estimated_tokens)
+
+    async def generate(self, prompt: str, system: Optional[str] = None, max_output_tokens: int = 1024) -> str:
+        """
+        Send one prompt and return the generated text.
+        """
+        url = f"{self.base_url}/models/{self.model}:generateContent"
+        body = self._body(prompt, system, max_output_tokens)
+        estimated = estimate_tokens(prompt + (system or '')) + max_output_tokens
+
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_capacity(estimated)
+            response = None
+            start = time.perf_counter()
+            try:
+                self._stats['requests'] += 1
+                response = await self._http.post(url, json=body, headers={'x-goog-api-key': self.api_key},
+                                                 timeout=self._request_timeout())
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    self._fail()
+                    raise
+            finally:
+                self._release()
+                status = response.status_code if response is not None else 'error'
+                LLM_LATENCY.observe(time.perf_counter() - start, model=self.model, status=status)
+            if attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                self._stats['retries'] += 1
+                await asyncio.sleep(delay)
+
+        if response.status_code != 200:
+            self._fail()
+            raise LLMError(f"Model request failed with status {response.status_code}: {response.text[:200]}",
+                           status_code=response.status_code)
+        data = response.json()
+        self._charge_usage(data.get('usageMetadata', {}), estimated)
+        return _candidate_text(data)
+
+    async def stream(self, prompt: str, system: Optional[str] = None, max_output_tokens: int = 1024) -> AsyncIterator[str]:
+        """
+        Yield generated text as it arrives. Each delta is also emitted to the
+        active response stream, if any.
+
+        Requests are retried only until the first text has been received.
+        """
+        url = f"{self.base_url}/models/{self.model}:streamGenerateContent?alt=sse"
+        body = self._body(prompt, system, max_output_tokens)
+        estimated = estimate_tokens(prompt + (system or '')) + max_output_tokens
+
+        received = False
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_capacity(estimated)
+            self._stats['requests'] += 1
+            failed_response = None
+            status = 'error'
+            start = time.perf_counter()
+            try:
+                async with self._http.stream('POST', url, json=body, headers={'x-goog-api-key': self.api_key},
+                                             timeout=self._request_timeout()) as response:
+                    status = response.status_code
+                    if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                        failed_response = response
+                    elif response.status_code != 200:
+                        self._fail()
+                        await response.aread()
+                        raise LLMError(f"Model request failed with status {response.status_code}: {response.text[:200]}",
+                                       status_code=response.status_code)
+                    else:
+                        usage: Dict[str, Any] = {}
+                        async for line in response.aiter_lines():
+                            if not line.startswith('data:'):
+                                continue
+                            data = json.loads(line[5:])
+                            usage = data.get('usageMetadata', usage)
+                            text = _candidate_text(data)
+                            if text:
+                                received = True
+                                emit_text(text)
+                                yield text
+                        self._charge_usage(usage, estimated)
+                        return
+            except httpx.TransportError:
+                # Text already handed to the caller cannot be taken back, so only retry before it
+                if received or attempt == self.max_retries:
+                    self._fail()
+                    raise
+            finally:
+                self._release()
+                LLM_LATENCY.observe(time.perf_counter() - start, model=self.model, status=status)
+            delay = self._retry_delay(attempt, failed_response)
+            self._stats['retries'] += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Request counts plus queue depth and time spent waiting for capacity.
+        """
+        stats = dict(self._stats)
+        waits = stats['requests']
+        stats['avg_wait_seconds'] = stats['wait_seconds'] / waits if waits else 0.0
+        return stats
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+def _candidate_text(data: Dict[str, Any]) -> str:
+    candidates = data.get('candidates') or []
+    if not candidates:
+        return ''
+    parts = candidates[0].get('content', {}).get('parts', [])
+    return ''.join(part.get('text', '') for part in parts)
+
+
+# One client per event loop: connections and asyncio primitives belong to the
+# loop that created them. The Streamlit app runs everything on one background
+# loop, and the CLI on one asyncio.run() loop, so each shares a single client.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LLMClient]" = weakref.WeakKeyDictionary()
+# The async generators that close each client, kept alive as long as their loop
+_closers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncIterator[None]]" = weakref.WeakKeyDictionary()
+
+
+async def _close_at_shutdown(client: Any) -> AsyncIterator[None]:
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+def _close_with_loop(loop: asyncio.AbstractEventLoop, client: Any):
+    """
+    Close client when loop shuts down. asyncio.run() and BackgroundEventLoop both
+    call shutdown_asyncgens() before closing the loop, which finalizes every async
+    generator started on it, so a generator suspended here closes the client then.
+    """
+    closer = _closers[loop] = _close_at_shutdown(client)
+    # Run it to its yield now; starting it registers it with the running loop
+    try:
+        closer.asend(None).send(None)
+    except StopIteration:
+        pass
+
+
+def get_llm_client() -> LLMClient:
+    """
+    Return the shared client for the running event loop, configured from the environment:
+    LLM_MAX_CONCURRENCY, LLM_RPM, LLM_TPM, LLM_MAX_RETRIES, LLM_BASE_URL, GEMINI_MODEL and GEMINI_API_KEY.
+
+    LLM_BACKEND=fake swaps in the local fake_llm.FakeLLMClient, which needs no network.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is not None:
+        return client
+    if os.getenv('LLM_BACKEND', 'gemini') == 'fake':
+        from fake_llm import FakeLLMClient
+        client = FakeLLMClient.from_env()
+    else:
+        client = LLMClient(
+            max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '16')),
+            requests_per_minute=float(os.getenv('LLM_RPM', '60')),
+            tokens_per_minute=float(os.getenv('LLM_TPM', '250000')),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', '4'))
+        )
+    _clients[loop] = client
+    _close_with_loop(loop, client)
+    return client
+
+async def complete(prompt: str, system: Optional[str] = None, stream: bool = False, max_output_tokens: int = 1024) -> str:
+    """
+    Generate text with the shared client. With stream=True the text is also
+    emitted to the active response stream as it arrives.
+    """
+    client = get_llm_client()
+    if not stream:
+        return await client.generate(prompt, system=system, max_output_tokens=max_output_tokens)
+    return ''.join([delta async for delta in client.stream(prompt, system=system, max_output_tokens=max_output_tokens)])
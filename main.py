@@ -2,17 +2,61 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from workflow_orchestrator import HealthWellnessWorkflow
+from checkin_scheduler import CheckinDispatcher, get_default_store, has_default_store
+from metrics import start_metrics_export
+from utils.streaming import unstreamed_text
 import asyncio
+import logging
+import os
+import threading
+
+# Stage banners are logged at INFO; set LOG_LEVEL=WARNING to hide them
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(message)s')
+
+async def read_input(prompt):
+    """Read a line in a daemon thread so the event loop keeps sending check-ins while the user types."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def read():
+        try:
+            line = input(prompt)
+        except Exception as e:
+            loop.call_soon_threadsafe(future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(future.set_result, line)
+    
+    threading.Thread(target=read, daemon=True).start()
+    return await future
 
 async def main():
-    workflow = HealthWellnessWorkflow()
+    # Only print context fields that changed this turn instead of the whole session
+    workflow = HealthWellnessWorkflow(response_mode='delta')
+    # Check-ins and turns both change the session, so they take turns
+    turn_lock = asyncio.Lock()
+    
+    async def deliver_checkin(checkin):
+        async with turn_lock:
+            response = await workflow.handle_checkin(checkin.message)
+        print(f"\n📅 {response['response']}\n[Current Stage: {workflow.current_stage}]\nYou: ", end='', flush=True)
+    
+    dispatcher = dispatcher_task = None
+    
+    def start_checkins():
+        # Only this user's check-ins, and only once the check-in store is in use, so starting the CLI creates no database
+        nonlocal dispatcher, dispatcher_task
+        if dispatcher is None and has_default_store():
+            dispatcher = CheckinDispatcher(get_default_store(), deliver_checkin, uid=workflow.context.uid)
+            dispatcher_task = asyncio.create_task(dispatcher.run())
+    
     print("Welcome to the Health & Wellness Planner!")
-    print("Commands: 'quit' to exit, 'clear' to reset, 'help' for help, 'status' to check workflow stage")
+    print("Commands: 'quit' to exit, 'clear' to reset, 'help' for help, 'status' to check workflow stage, 'context' to show full session context")
     
     try:
         while True:
+            start_checkins()
             try:
-                user_input = input("You: ")
+                user_input = await read_input("You: ")
             except EOFError:
                 # Handle EOF (when input is piped)
                 break
@@ -29,29 +73,60 @@ async def main():
                 print("  'quit' - Exit the program")
                 print("  'clear' - Clear current session and start fresh")
                 print("  'status' - Show current workflow stage")
+                print("  'context' - Show the full session context")
                 print("  'help' - Show this help message")
                 continue
             elif user_input.lower() == "status":
                 print(f"Current workflow stage: {workflow.current_stage}")
                 continue
+            elif user_input.lower() == "context":
+                print(workflow.get_context_snapshot())
+                continue
             
             print("Assistant:")
             
-            # Process user input through workflow
-            response = await workflow.process_input(user_input)
+            # Stream the response: text as it is generated, plan days as each one completes
+            response = None
+            streamed_text = {}
+            streamed_plans = set()
+            async with turn_lock:
+                async for chunk in workflow.process_input_stream(user_input):
+                    if chunk['type'] == 'text':
+                        print(chunk['delta'], end='', flush=True)
+                        streamed_text[chunk['source']] = streamed_text.get(chunk['source'], '') + chunk['delta']
+                    elif chunk['type'] == 'plan_day':
+                        label = 'Meal Plan' if chunk['plan'] == 'meal_plan' else 'Workout Plan'
+                        print(f"\n{label} - Day {chunk['day']}:\n{chunk['text']}", flush=True)
+                        streamed_plans.add(chunk['plan'])
+                    elif chunk['type'] == 'result':
+                        response = chunk['response']
             
-            # Handle structured response format
+            # Print whatever was not already streamed, e.g. the prompts and notes the workflow adds
             if isinstance(response, dict):
-                # Print formatted structured response
-                print(response)
+                if streamed_text or streamed_plans:
+                    print()
+                text = unstreamed_text(
+                    str(response.get('response')),
+                    streamed=streamed_text.values(),
+                    skip_sections=[spec['heading'] for spec in workflow.PLAN_TOOLS.values() if spec['field'] in streamed_plans]
+                )
+                if text:
+                    print(text)
+                if response.get('pending_plans'):
+                    print(f"Pending plans: {', '.join(response['pending_plans'])}")
             else:
-                # Print simple string response
                 print(response)
             
             # Show current stage
             print(f"\n[Current Stage: {workflow.current_stage}]")
-    except KeyboardInterrupt:
-        print("\nGoodbye!")
+    finally:
+        if dispatcher is not None:
+            dispatcher.stop()
+            await dispatcher_task
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    start_metrics_export()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
@@ -0,0 +1,380 @@
+import os
+import re
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from guardrails import DietaryInput
+from progress_store import normalize_unit
+from tool_base import Tool
+
+ALLERGENS = ('gluten', 'dairy', 'eggs', 'nuts', 'peanuts', 'soy', 'fish', 'shellfish', 'sesame')
+ALLERGEN_BITS = {allergen: 1 << bit for bit, allergen in enumerate(ALLERGENS)}
+
+# Diet tags a meal satisfies; vegan meals are also vegetarian and pescatarian, and so on
+DIET_TAGS = ('vegan', 'vegetarian', 'pescatarian', 'gluten_free', 'dairy_free', 'low_carb', 'high_protein')
+TAG_BITS = {tag: 1 << bit for bit, tag in enumerate(DIET_TAGS)}
+_DIET_LEVELS = {
+    'vegan': ('vegan', 'vegetarian', 'pescatarian'),
+    'vegetarian': ('vegetarian', 'pescatarian'),
+    'pescatarian': ('pescatarian',),
+    'omnivore': ()
+}
+
+SLOTS = ('breakfast', 'lunch', 'dinner', 'snack')
+
+
+class Meal(NamedTuple):
+    name: str
+    slot: str
+    kcal: float
+    protein: float
+    carbs: float
+    fat: float
+    diet: str
+    allergens: Tuple[str, ...] = ()
+
+
+# Per serving: kcal, protein (g), carbs (g), fat (g)
+MEALS = (
+    Meal("Oatmeal with berries and walnuts", 'breakfast', 380, 11, 55, 14, 'vegan', ('gluten', 'nuts')),
+    Meal("Greek yogurt with granola and honey", 'breakfast', 350, 20, 45, 10, 'vegetarian', ('dairy', 'gluten')),
+    Meal("Scrambled eggs with spinach on whole-grain toast", 'breakfast', 390, 24, 30, 19, 'vegetarian', ('eggs', 'gluten')),
+    Meal("Veggie omelette with a side of fruit", 'breakfast', 330, 22, 18, 19, 'vegetarian', ('eggs',)),
+    Meal("Tofu scramble with peppers and potatoes", 'breakfast', 360, 21, 32, 16, 'vegan', ('soy',)),
+    Meal("Banana peanut butter smoothie", 'breakfast', 410, 18, 52, 15, 'vegetarian', ('dairy', 'peanuts')),
+    Meal("Chia pudding with coconut milk and mango", 'breakfast', 340, 8, 38, 18, 'vegan'),
+    Meal("Cottage cheese with peaches", 'breakfast', 260, 24, 26, 5, 'vegetarian', ('dairy',)),
+    Meal("Smoked salmon bagel with cream cheese", 'breakfast', 450, 26, 48, 16, 'pescatarian', ('fish', 'gluten', 'dairy', 'sesame')),
+    Meal("Turkey sausage and sweet potato hash", 'breakfast', 420, 28, 35, 18, 'omnivore'),
+    Meal("Buckwheat pancakes with berries", 'breakfast', 370, 10, 62, 9, 'vegan'),
+    Meal("Avocado toast with a poached egg", 'breakfast', 360, 15, 30, 20, 'vegetarian', ('eggs', 'gluten')),
+    Meal("Protein oats with whey and almonds", 'breakfast', 450, 35, 48, 13, 'vegetarian', ('gluten', 'dairy', 'nuts')),
+    Meal("Rice porridge with ginger and scallions", 'breakfast', 280, 6, 55, 3, 'vegan'),
+
+    Meal("Grilled chicken salad with quinoa", 'lunch', 480, 40, 38, 17, 'omnivore'),
+    Meal("Lentil soup with whole-grain bread", 'lunch', 450, 22, 68, 8, 'vegan', ('gluten',)),
+    Meal("Chickpea and feta wrap", 'lunch', 520, 20, 62, 21, 'vegetarian', ('gluten', 'dairy')),
+    Meal("Tuna salad with mixed greens and olive oil", 'lunch', 420, 36, 10, 26, 'pescatarian', ('fish',)),
+    Meal("Quinoa bowl with black beans and salsa", 'lunch', 500, 19, 78, 12, 'vegan'),
+    Meal("Turkey and avocado whole-wheat sandwich", 'lunch', 510, 32, 46, 21, 'omnivore', ('gluten',)),
+    Meal("Shrimp and vegetable rice noodles", 'lunch', 470, 28, 64, 10, 'pescatarian', ('shellfish', 'soy')),
+    Meal("Falafel bowl with hummus and tabbouleh", 'lunch', 560, 18, 66, 25, 'vegan', ('sesame', 'gluten')),
+    Meal("Chicken burrito bowl with brown rice", 'lunch', 590, 42, 68, 15, 'omnivore'),
+    Meal("Caprese salad with white beans", 'lunch', 430, 21, 30, 24, 'vegetarian', ('dairy',)),
+    Meal("Egg fried cauliflower rice", 'lunch', 350, 18, 20, 21, 'vegetarian', ('eggs', 'soy')),
+    Meal("Beef and vegetable soup", 'lunch', 400, 30, 32, 15, 'omnivore'),
+    Meal("Tempeh salad with peanut dressing", 'lunch', 520, 30, 34, 28, 'vegan', ('soy', 'peanuts')),
+    Meal("Baked potato with chili beans", 'lunch', 480, 18, 86, 6, 'vegan'),
+    Meal("Salmon poke bowl", 'lunch', 560, 34, 60, 18, 'pescatarian', ('fish', 'soy', 'sesame')),
+    Meal("Chicken Caesar lettuce wraps", 'lunch', 390, 35, 10, 22, 'omnivore', ('dairy', 'eggs', 'fish')),
+
+    Meal("Baked salmon with roasted vegetables", 'dinner', 560, 40, 28, 30, 'pescatarian', ('fish',)),
+    Meal("Turkey meatballs with zucchini noodles", 'dinner', 480, 38, 20, 26, 'omnivore', ('eggs',)),
+    Meal("Chicken stir-fry with brown rice", 'dinner', 610, 42, 70, 15, 'omnivore', ('soy',)),
+    Meal("Bean chili with a side salad", 'dinner', 520, 26, 72, 12, 'vegan'),
+    Meal("Shrimp with whole-wheat pasta and garlic", 'dinner', 590, 36, 72, 14, 'pescatarian', ('shellfish', 'gluten')),
+    Meal("Tofu and vegetable curry with rice", 'dinner', 600, 24, 78, 20, 'vegan', ('soy',)),
+    Meal("Grilled steak with sweet potato and greens", 'dinner', 650, 48, 45, 28, 'omnivore'),
+    Meal("Lentil and vegetable shepherd's pie", 'dinner', 540, 24, 80, 12, 'vegan'),
+    Meal("Baked cod with quinoa and asparagus", 'dinner', 480, 42, 42, 12, 'pescatarian', ('fish',)),
+    Meal("Chicken fajitas with peppers", 'dinner', 560, 44, 48, 20, 'omnivore', ('gluten',)),
+    Meal("Eggplant parmesan with side salad", 'dinner', 550, 22, 48, 28, 'vegetarian', ('dairy', 'gluten', 'eggs')),
+    Meal("Pork tenderloin with roasted carrots", 'dinner', 500, 44, 30, 20, 'omnivore'),
+    Meal("Mushroom risotto", 'dinner', 580, 14, 86, 18, 'vegetarian', ('dairy',)),
+    Meal("Chickpea and spinach stew", 'dinner', 460, 20, 62, 14, 'vegan'),
+    Meal("Lemon herb chicken with couscous", 'dinner', 590, 46, 58, 17, 'omnivore', ('gluten',)),
+    Meal("Black bean burgers with slaw", 'dinner', 530, 22, 70, 17, 'vegan', ('gluten',)),
+
+    Meal("Apple with almond butter", 'snack', 200, 5, 25, 10, 'vegan', ('nuts',)),
+    Meal("Carrots and hummus", 'snack', 150, 5, 18, 7, 'vegan', ('sesame',)),
+    Meal("Hard-boiled eggs", 'snack', 140, 12, 1, 10, 'vegetarian', ('eggs',)),
+    Meal("Protein shake", 'snack', 180, 30, 8, 3, 'vegetarian', ('dairy',)),
+    Meal("Mixed berries", 'snack', 80, 1, 19, 0.5, 'vegan'),
+    Meal("Roasted chickpeas", 'snack', 180, 9, 26, 5, 'vegan'),
+    Meal("Edamame", 'snack', 190, 17, 14, 8, 'vegan', ('soy',)),
+    Meal("Trail mix", 'snack', 280, 8, 24, 18, 'vegan', ('nuts', 'peanuts')),
+    Meal("Cheese and whole-grain crackers", 'snack', 220, 10, 18, 12, 'vegetarian', ('dairy', 'gluten')),
+    Meal("Rice cakes with avocado", 'snack', 170, 3, 22, 8, 'vegan')
+)
+
+# Words that name an allergen in free text, and the ways text says to avoid one
+_ALLERGEN_WORDS = {
+    'gluten': ('gluten', 'wheat'),
+    'dairy': ('dairy', 'milk', 'lactose', 'cheese'),
+    'eggs': ('egg', 'eggs'),
+    'nuts': ('nut', 'nuts', 'tree nut', 'tree nuts', 'almond', 'almonds', 'walnut', 'walnuts', 'cashew', 'cashews'),
+    'peanuts': ('peanut', 'peanuts'),
+    'soy': ('soy', 'soya', 'tofu'),
+    'fish': ('fish', 'seafood'),
+    'shellfish': ('shellfish', 'shrimp', 'prawn', 'prawns', 'seafood'),
+    'sesame': ('sesame',)
+}
+# Up to three words may come between "no"/"don't eat" and the allergen ("no tree nuts"), but
+# not across punctuation or a contrasting clause ("I eat no meat but love eggs"), and
+# "no problem with gluten" is not an avoidance
+_AVOID_BEFORE = (
+    r"(?:no(?!\s+(?:problem|problems|issue|issues|trouble)\b)|avoid|avoiding|without|allergic to|allergy to|"
+    r"intolerant to|can't eat|cannot eat|don't eat)\s+"
+    r"(?:(?!(?:but|though|although|however|yet|except|whereas|while)\b)\w+\s+){0,3}?"
+)
+_AVOID_AFTER = r"[- ]?(?:free|allergy|allergies|allergic|intolerance|intolerant)"
+_ALLERGEN_PATTERNS = {
+    allergen: re.compile(
+        r'\b(?:' + _AVOID_BEFORE + r'(?:' + '|'.join(words) + r')\b|(?:' + '|'.join(words) + r')' + _AVOID_AFTER + r')'
+    )
+    for allergen, words in _ALLERGEN_WORDS.items()
+}
+_CELIAC = re.compile(r'\b(?:celiac|coeliac)\b')
+_PREFERENCES = (
+    ('vegan', re.compile(r'\b(?:vegan|plant[- ]based)\b')),
+    ('vegetarian', re.compile(r'\b(?:vegetarian|veggie|no meat|meat[- ]free)\b')),
+    ('pescatarian', re.compile(r'\b(?:pescatarian|pescetarian)\b'))
+)
+_LOW_CARB = re.compile(r'\b(?:keto|ketogenic|low[- ]carb)\b')
+# "I'm not vegan" or "no longer vegetarian" names a preference the user does not have
+_NEGATED_BEFORE = re.compile(r"(?:\bnot|\bno longer|\bnever|n't)\s+(?:(?:a|an|really|strictly|fully)\s+)?$")
+
+# Every day has one of each main meal; a snack is optional
+MAIN_SLOTS = ('breakfast', 'lunch', 'dinner')
+MAINTENANCE_KCAL = 2000.0
+KCAL_PER_LB = 3500.0
+_WEEKS_PER_PERIOD = {'day': 1 / 7, 'week': 1.0, 'month': 4.345, 'year': 52.18}
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)\s*(day|week|month|year)')
+
+
+class NutritionTargets(NamedTuple):
+    kcal: float
+    protein: float
+    carbs: float
+    fat: float
+
+
+def parse_dietary(text: Optional[str]) -> DietaryInput:
+    """
+    Read a diet preference, restrictions and allergies from free text such as
+    "vegetarian, no nuts, lactose intolerant".
+    """
+    lowered = (text or '').lower()
+    preference = next((
+        name for name, pattern in _PREFERENCES
+        if any(not _NEGATED_BEFORE.search(lowered, 0, match.start()) for match in pattern.finditer(lowered))
+    ), 'none')
+    allergies = [allergen for allergen, pattern in _ALLERGEN_PATTERNS.items() if pattern.search(lowered)]
+    if _CELIAC.search(lowered) and 'gluten' not in allergies:
+        allergies.insert(0, 'gluten')
+    restrictions = ['low_carb'] if _LOW_CARB.search(lowered) else []
+    return DietaryInput(preference=preference, restrictions=restrictions, allergies=allergies)
+
+
+def nutrition_targets(goal: Optional[Dict[str, Any]]) -> NutritionTargets:
+    """
+    Daily calorie and macro targets (grams) for a goal from the goal analyzer.
+
+    Weight-loss goals take a deficit of 3500 kcal per lb per week at the goal's
+    pace (between 250 and 1000 kcal a day), weight gain a 250-500 kcal surplus.
+    Goals in kg or lbs set the pace; other goals assume 1 lb a week.
+    """
+    goal = goal or {}
+    goal_type = str(goal.get('goal_type') or '').lower()
+    weekly_lbs = 1.0
+    try:
+        quantity = float(goal.get('quantity'))
+        # Only weight goals set the pace; a waist goal in cm or inches keeps the default
+        unit = normalize_unit(str(goal.get('metric') or ''))
+        match = _DURATION.search(str(goal.get('duration') or ''))
+        if match and unit in ('kg', 'lbs'):
+            lbs = quantity / 0.45359237 if unit == 'kg' else quantity
+            weekly_lbs = lbs / max(float(match.group(1)) * _WEEKS_PER_PERIOD[match.group(2)], 1.0)
+    except (TypeError, ValueError):
+        pass
+    daily_change = weekly_lbs * KCAL_PER_LB / 7
+
+    if 'lose' in goal_type or 'loss' in goal_type:
+        kcal, split = MAINTENANCE_KCAL - min(max(daily_change, 250.0), 1000.0), (0.30, 0.40, 0.30)
+    elif 'gain' in goal_type or 'muscle' in goal_type:
+        kcal, split = MAINTENANCE_KCAL + min(max(daily_change, 250.0), 500.0), (0.25, 0.50, 0.25)
+    else:
+        kcal, split = MAINTENANCE_KCAL, (0.20, 0.50, 0.30)
+    kcal = max(kcal, 1200.0)
+    return NutritionTargets(kcal, kcal * split[0] / 4, kcal * split[1] / 4, kcal * split[2] / 9)
+
+
+class MealCatalog:
+    """
+    Local meal catalog indexed by slot, diet tags and allergens.
+
+    Each meal's diet tags and allergens are bitsets, so filtering a slot for a
+    set of constraints is two vectorized mask tests; filtered candidates are
+    cached per constraint set. assemble_week() builds a 7-day plan that meets
+    calorie and macro targets with no model call: each day scores every
+    breakfast, lunch, dinner and optional snack combination against the
+    targets at once and takes the best, with repeats penalized for variety
+    and a small seeded jitter so different seeds give varied plans while a
+    given seed always gives the same plan.
+    """
+
+    REPEAT_PENALTY = 0.15
+    JITTER = 0.03
+
+    def __init__(self, meals: Tuple[Meal, ...] = MEALS):
+        self.meals = list(meals)
+        self.nutrition = np.array([(m.kcal, m.protein, m.carbs, m.fat) for m in self.meals], dtype=np.float64)
+        self.allergen_bits = np.array(
+            [sum(ALLERGEN_BITS[a] for a in m.allergens) for m in self.meals], dtype=np.int64
+        )
+        self.tag_bits = np.array([self._tags(m) for m in self.meals], dtype=np.int64)
+        self.slot_indices = {
+            slot: np.array([i for i, m in enumerate(self.meals) if m.slot == slot], dtype=np.int64) for slot in SLOTS
+        }
+        self._candidates: Dict[Tuple[str, int, int], np.ndarray] = {}
+
+    @staticmethod
+    def _tags(meal: Meal) -> int:
+        tags = [*_DIET_LEVELS[meal.diet]]
+        if 'gluten' not in meal.allergens:
+            tags.append('gluten_free')
+        if 'dairy' not in meal.allergens:
+            tags.append('dairy_free')
+        if meal.carbs * 4 <= meal.kcal * 0.25:
+            tags.append('low_carb')
+        if meal.protein * 4 >= meal.kcal * 0.3:
+            tags.append('high_protein')
+        return sum(TAG_BITS[tag] for tag in tags)
+
+    @staticmethod
+    def constraint_bits(dietary: DietaryInput) -> Tuple[int, int]:
+        """
+        (required tag bits, excluded allergen bits) for dietary constraints.
+        """
+        required = [dietary.preference] if dietary.preference in TAG_BITS else []
+        required += [tag for tag in dietary.restrictions or () if tag in TAG_BITS]
+        excluded = [allergen for allergen in dietary.allergies or () if allergen in ALLERGEN_BITS]
+        return sum(TAG_BITS[tag] for tag in set(required)), sum(ALLERGEN_BITS[a] for a in set(excluded))
+
+    def candidates(self, slot: str, required: int, excluded: int) -> np.ndarray:
+        """
+        Indices of the meals in a slot that have every required tag and none of the excluded allergens.
+        """
+        key = (slot, required, excluded)
+        indices = self._candidates.get(key)
+        if indices is None:
+            slot_indices = self.slot_indices[slot]
+            mask = ((self.tag_bits[slot_indices] & required) == required) & ((self.allergen_bits[slot_indices] & excluded) == 0)
+            indices = self._candidates[key] = slot_indices[mask]
+        return indices
+
+    def assemble_week(self, dietary: DietaryInput, targets: NutritionTargets, seed: int = 0, days: int = 7) -> List[str]:
+        """
+        Build a plan of one line per day, "Day N: Breakfast: ..., Lunch: ..., Dinner: ...".
+        Raises ValueError if the constraints leave a main meal slot with no options.
+        """
+        required, excluded = self.constraint_bits(dietary)
+        options = {slot: self.candidates(slot, required, excluded) for slot in SLOTS}
+        empty = [slot for slot in MAIN_SLOTS if not len(options[slot])]
+        if empty:
+            raise ValueError(f"No {', '.join(empty)} options in the catalog for these dietary constraints")
+
+        # Candidate rows per slot; the extra all-zero row at index -1 is "no snack"
+        slot_meals = [options[slot] for slot in MAIN_SLOTS] + [np.append(options['snack'], -1)]
+        padded = np.vstack([self.nutrition, np.zeros(4)])
+        # Totals of every (breakfast, lunch, dinner, snack) combination, shape (B, L, D, S, 4)
+        totals = sum(
+            padded[indices].reshape((1,) * axis + (-1,) + (1,) * (3 - axis) + (4,))
+            for axis, indices in enumerate(slot_meals)
+        )
+        target = np.array(targets, dtype=np.float64)
+        # Calorie error counts double the average macro error
+        error = np.abs(totals - target) / target
+        base_score = error[..., 0] + error[..., 1:].mean(axis=-1) / 2
+
+        rng = np.random.default_rng(seed)
+        used = np.zeros(len(self.meals) + 1)
+        plan = []
+        for day in range(days):
+            # Repeat penalty and jitter are per meal, so they broadcast onto the grid slot by slot
+            cost = used * self.REPEAT_PENALTY + np.append(rng.random(len(self.meals)) * self.JITTER, 0.0)
+            score = base_score + sum(
+                cost[indices].reshape((1,) * axis + (-1,) + (1,) * (3 - axis))
+                for axis, indices in enumerate(slot_meals)
+            )
+            best = np.unravel_index(int(np.argmin(score)), score.shape)
+            chosen = [int(indices[position]) for indices, position in zip(slot_meals, best)]
+            used[[index for index in chosen if index >= 0]] += 1
+            plan.append(self._format_day(day + 1, chosen, totals[best]))
+        return plan
+
+    def _format_day(self, day: int, meal_indices: List[int], total: np.ndarray) -> str:
+        parts = [
+            f"{self.meals[index].slot.capitalize()}: {self.meals[index].name}"
+            for index in meal_indices if index >= 0
+        ]
+        kcal, protein, carbs, fat = (round(float(value)) for value in total)
+        return f"Day {day}: {', '.join(parts)} ({kcal} kcal; protein {protein} g, carbs {carbs} g, fat {fat} g)"
+
+
+_default_catalog: Optional[MealCatalog] = None
+
+
+def get_catalog() -> MealCatalog:
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = MealCatalog()
+    return _default_catalog
+
+
+class CatalogMealPlannerTool(Tool):
+    """
+    Meal planner that assembles plans from the local catalog instead of
+    writing them with the model. Targets come from context.goal and dietary
+    constraints from context.diet_preferences (or the profile); the seed is
+    derived from the goal and constraints alone, so users who ask for the same
+    thing get the same plan, which the tool cache and plan store then share.
+
+    The model is only used to reword the plan when MEAL_PLAN_REWORD is set,
+    or to write one if the constraints leave the catalog without options.
+    """
+
+    def __init__(self, catalog: Optional[MealCatalog] = None, reword: Optional[bool] = None):
+        super().__init__("MealPlanner", "Create 7-day meal plans from the local meal catalog")
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self.reword = reword if reword is not None else os.getenv('MEAL_PLAN_REWORD', '').lower() in ('1', 'true', 'yes')
+
+    def _inputs(self, context) -> Tuple[DietaryInput, NutritionTargets, int]:
+        dietary = parse_dietary(context.diet_preferences or context.user_profile)
+        targets = nutrition_targets(context.goal)
+        seed = zlib.crc32(f"{sorted((context.goal or {}).items())}|{dietary}".encode('utf-8'))
+        return dietary, targets, seed
+
+    def plan_key(self, context) -> Tuple[str, NutritionTargets, int]:
+        """
+        Everything the plan depends on; profile changes that leave it equal do not change the plan.
+        """
+        dietary, targets, seed = self._inputs(context)
+        return str(dietary), targets, seed
+
+    async def run(self, input, context):
+        dietary, targets, seed = self._inputs(context)
+        try:
+            plan = self.catalog.assemble_week(dietary, targets, seed=seed)
+        except ValueError:
+            text = await self.generate(input, stream=True)
+            return [line for line in text.splitlines() if line.strip()]
+        if self.reword:
+            plan = await self._reworded(plan)
+        return plan
+
+    async def _reworded(self, plan: List[str]) -> List[str]:
+        """
+        Ask the model for friendlier wording, keeping the catalog plan if the
+        answer fails or does not keep one line per day.
+        """
+        prompt = (
+            "Reword this 7-day meal plan in a warm, encouraging tone. Keep every dish and number, "
+            "and keep exactly one line per day starting with 'Day N:'.\n\n" + '\n'.join(plan)
+        )
+        try:
+            text = await self.generate(prompt, stream=True)
+        except Exception:
+            return plan
+        lines = [line for line in text.splitlines() if line.strip().lower().startswith('day ')]
+        return lines if len(lines) == len(plan) else plan
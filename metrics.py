@@ -0,0 +1,296 @@
+import atexit
+import bisect
+import contextlib
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from utils.deadline import check_deadline
+
+# Latency buckets in seconds, from cache hits up to slow LLM plan generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_INF_LABEL = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by labels.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, optionally split by labels.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = [(key, list(counts), total[0]) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            cumulative += counts[-1]
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, _INF_LABEL)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """
+        Write the rendered metrics to a file, replacing it atomically
+        (e.g. for the node exporter textfile collector).
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> Any:
+        """
+        Serve the metrics at http://host:port/metrics from a daemon thread.
+        Returns the http.server instance; call shutdown() on it to stop.
+        """
+        # Imported here so the HTTP server only loads when metrics are served
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    'wellness_stage_seconds', "Latency of process_input by the workflow stage it started in", ('stage',)
+)
+AGENT_LATENCY = REGISTRY.histogram('wellness_agent_run_seconds', "Latency of agent run() calls", ('agent',))
+TOOL_LATENCY = REGISTRY.histogram(
+    'wellness_tool_run_seconds', "Latency of tool run() calls, excluding results served from the cache", ('tool',)
+)
+LLM_LATENCY = REGISTRY.histogram('wellness_llm_request_seconds', "Latency of model API requests", ('model', 'status'))
+LLM_TOKENS = REGISTRY.counter('wellness_llm_tokens_total', "Tokens used by model requests", ('model',))
+ERRORS = REGISTRY.counter('wellness_errors_total', "Errors raised by stages, agents, tools and model requests", ('component', 'name'))
+HANDOFFS = REGISTRY.counter('wellness_handoffs_total', "Handoffs to specialist agents", ('agent',))
+COALESCED = REGISTRY.counter('wellness_tool_coalesced_total', "Tool requests that waited on an identical request in flight")
+GOAL_EXTRACTIONS = REGISTRY.counter(
+    'wellness_goal_extractions_total', "Goal-collection turns by path: the rule-based fast path or the model", ('path',)
+)
+CHECKINS = REGISTRY.counter('wellness_checkins_total', "Check-ins scheduled, cancelled, delivered and failed", ('event',))
+PLAN_DRAFTS = REGISTRY.counter(
+    'wellness_plan_drafts_total', "Speculative plan drafts by event: started, kept, restarted, used, missed, stale or expired",
+    ('event',)
+)
+STAGE_TIMEOUTS = REGISTRY.counter(
+    'wellness_stage_timeouts_total', "Stage turns that ran past their latency budget", ('stage', 'policy')
+)
+STAGE_FALLBACKS = REGISTRY.counter(
+    'wellness_stage_fallbacks_total',
+    "Degraded fallback responses by stage and reason: the stage budget ran out, or a nested call gave up on the deadline",
+    ('stage', 'reason')
+)
+
+_LATENCY_BY_COMPONENT = {'stage': STAGE_LATENCY, 'agent': AGENT_LATENCY, 'tool': TOOL_LATENCY}
+
+
+@contextlib.contextmanager
+def measure(component: str, name: str):
+    """
+    Time a stage, agent or tool call and count it as an error if it raises.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        ERRORS.inc(component=component, name=name)
+        raise
+    finally:
+        _LATENCY_BY_COMPONENT[component].observe(time.perf_counter() - start, **{component: name})
+
+
+class Metered:
+    """
+    Wraps an agent or tool so each run() is timed and its errors are counted.
+    Every other attribute is read from the wrapped object.
+    """
+
+    def __init__(self, target, component: str, name: str):
+        self.target = target
+        self.component = component
+        self.metric_name = name
+
+    async def run(self, input, context):
+        # Don't start work the stage has no time left to wait for
+        check_deadline(f"{self.component} {self.metric_name}")
+        with measure(self.component, self.metric_name):
+            return await self.target.run(input, context)
+
+    def __getattr__(self, name):
+        if name == 'target':
+            raise AttributeError(name)
+        return getattr(self.target, name)
+
+
+_export_lock = threading.Lock()
+_export_started = False
+
+
+def start_metrics_export(registry: MetricsRegistry = REGISTRY) -> Optional[Any]:
+    """
+    Start exporting metrics as configured by the environment:
+    METRICS_PORT serves them over HTTP on localhost (METRICS_HOST to change),
+    METRICS_FILE rewrites a file every METRICS_INTERVAL seconds and at exit.
+    Safe to call more than once. Returns the HTTP server, if one was started.
+    """
+    global _export_started
+    with _export_lock:
+        if _export_started:
+            return None
+        _export_started = True
+
+    server = None
+    port = os.getenv('METRICS_PORT')
+    if port:
+        server = registry.serve(int(port), os.getenv('METRICS_HOST', '127.0.0.1'))
+
+    path = os.getenv('METRICS_FILE')
+    if path:
+        interval = float(os.getenv('METRICS_INTERVAL', '15'))
+
+        def write_periodically():
+            while True:
+                time.sleep(interval)
+                registry.write(path)
+
+        threading.Thread(target=write_periodically, name="metrics-file", daemon=True).start()
+        atexit.register(registry.write, path)
+    return server
@@ -0,0 +1,183 @@
+import os
+import sys
+import threading
+import weakref
+from collections.abc import Sequence
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class Plan(Sequence):
+    """
+    A meal or workout plan held in a PlanStore: a read-only sequence of day
+    strings, each the store's single copy of that day's text.
+
+    Equal plans are one shared object, so a session holding a plan costs one
+    reference. Plans compare equal to lists and tuples of the same days.
+    """
+
+    __slots__ = ('days', '__weakref__')
+
+    def __init__(self, days: Tuple[str, ...]):
+        self.days = days
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self.days[index])
+        return self.days[index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.days)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Plan):
+            return self is other or self.days == other.days
+        if isinstance(other, (list, tuple)):
+            return self.days == tuple(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.days)
+
+    def __repr__(self) -> str:
+        # Same text as the list it replaces, e.g. when a plan is put in a response
+        return repr(list(self.days))
+
+    def __copy__(self) -> "Plan":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "Plan":
+        return self
+
+    def __reduce__(self):
+        return list, (list(self.days),)
+
+
+class _PlanRef(weakref.ref):
+    # Remembers what to release once its plan is gone, like WeakValueDictionary's KeyedRef
+    __slots__ = ('days',)
+
+    def __new__(cls, plan: Plan, callback):
+        self = super().__new__(cls, plan, callback)
+        self.days = plan.days
+        return self
+
+    def __init__(self, plan: Plan, callback):
+        super().__init__(plan, callback)
+
+
+class PlanStore:
+    """
+    Store for plan text shared by every session.
+
+    intern() keeps one copy of each distinct day and returns the shared Plan
+    for a list of days: users with identical plans hold the same object, and
+    plans that differ in a few days share the rest. Days are keyed by their
+    text, so a lookup costs a string hash Python caches on the string; days
+    are reference-counted by the plans that contain them, and a plan is
+    dropped as soon as no session holds it, so text nobody uses is freed.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        # Plans are keyed by their days; sessions hold the only strong references
+        self._plans: Dict[Tuple[str, ...], _PlanRef] = {}
+        # day text -> [the stored copy of the text, number of live plans containing it]
+        self._days: Dict[str, List[Any]] = {}
+        # Plans are released from weakref callbacks, which can run while this thread holds the lock
+        self._lock = threading.RLock()
+        self._stats = {'interned': 0, 'shared': 0}
+
+    def intern(self, days: Any) -> Any:
+        """
+        Return the shared Plan for a list of day strings. Values that are not
+        a list or tuple of strings (e.g. None or a plan the model wrote as one
+        string) are returned unchanged, as are all values when disabled.
+        """
+        if (not self.enabled or isinstance(days, Plan) or not isinstance(days, (list, tuple))
+                or not all(isinstance(day, str) for day in days)):
+            return days
+        key = tuple(days)
+        with self._lock:
+            self._stats['interned'] += 1
+            ref = self._plans.get(key)
+            plan = ref() if ref is not None else None
+            if plan is not None:
+                self._stats['shared'] += 1
+                return plan
+            stored = []
+            for day in key:
+                entry = self._days.get(day)
+                if entry is None:
+                    entry = self._days[day] = [day, 0]
+                entry[1] += 1
+                stored.append(entry[0])
+            plan = Plan(tuple(stored))
+            self._plans[plan.days] = _PlanRef(plan, self._release)
+        return plan
+
+    def _release(self, ref: _PlanRef):
+        # Runs once a plan is garbage, so it can no longer be handed out by intern()
+        with self._lock:
+            if self._plans.get(ref.days) is ref:
+                del self._plans[ref.days]
+            for day in ref.days:
+                entry = self._days[day]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._days[day]
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate bytes held by the store: day text, the live Plan objects and
+        the indexes over both. Sessions only hold references to these.
+        """
+        with self._lock:
+            size = sys.getsizeof(self._days) + sys.getsizeof(self._plans)
+            for text, entry in self._days.items():
+                size += sys.getsizeof(text) + sys.getsizeof(entry)
+            for days, ref in self._plans.items():
+                plan = ref()
+                size += sys.getsizeof(days) + sys.getsizeof(ref)
+                size += sys.getsizeof(plan) if plan is not None else 0
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Live plans and days, how often an interned plan already existed, and
+        the characters of day text stored versus what the live plans would
+        take if each kept its own copy of its days.
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats['plans'] = len(self._plans)
+            stats['days'] = len(self._days)
+            stats['stored_chars'] = sum(len(text) for text, _ in self._days.values())
+            stats['plan_chars'] = sum(len(day) for days in self._plans for day in days)
+        stats['hit_rate'] = stats['shared'] / stats['interned'] if stats['interned'] else 0.0
+        return stats
+
+
+_default_store: Optional[PlanStore] = None
+
+
+def get_plan_store() -> PlanStore:
+    """
+    Process-wide plan store. PLAN_DEDUP=0 keeps a separate copy of each plan per session.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = PlanStore(enabled=os.getenv('PLAN_DEDUP', '1').lower() not in ('0', 'false', 'no'))
+    return _default_store
+
+
+def plain(value: Any) -> Any:
+    """
+    A Plan as a plain list of day strings, e.g. for JSON; other values unchanged.
+    """
+    return list(value) if isinstance(value, Plan) else value
@@ -0,0 +1,257 @@
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, List, Mapping, Optional
+import numpy as np
+from progress_store import DAY_SECONDS, ProgressStore, normalize_unit
+
+# Rolling averages cover the last ROLLING_DAYS before each metric's latest
+# point; the weekly rate of change is a least-squares fit over TREND_DAYS
+ROLLING_DAYS = 7.0
+TREND_DAYS = 28.0
+
+_LOSE_WORDS = ('lose', 'loss', 'cut', 'reduce', 'lower')
+_GAIN_WORDS = ('gain', 'build', 'bulk', 'increase', 'muscle')
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+
+def _goal_direction(goal: Dict[str, Any]) -> int:
+    """
+    -1 for goals that bring the metric down, +1 for goals that raise it, 0 for a target value.
+    """
+    goal_type = str(goal.get('goal_type') or '').lower()
+    if any(word in goal_type for word in _LOSE_WORDS):
+        return -1
+    if any(word in goal_type for word in _GAIN_WORDS):
+        return 1
+    return 0
+
+
+def _goal_targets(users: List[Hashable], goals: Mapping[Hashable, Optional[dict]]):
+    """
+    Per user: (metric, direction, quantity) for goals with a known metric and quantity, else None.
+    """
+    targets = []
+    for uid in users:
+        goal = goals.get(uid) or {}
+        metric = normalize_unit(str(goal.get('metric') or ''))
+        try:
+            quantity = float(goal.get('quantity'))
+        except (TypeError, ValueError):
+            quantity = None
+        targets.append((metric, _goal_direction(goal), quantity) if metric and quantity is not None else None)
+    return targets
+
+
+def _streaks(user_index: np.ndarray, timestamps: np.ndarray, user_count: int, today: int):
+    """
+    Current and longest run of consecutive (UTC) days with at least one measurement, per user.
+    """
+    current = np.zeros(user_count, dtype=np.int64)
+    longest = np.zeros(user_count, dtype=np.int64)
+    last_day = np.full(user_count, -1, dtype=np.int64)
+    if not len(timestamps):
+        return current, longest, last_day
+
+    days = (timestamps // DAY_SECONDS).astype(np.int64)
+    # Sorted unique (user, day) pairs
+    keys = np.sort(user_index.astype(np.int64) << 32 | (days - days.min()))
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    day_users = keys >> 32
+    day_numbers = (keys & 0xFFFFFFFF) + days.min()
+
+    # A run breaks where the user changes or a day is skipped
+    breaks = np.ones(len(keys), dtype=bool)
+    breaks[1:] = (day_users[1:] != day_users[:-1]) | (day_numbers[1:] != day_numbers[:-1] + 1)
+    run_starts = np.flatnonzero(breaks)
+    run_lengths = np.diff(np.append(run_starts, len(keys)))
+    run_users = day_users[run_starts]
+    run_last_days = day_numbers[run_starts + run_lengths - 1]
+
+    np.maximum.at(longest, run_users, run_lengths)
+    # Runs are ordered by day within each user, so the last run per user is the latest
+    is_last = np.ones(len(run_starts), dtype=bool)
+    is_last[:-1] = run_users[1:] != run_users[:-1]
+    last_users = run_users[is_last]
+    last_day[last_users] = run_last_days[is_last]
+    # A streak is still current if the user logged today or yesterday
+    alive = run_last_days[is_last] >= today - 1
+    current[last_users[alive]] = run_lengths[is_last][alive]
+    return current, longest, last_day
+
+
+def analyze_many(
+    stores: Mapping[Hashable, ProgressStore],
+    goals: Optional[Mapping[Hashable, Optional[dict]]] = None,
+    now: Optional[float] = None,
+    rolling_days: float = ROLLING_DAYS,
+    trend_days: float = TREND_DAYS
+) -> Dict[Hashable, Dict[str, Any]]:
+    """
+    Progress analytics for many users at once, e.g. {uid: context.progress_store}.
+
+    Every user's measurements are concatenated and each statistic is computed
+    in one vectorized pass over all (user, metric) series: the rolling average,
+    the weekly rate of change, the projected date of reaching the goal quantity
+    (goals as returned by the goal analyzer, keyed like stores) and the
+    current and longest streaks of consecutive days with measurements.
+    """
+    now = time.time() if now is None else now
+    goals = goals or {}
+    users = list(stores)
+    user_stores = [stores[uid] for uid in users]
+
+    # Concatenate every store's columns, mapping per-store metric ids to global ones
+    metric_lookup: Dict[str, int] = {}
+    user_parts, metric_parts, ts_parts, value_parts = [], [], [], []
+    for index, store in enumerate(user_stores):
+        if not len(store):
+            continue
+        local_to_global = np.array(
+            [metric_lookup.setdefault(metric, len(metric_lookup)) for metric in store.metrics], dtype=np.int64
+        )
+        metric_ids = np.frombuffer(store.metric_ids, dtype=np.uint16)
+        user_parts.append(np.full(len(metric_ids), index, dtype=np.int64))
+        metric_parts.append(local_to_global[metric_ids])
+        ts_parts.append(np.frombuffer(store.timestamps, dtype=np.float64))
+        value_parts.append(np.frombuffer(store.values, dtype=np.float64))
+    metric_names = sorted(metric_lookup, key=metric_lookup.get)
+
+    results: Dict[Hashable, Dict[str, Any]] = {uid: {'metrics': {}, 'goal': None, 'streak': None} for uid in users}
+    if not ts_parts:
+        for uid in users:
+            results[uid]['streak'] = {'current_days': 0, 'longest_days': 0, 'last_logged': None}
+        return results
+
+    user_index = np.concatenate(user_parts)
+    metric_index = np.concatenate(metric_parts)
+    timestamps = np.concatenate(ts_parts)
+    values = np.concatenate(value_parts)
+
+    # Sort into contiguous (user, metric) series, oldest point first
+    order = np.lexsort((timestamps, metric_index, user_index))
+    user_index, metric_index = user_index[order], metric_index[order]
+    timestamps, values = timestamps[order], values[order]
+    series_key = user_index * len(metric_names) + metric_index
+    starts = np.flatnonzero(np.r_[True, series_key[1:] != series_key[:-1]])
+    ends = np.r_[starts[1:], len(series_key)]
+    series_of_point = np.repeat(np.arange(len(starts)), ends - starts)
+    series_users = user_index[starts]
+    series_metrics = metric_index[starts]
+
+    first_values = values[starts]
+    latest_values = values[ends - 1]
+    latest_ts = timestamps[ends - 1]
+    # Days before the series' latest point (<= 0)
+    age_days = (timestamps - latest_ts[series_of_point]) / DAY_SECONDS
+
+    # Rolling average over the last rolling_days
+    in_rolling = age_days > -rolling_days
+    rolling_count = np.bincount(series_of_point, weights=in_rolling)
+    rolling_mean = np.bincount(series_of_point, weights=values * in_rolling) / rolling_count
+
+    # Least-squares slope (per day) and fitted latest value over the last trend_days
+    weight = (age_days > -trend_days).astype(np.float64)
+    n = np.bincount(series_of_point, weights=weight)
+    sx = np.bincount(series_of_point, weights=weight * age_days)
+    sy = np.bincount(series_of_point, weights=weight * values)
+    sxx = np.bincount(series_of_point, weights=weight * age_days * age_days)
+    sxy = np.bincount(series_of_point, weights=weight * age_days * values)
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denominator > 1e-9, (n * sxy - sx * sy) / denominator, np.nan)
+        fitted = np.where(np.isnan(slope), latest_values, (sy - slope * sx) / n)
+
+    # Goal projection for the series that match each user's goal metric
+    targets = _goal_targets(users, goals)
+    target = np.full(len(starts), np.nan)
+    direction = np.zeros(len(starts))
+    for position, (uid_index, metric_id) in enumerate(zip(series_users.tolist(), series_metrics.tolist())):
+        goal_target = targets[uid_index]
+        if goal_target is None or metric_names[metric_id] != goal_target[0]:
+            continue
+        _, goal_direction, quantity = goal_target
+        if goal_direction:
+            target[position] = first_values[position] + goal_direction * quantity
+            direction[position] = goal_direction
+        else:
+            target[position] = quantity
+            direction[position] = np.sign(quantity - first_values[position]) or 1.0
+    has_goal = ~np.isnan(target)
+    reached = has_goal & (direction * (fitted - target) >= 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_to_goal = (target - fitted) / slope
+    on_track = has_goal & ~reached & np.isfinite(days_to_goal) & (days_to_goal > 0)
+    projected_ts = latest_ts + np.where(on_track, days_to_goal, 0.0) * DAY_SECONDS
+
+    current, longest, last_day = _streaks(user_index, timestamps, len(users), int(now // DAY_SECONDS))
+
+    weekly_change = np.round(slope * 7, 3)
+    rolling_mean = np.round(rolling_mean, 3)
+    points = ends - starts
+    # Plain Python values from here on; indexing numpy arrays per item is slow
+    columns = zip(
+        series_users.tolist(), series_metrics.tolist(), latest_values.tolist(), latest_ts.tolist(),
+        rolling_mean.tolist(), weekly_change.tolist(), points.tolist(), has_goal.tolist()
+    )
+    for position, (user, metric_id, latest, latest_at, mean, change, count, goal_series) in enumerate(columns):
+        result = results[users[user]]
+        metric = metric_names[metric_id]
+        result['metrics'][metric] = {
+            'latest': latest,
+            'latest_at': _isoformat(latest_at),
+            'rolling_mean': mean,
+            'weekly_change': None if change != change else change,
+            'points': count
+        }
+        if goal_series:
+            result['goal'] = {
+                'metric': metric,
+                'target': round(float(target[position]), 3),
+                'reached': bool(reached[position]),
+                'projected_date': _isoformat(float(projected_ts[position]))[:10] if on_track[position] else None
+            }
+    for uid, current_days, longest_days, last in zip(users, current.tolist(), longest.tolist(), last_day.tolist()):
+        results[uid]['streak'] = {
+            'current_days': current_days,
+            'longest_days': longest_days,
+            'last_logged': _isoformat(last * DAY_SECONDS)[:10] if last >= 0 else None
+        }
+    return results
+
+
+def analyze(store: ProgressStore, goal: Optional[dict] = None, now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Progress analytics for one user; see analyze_many.
+    """
+    return analyze_many({0: store}, {0: goal}, now=now)[0]
+
+
+def describe(analysis: Dict[str, Any]) -> str:
+    """
+    Plain-text answer to a numeric progress question, built from analyze() output.
+    """
+    if not analysis['metrics']:
+        return "📊 No measurements logged yet. Share one like 'weighed 180 lbs' or 'walked 8000 steps' to start tracking."
+    lines = ["📊 **Your progress:**"]
+    for metric, stats in analysis['metrics'].items():
+        line = f"- {metric}: latest {stats['latest']:g}, {ROLLING_DAYS:g}-day average {stats['rolling_mean']:g}"
+        if stats['weekly_change'] is not None:
+            line += f", {stats['weekly_change']:+g} per week"
+        lines.append(line)
+    goal = analysis['goal']
+    if goal is not None:
+        if goal['reached']:
+            lines.append(f"🎯 You've reached your goal of {goal['target']:g} {goal['metric']}!")
+        elif goal['projected_date']:
+            lines.append(f"🎯 At this rate you'll reach {goal['target']:g} {goal['metric']} around {goal['projected_date']}.")
+        else:
+            lines.append(f"🎯 Goal: {goal['target']:g} {goal['metric']}. Your recent trend isn't heading there yet; keep logging to update the projection.")
+    streak = analysis['streak']
+    if streak['current_days']:
+        lines.append(f"🔥 Current streak: {streak['current_days']} day(s) in a row (best: {streak['longest_days']}).")
+    else:
+        lines.append(f"🔥 Best streak: {streak['longest_days']} day(s). Log today to start a new one!")
+    return '\n'.join(lines)
@@ -0,0 +1,216 @@
+import base64
+import re
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+DAY_SECONDS = 86400.0
+
+# Units a measurement can be logged in; the unit doubles as the metric name,
+# matching the metrics accepted by guardrails.GoalInput where they overlap
+_UNIT_ALIASES = {
+    'kg': 'kg', 'kgs': 'kg', 'kilo': 'kg', 'kilos': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'lb': 'lbs', 'lbs': 'lbs', 'pound': 'lbs', 'pounds': 'lbs',
+    'cm': 'cm', 'centimeter': 'cm', 'centimeters': 'cm',
+    'inch': 'inches', 'inches': 'inches',
+    'steps': 'steps',
+    'min': 'minutes', 'mins': 'minutes', 'minute': 'minutes', 'minutes': 'minutes',
+    'km': 'km', 'kms': 'km', 'kilometer': 'km', 'kilometers': 'km',
+    'mile': 'miles', 'miles': 'miles'
+}
+# Thousands separators ("8,000 steps") are dropped; a comma is only a decimal
+# point when one or two digits follow it ("82,4 kg")
+_MEASUREMENT_PATTERN = re.compile(
+    r'(?<![\d.,])(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+|,\d{1,2}(?!\d))?)\s*('
+    + '|'.join(sorted(_UNIT_ALIASES, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+# "lost 5 pounds" or "up 2 kg" is a change, not a reading ("down to 82 kg" is a reading)
+_RELATIVE_BEFORE = re.compile(
+    r'\b(?:lose|losing|lost|gain|gaining|gained|drop|dropping|dropped|down|up)\s+'
+    r'(?:(?:another|about|around|almost|over|nearly)\s+)?$',
+    re.IGNORECASE
+)
+
+
+def normalize_unit(unit: str) -> Optional[str]:
+    """
+    Return the metric name for a unit such as 'pounds' or 'kg', or None if unknown.
+    """
+    return _UNIT_ALIASES.get(unit.strip().lower()) if unit else None
+
+
+def parse_measurements(text: str) -> List[Tuple[str, float]]:
+    """
+    Extract numeric measurements such as '180 lbs' or '8,000 steps' from free text.
+    Relative changes such as 'lost 5 pounds' are skipped, since they are not readings.
+    Returns (metric, value) pairs in the order they appear.
+    """
+    measurements = []
+    for match in _MEASUREMENT_PATTERN.finditer(text):
+        if _RELATIVE_BEFORE.search(text, 0, match.start()):
+            continue
+        number, unit = match.groups()
+        if ',' in number and '.' not in number and len(number.rsplit(',', 1)[1]) <= 2:
+            number = number.replace(',', '.')
+        measurements.append((_UNIT_ALIASES[unit.lower()], float(number.replace(',', ''))))
+    return measurements
+
+
+class ProgressStore:
+    """
+    Compact columnar store for numeric progress measurements.
+    
+    Timestamps, metric ids and values live in typed arrays (8 + 2 + 8 bytes per
+    point) instead of a list of dicts, and appends are amortized O(1). When the
+    store grows past max_points, points older than raw_days are downsampled to
+    one mean per metric per bucket_days, points older than retention_days are
+    dropped, and if it is still too large the oldest points are dropped.
+    """
+    
+    def __init__(
+        self,
+        max_points: int = 1000,
+        raw_days: float = 90,
+        bucket_days: float = 7,
+        retention_days: Optional[float] = 730
+    ):
+        self.max_points = max_points
+        self.raw_days = raw_days
+        self.bucket_days = bucket_days
+        self.retention_days = retention_days
+        self.timestamps = array('d')
+        self.metric_ids = array('H')
+        self.values = array('d')
+        self.metrics: List[str] = []
+        self._metric_index: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def _metric_id(self, metric: str) -> int:
+        metric_id = self._metric_index.get(metric)
+        if metric_id is None:
+            metric_id = self._metric_index[metric] = len(self.metrics)
+            self.metrics.append(metric)
+        return metric_id
+    
+    def append(self, metric: str, value: float, timestamp: Optional[float] = None):
+        """
+        Record one measurement. timestamp is seconds since the epoch (default: now).
+        """
+        self.timestamps.append(time.time() if timestamp is None else timestamp)
+        self.metric_ids.append(self._metric_id(metric))
+        self.values.append(float(value))
+        if len(self.values) > self.max_points:
+            self.compact()
+    
+    def compact(self, now: Optional[float] = None):
+        """
+        Apply retention and downsampling, leaving at most 3/4 of max_points so
+        the next compaction is many appends away.
+        """
+        now = time.time() if now is None else now
+        raw_cutoff = now - self.raw_days * DAY_SECONDS
+        drop_cutoff = now - self.retention_days * DAY_SECONDS if self.retention_days is not None else float('-inf')
+        bucket_seconds = self.bucket_days * DAY_SECONDS
+        
+        # (metric id, bucket) -> [timestamp sum, value sum, count]
+        buckets: Dict[Tuple[int, int], List[float]] = {}
+        recent = []
+        for ts, metric_id, value in zip(self.timestamps, self.metric_ids, self.values):
+            if ts < drop_cutoff:
+                continue
+            if ts < raw_cutoff:
+                bucket = buckets.setdefault((metric_id, int(ts // bucket_seconds)), [0.0, 0.0, 0])
+                bucket[0] += ts
+                bucket[1] += value
+                bucket[2] += 1
+            else:
+                recent.append((ts, metric_id, value))
+        
+        points = [(ts_sum / count, metric_id, value_sum / count)
+                  for (metric_id, _), (ts_sum, value_sum, count) in buckets.items()]
+        points.sort()
+        points += recent
+        keep = (self.max_points * 3) // 4
+        if len(points) > keep:
+            points = points[-keep:]
+        
+        self.timestamps = array('d', (p[0] for p in points))
+        self.metric_ids = array('H', (p[1] for p in points))
+        self.values = array('d', (p[2] for p in points))
+    
+    def series(self, metric: str) -> Tuple[array, array]:
+        """
+        Return (timestamps, values) for one metric, oldest first.
+        """
+        metric_id = self._metric_index.get(metric)
+        timestamps, values = array('d'), array('d')
+        if metric_id is None:
+            return timestamps, values
+        for ts, mid, value in zip(self.timestamps, self.metric_ids, self.values):
+            if mid == metric_id:
+                timestamps.append(ts)
+                values.append(value)
+        return timestamps, values
+    
+    def summary(self, window_days: float = 7, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Summarize each metric over the last window_days, for the live context.
+        """
+        now = time.time() if now is None else now
+        window_start = now - window_days * DAY_SECONDS
+        stats: Dict[int, Dict[str, Any]] = {}
+        for ts, metric_id, value in zip(self.timestamps, self.metric_ids, self.values):
+            entry = stats.setdefault(metric_id, {'latest': value, 'latest_ts': ts, 'window': []})
+            if ts >= entry['latest_ts']:
+                entry['latest'], entry['latest_ts'] = value, ts
+            if ts >= window_start:
+                entry['window'].append((ts, value))
+        
+        summary = {}
+        for metric_id, entry in stats.items():
+            window = sorted(entry['window'])
+            metric_summary = {
+                'latest': entry['latest'],
+                'latest_at': datetime.fromtimestamp(entry['latest_ts'], timezone.utc).isoformat(timespec='seconds'),
+                'window_days': window_days,
+                'window_count': len(window)
+            }
+            if window:
+                metric_summary['window_mean'] = round(sum(v for _, v in window) / len(window), 3)
+                metric_summary['window_change'] = round(window[-1][1] - window[0][1], 3)
+            summary[self.metrics[metric_id]] = metric_summary
+        return summary
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize to a JSON-friendly dict with the arrays base64-encoded.
+        """
+        return {
+            'metrics': list(self.metrics),
+            'timestamps': base64.b64encode(self.timestamps.tobytes()).decode('ascii'),
+            'metric_ids': base64.b64encode(self.metric_ids.tobytes()).decode('ascii'),
+            'values': base64.b64encode(self.values.tobytes()).decode('ascii'),
+            'max_points': self.max_points,
+            'raw_days': self.raw_days,
+            'bucket_days': self.bucket_days,
+            'retention_days': self.retention_days
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ProgressStore':
+        store = cls(
+            max_points=data['max_points'],
+            raw_days=data['raw_days'],
+            bucket_days=data['bucket_days'],
+            retention_days=data['retention_days']
+        )
+        for metric in data['metrics']:
+            store._metric_id(metric)
+        store.timestamps.frombytes(base64.b64decode(data['timestamps']))
+        store.metric_ids.frombytes(base64.b64decode(data['metric_ids']))
+        store.values.frombytes(base64.b64decode(data['values']))
+        return store
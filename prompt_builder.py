@@ -0,0 +1,176 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+# Context tokens per prompt, on top of the instruction itself
+DEFAULT_PROMPT_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '800'))
+
+CHARS_PER_TOKEN = 4
+
+# Context sections in priority order; structured fields are always kept verbatim
+STRUCTURED_FIELDS = (
+    ('goal', "Goal"),
+    ('diet_preferences', "Diet preferences"),
+    ('injury_notes', "Injury notes")
+)
+SECTIONS = ('profile', 'progress', 'handoffs')
+
+# Fields each compacted section is built from, for the compaction cache key
+_SECTION_FIELDS = {
+    'profile': ('user_profile',),
+    'progress': ('progress_logs', 'progress_summary'),
+    'handoffs': ('handoff_logs',)
+}
+_HISTORY_FIELDS = tuple(field for fields in _SECTION_FIELDS.values() for field in fields)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count used for budgets and quota accounting (about four characters per token).
+    """
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """
+    Cut text to about max_tokens, at a word boundary, marking the cut with an ellipsis.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 1:
+        return ''
+    cut = text[:max_chars - 1]
+    space = cut.rfind(' ')
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + '…'
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, dict):
+        return json.dumps({key: value[key] for key in value if value[key] is not None}, sort_keys=True, default=str)
+    return str(value)
+
+
+def _format_measurement(metric: str, summary: Dict[str, Any]) -> str:
+    text = f"{metric} {summary['latest']:g}"
+    if 'window_change' in summary:
+        text += f" ({summary['window_change']:+g} over {summary['window_days']:g} days)"
+    return text
+
+
+class PromptBuilder:
+    """
+    Assembles model prompts from the session context within a token budget.
+
+    The instruction and the structured fields (goal, diet preferences, injury
+    notes) are kept verbatim. The rest of the budget goes to the compacted
+    sections in order: the free-text profile (truncated to profile_tokens),
+    then progress and handoff history, where the latest recent_entries are kept
+    and older entries are summarized into a count. The rendered context and
+    each compacted section are cached on the context and only rebuilt when
+    the fields they come from change.
+    """
+
+    def __init__(self, budget: int = DEFAULT_PROMPT_BUDGET, profile_tokens: int = 200, recent_entries: int = 3):
+        self.budget = budget
+        self.profile_tokens = profile_tokens
+        self.recent_entries = recent_entries
+        self._stats = {'builds': 0, 'compactions': 0, 'cache_hits': 0, 'context_tokens': 0, 'dropped_tokens': 0}
+
+    def build(self, context, instruction: str, sections: Tuple[str, ...] = SECTIONS, budget: Optional[int] = None) -> str:
+        """
+        Return the instruction followed by as much of the context as fits in the budget.
+        """
+        if budget is None:
+            budget = self.budget
+        stats = self._stats
+        stats['builds'] += 1
+        cache = context.prompt_cache
+        # Whole-context fast path: nothing changed since the last build with these settings.
+        # The entry keeps the finished suffix and its token count, so a hit only concatenates.
+        version = context.version
+        cached = cache.get((sections, budget))
+        if cached is not None and cached[0] == version:
+            stats['cache_hits'] += len(sections)
+            _, suffix, tokens = cached
+        else:
+            context_text = self._render(context, cache, sections, budget)
+            suffix = f"\n\nUser context:\n{context_text}" if context_text else ''
+            tokens = estimate_tokens(context_text) if context_text else 0
+            cache[(sections, budget)] = (version, suffix, tokens)
+        if not suffix:
+            return instruction
+        stats['context_tokens'] += tokens
+        return instruction + suffix
+
+    def _render(self, context, cache: Dict[Any, Any], sections: Tuple[str, ...], budget: int) -> str:
+        lines = []
+        for field, label in STRUCTURED_FIELDS:
+            value = getattr(context, field)
+            if value:
+                lines.append(f"{label}: {_format_value(value)}")
+        remaining = budget - sum(estimate_tokens(line) for line in lines)
+
+        versions = dict(zip(_HISTORY_FIELDS, context.field_versions(*_HISTORY_FIELDS)))
+        for section in sections:
+            compacted = self._compacted(context, cache, section, versions)
+            if not compacted:
+                continue
+            tokens = estimate_tokens(compacted)
+            if tokens > remaining:
+                self._stats['dropped_tokens'] += tokens - max(remaining, 0)
+                compacted = truncate(compacted, remaining)
+                if not compacted:
+                    continue
+            lines.append(compacted)
+            remaining -= estimate_tokens(compacted)
+        return '\n'.join(lines)
+
+    def _compacted(self, context, cache: Dict[Any, Any], section: str, versions: Dict[str, int]) -> str:
+        """
+        Compacted text for a section, reused while its fields are unchanged.
+        """
+        fields = _SECTION_FIELDS[section]
+        key = tuple((versions[field], len(getattr(context, field) or ())) for field in fields)
+        cached = cache.get(section)
+        if cached is not None and cached[0] == key:
+            self._stats['cache_hits'] += 1
+            return cached[1]
+        self._stats['compactions'] += 1
+        text = getattr(self, f'_compact_{section}')(context)
+        cache[section] = (key, text)
+        return text
+
+    def _compact_profile(self, context) -> str:
+        if not context.user_profile:
+            return ''
+        return f"Profile: {truncate(context.user_profile, self.profile_tokens)}"
+
+    def _compact_progress(self, context) -> str:
+        parts: List[str] = []
+        if context.progress_summary:
+            measurements = ', '.join(
+                _format_measurement(metric, summary) for metric, summary in sorted(context.progress_summary.items())
+            )
+            parts.append(f"Measurements: {measurements}")
+        logs = context.progress_logs
+        if logs:
+            recent = logs[-self.recent_entries:]
+            older = len(logs) - len(recent)
+            entries = '; '.join(truncate(entry.get('input', ''), 40) for entry in recent)
+            parts.append(f"Recent check-ins: {entries}" + (f" (plus {older} earlier)" if older else ''))
+        return "Progress: " + '. '.join(parts) if parts else ''
+
+    def _compact_handoffs(self, context) -> str:
+        logs = context.handoff_logs
+        if not logs:
+            return ''
+        recent = logs[-self.recent_entries:]
+        older = len(logs) - len(recent)
+        entries = '; '.join(truncate(entry, 30) for entry in recent)
+        return f"Recent handoffs: {entries}" + (f" (plus {older} earlier)" if older else '')
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
@@ -0,0 +1,325 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional
+from context import UserSessionContext
+from plan_store import Plan, get_plan_store
+from session_store import SessionStore, SQLiteSessionStore
+from workflow_orchestrator import HealthWellnessWorkflow, WorkflowComponents
+
+
+class SessionState:
+    """
+    Per-user state kept for each session: the context and the workflow stage.
+    saved_version and saved_stage record what the backing store already holds.
+    """
+    __slots__ = ('context', 'current_stage', 'sent_version', 'saved_version', 'saved_stage', 'last_active')
+    
+    def __init__(self, context: UserSessionContext, current_stage: str = 'user_starts_chat', saved: bool = False):
+        self.context = context
+        self.current_stage = current_stage
+        self.sent_version = 0
+        self.saved_version = context.version if saved else 0
+        self.saved_stage = current_stage if saved else None
+        self.last_active = time.monotonic()
+
+
+def _deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Approximate the memory held by an object and everything it references.
+    """
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, Plan):
+        # Plan text lives in the shared plan store; the session only holds a reference
+        return 0
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(_deep_sizeof(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    if hasattr(obj, '__dict__'):
+        size += _deep_sizeof(obj.__dict__, seen)
+    private = getattr(obj, '__pydantic_private__', None)
+    if private:
+        size += _deep_sizeof(private, seen)
+    return size
+
+
+class SessionManager:
+    """
+    Hosts many concurrent user sessions keyed by uid.
+    
+    Only per-user state (context and stage) is stored for each session. The
+    agents and tools are built once and shared by every session. Sessions idle
+    for longer than idle_timeout seconds are moved to the backing store and
+    restored on their next request.
+    
+    The default store is SQLite at SESSION_DB_PATH. Durable stores are written
+    through after every turn with only the fields that turn changed, so
+    sessions survive restarts and are restored on their first request.
+    """
+    
+    def __init__(
+        self,
+        components: Optional[WorkflowComponents] = None,
+        store: Optional[SessionStore] = None,
+        idle_timeout: float = 1800.0,
+        response_mode: str = 'full'
+    ):
+        self._components = components
+        self.store = store if store is not None else SQLiteSessionStore(os.getenv('SESSION_DB_PATH', 'sessions.db'))
+        self.idle_timeout = idle_timeout
+        self.response_mode = response_mode
+        self._sessions: "OrderedDict[int, SessionState]" = OrderedDict()
+        self._turn_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._persist_lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.created = 0
+        self.restored = 0
+        self.evicted = 0
+        self._creation_seconds = 0.0
+    
+    @property
+    def components(self) -> WorkflowComponents:
+        """
+        Shared agents and tools, built on first use.
+        """
+        if self._components is None:
+            self._components = WorkflowComponents()
+        return self._components
+    
+    def _get_state(self, uid: int) -> SessionState:
+        with self._lock:
+            state = self._sessions.get(uid)
+            if state is not None:
+                self._sessions.move_to_end(uid)
+                state.last_active = time.monotonic()
+                return state
+        
+        restored = self.store.load(uid)
+        start = time.perf_counter()
+        with self._lock:
+            # Another request may have created the session while we were loading
+            state = self._sessions.get(uid)
+            if state is None:
+                if restored is not None:
+                    state = SessionState(*restored, saved=True)
+                    self.restored += 1
+                else:
+                    state = SessionState(UserSessionContext(uid=uid))
+                    self.created += 1
+                    self._creation_seconds += time.perf_counter() - start
+                self._sessions[uid] = state
+        
+        self._maybe_evict_idle()
+        return state
+    
+    def workflow_for(self, uid: int) -> HealthWellnessWorkflow:
+        """
+        Bind a session's state to the shared components.
+        Call save_workflow() afterwards to record the new stage.
+        """
+        state = self._get_state(uid)
+        workflow = HealthWellnessWorkflow(
+            response_mode=self.response_mode,
+            components=self.components,
+            context=state.context,
+            current_stage=state.current_stage
+        )
+        workflow._sent_version = state.sent_version
+        return workflow
+    
+    def save_workflow(self, uid: int, workflow: HealthWellnessWorkflow):
+        state = self._record(uid, workflow)
+        if self.store.durable:
+            self._persist(uid, state)
+    
+    async def _save_workflow(self, uid: int, workflow: HealthWellnessWorkflow):
+        """
+        save_workflow() for the async paths: the durable store is written from a
+        worker thread so a slow disk doesn't hold up every other session's turn.
+        Callers hold the turn lock, so the session isn't changed while it is written.
+        """
+        state = self._record(uid, workflow)
+        if self.store.durable:
+            await asyncio.to_thread(self._persist, uid, state)
+    
+    def _record(self, uid: int, workflow: HealthWellnessWorkflow) -> SessionState:
+        with self._lock:
+            state = self._sessions.get(uid)
+            if state is None:
+                state = self._sessions[uid] = SessionState(workflow.context)
+            state.context = workflow.context
+            state.current_stage = workflow.current_stage
+            state.sent_version = workflow._sent_version
+            state.last_active = time.monotonic()
+        return state
+    
+    def _persist(self, uid: int, state: SessionState):
+        """
+        Write the fields changed since the last save to the backing store.
+        """
+        # Eviction can persist a session on the loop while a turn's save runs in a worker thread
+        with self._persist_lock:
+            context, current_stage = state.context, state.current_stage
+            version = context.version
+            stage_changed = current_stage != state.saved_stage
+            if state.saved_stage is None:
+                # Never stored before: write the whole session once
+                self.store.save(uid, context, current_stage)
+            elif version != state.saved_version or stage_changed:
+                self.store.save_changes(uid, context, current_stage, state.saved_version, stage_changed=stage_changed)
+            else:
+                return
+            state.saved_version = version
+            state.saved_stage = current_stage
+    
+    def _turn_lock(self, uid: int) -> asyncio.Lock:
+        """
+        The lock that serializes turns and check-ins for uid. It is kept apart from
+        the session state, so a session evicted and restored during a turn keeps
+        the same lock, and held weakly, so it only exists while a turn holds or waits for it.
+        """
+        with self._lock:
+            lock = self._turn_locks.get(uid)
+            if lock is None:
+                lock = self._turn_locks[uid] = asyncio.Lock()
+            return lock
+    
+    async def process_input(self, uid: int, user_input: str, full_context: bool = False) -> Dict[str, Any]:
+        """
+        Process user input for one session.
+        """
+        async with self._turn_lock(uid):
+            workflow = self.workflow_for(uid)
+            try:
+                return await workflow.process_input(user_input, full_context=full_context)
+            finally:
+                await self._save_workflow(uid, workflow)
+    
+    async def process_input_stream(self, uid: int, user_input: str, full_context: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process user input for one session, yielding chunks as they are produced.
+        """
+        async with self._turn_lock(uid):
+            workflow = self.workflow_for(uid)
+            try:
+                async for chunk in workflow.process_input_stream(user_input, full_context=full_context):
+                    yield chunk
+            finally:
+                await self._save_workflow(uid, workflow)
+    
+    async def deliver_checkin(self, uid: int, message: str) -> Dict[str, Any]:
+        """
+        Deliver a scheduled check-in to one session and return the response for the user.
+        It waits for a turn the user has in flight, so the stage change it makes is
+        neither lost when that turn saves nor applied to the middle of the turn.
+        """
+        async with self._turn_lock(uid):
+            workflow = self.workflow_for(uid)
+            try:
+                return await workflow.handle_checkin(message)
+            finally:
+                await self._save_workflow(uid, workflow)
+    
+    def get_stage(self, uid: int) -> str:
+        return self._get_state(uid).current_stage
+    
+    def get_context(self, uid: int) -> UserSessionContext:
+        return self._get_state(uid).context
+    
+    def release(self, uid: int):
+        """
+        Move a session to the backing store now instead of waiting for it to go idle.
+        """
+        with self._lock:
+            state = self._sessions.pop(uid, None)
+        if state is None:
+            return
+        if self.store.durable:
+            self._persist(uid, state)
+        else:
+            self.store.save(uid, state.context, state.current_stage)
+    
+    def reset(self, uid: int):
+        """
+        Drop a session so the user starts fresh.
+        """
+        with self._lock:
+            self._sessions.pop(uid, None)
+        self.store.delete(uid)
+        self.components.speculator.discard(uid)
+        self.components.background_stages.discard(uid)
+    
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Move sessions idle for longer than idle_timeout to the backing store.
+        Returns the number of sessions evicted.
+        """
+        now = now if now is not None else time.monotonic()
+        idle = []
+        with self._lock:
+            # Sessions are kept in least-recently-used order, so stop at the first active one
+            for uid, state in self._sessions.items():
+                if now - state.last_active < self.idle_timeout:
+                    break
+                idle.append((uid, state))
+            for uid, _ in idle:
+                del self._sessions[uid]
+            self.evicted += len(idle)
+        
+        for uid, state in idle:
+            if self.store.durable:
+                self._persist(uid, state)
+            else:
+                self.store.save(uid, state.context, state.current_stage)
+        return len(idle)
+    
+    def _maybe_evict_idle(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.idle_timeout / 10:
+            self._last_sweep = now
+            self.evict_idle(now)
+    
+    def session_memory(self, uid: int) -> int:
+        """
+        Approximate bytes held in memory by one session. Its plans are not
+        included: they live in the shared plan store, which stats() reports.
+        """
+        with self._lock:
+            state = self._sessions.get(uid)
+        return _deep_sizeof(state) if state is not None else 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Session counts and memory. avg_session_bytes leaves out plans, which are
+        shared through the plan store; plan_store_bytes is the whole store and
+        avg_plan_bytes each active session's share of it.
+        """
+        with self._lock:
+            active = len(self._sessions)
+            sample = list(self._sessions.values())[-100:]
+        plan_store_bytes = get_plan_store().memory_bytes()
+        return {
+            'active_sessions': active,
+            'created': self.created,
+            'restored': self.restored,
+            'evicted': self.evicted,
+            'avg_creation_us': self._creation_seconds / self.created * 1e6 if self.created else 0.0,
+            'avg_session_bytes': sum(_deep_sizeof(state) for state in sample) / len(sample) if sample else 0,
+            'plan_store_bytes': plan_store_bytes,
+            'avg_plan_bytes': plan_store_bytes / active if active else 0
+        }
+    
+    def __len__(self):
+        return len(self._sessions)
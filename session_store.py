@@ -0,0 +1,183 @@
+import json
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, Optional, Tuple
+from context import UserSessionContext
+from progress_store import ProgressStore
+
+
+class SessionStore:
+    """
+    Backing store for sessions evicted from memory.
+    
+    A session is the user's UserSessionContext plus the workflow stage they are in.
+    Durable stores are written after every turn; others only receive idle
+    sessions evicted from memory.
+    """
+    
+    durable = False
+    
+    def save_changes(
+        self,
+        uid: int,
+        context: UserSessionContext,
+        current_stage: str,
+        since_version: int,
+        stage_changed: bool = True
+    ):
+        """
+        Persist what changed in the session after context version since_version.
+        Stores that cannot write partial updates save the whole session.
+        """
+        self.save(uid, context, current_stage)
+    
+    def save(self, uid: int, context: UserSessionContext, current_stage: str):
+        raise NotImplementedError("Subclasses must implement save()")
+    
+    def load(self, uid: int) -> Optional[Tuple[UserSessionContext, str]]:
+        raise NotImplementedError("Subclasses must implement load()")
+    
+    def delete(self, uid: int):
+        raise NotImplementedError("Subclasses must implement delete()")
+
+
+def encode_session(context: UserSessionContext, current_stage: str) -> bytes:
+    """
+    Serialize a session to compressed JSON.
+    """
+    payload = {'context': context.snapshot(), 'current_stage': current_stage}
+    if context.has_progress_store():
+        payload['progress_store'] = context.progress_store.to_dict()
+    return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+
+def decode_session(data: bytes) -> Tuple[UserSessionContext, str]:
+    payload: Dict[str, Any] = json.loads(zlib.decompress(data).decode('utf-8'))
+    context = UserSessionContext(**payload['context'])
+    if 'progress_store' in payload:
+        context.progress_store = ProgressStore.from_dict(payload['progress_store'])
+    return context, payload['current_stage']
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Keeps evicted sessions as compressed JSON blobs, which are far smaller
+    than the live pydantic objects.
+    """
+    
+    def __init__(self):
+        self._blobs: Dict[int, bytes] = {}
+        self._lock = threading.Lock()
+    
+    def save(self, uid: int, context: UserSessionContext, current_stage: str):
+        blob = encode_session(context, current_stage)
+        with self._lock:
+            self._blobs[uid] = blob
+    
+    def load(self, uid: int) -> Optional[Tuple[UserSessionContext, str]]:
+        with self._lock:
+            blob = self._blobs.get(uid)
+        return decode_session(blob) if blob is not None else None
+    
+    def delete(self, uid: int):
+        with self._lock:
+            self._blobs.pop(uid, None)
+    
+    def __len__(self):
+        return len(self._blobs)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Durable session store backed by SQLite in WAL mode.
+    
+    Each context field is its own row, so a turn only rewrites the fields it
+    changed instead of re-serializing the whole session. Sessions are read
+    back lazily, one uid at a time, when first requested.
+    """
+    
+    durable = True
+    
+    # Pseudo-fields stored next to the context fields
+    STAGE_FIELD = '_current_stage'
+    PROGRESS_FIELD = '_progress_store'
+    
+    def __init__(self, path: str = 'sessions.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_fields ("
+            "uid INTEGER NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (uid, field)) WITHOUT ROWID"
+        )
+    
+    def _write(self, uid: int, fields: Dict[str, Any]):
+        rows = [(uid, field, json.dumps(value, separators=(',', ':'))) for field, value in fields.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO session_fields (uid, field, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (uid, field) DO UPDATE SET value = excluded.value",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def save(self, uid: int, context: UserSessionContext, current_stage: str):
+        fields = context.snapshot()
+        fields[self.STAGE_FIELD] = current_stage
+        if context.has_progress_store():
+            fields[self.PROGRESS_FIELD] = context.progress_store.to_dict()
+        self._write(uid, fields)
+    
+    def save_changes(
+        self,
+        uid: int,
+        context: UserSessionContext,
+        current_stage: str,
+        since_version: int,
+        stage_changed: bool = True
+    ):
+        fields = context.changes_since(since_version)
+        if stage_changed:
+            fields[self.STAGE_FIELD] = current_stage
+        # The progress store is updated in place; its summary changes whenever it does
+        if 'progress_summary' in fields and context.has_progress_store():
+            fields[self.PROGRESS_FIELD] = context.progress_store.to_dict()
+        if fields:
+            self._write(uid, fields)
+    
+    def load(self, uid: int) -> Optional[Tuple[UserSessionContext, str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT field, value FROM session_fields WHERE uid = ?", (uid,)
+            ).fetchall()
+        if not rows:
+            return None
+        fields = {field: json.loads(value) for field, value in rows}
+        current_stage = fields.pop(self.STAGE_FIELD, 'user_starts_chat')
+        progress = fields.pop(self.PROGRESS_FIELD, None)
+        known = UserSessionContext.model_fields
+        context = UserSessionContext(**{field: value for field, value in fields.items() if field in known})
+        if progress is not None:
+            context.progress_store = ProgressStore.from_dict(progress)
+        return context, current_stage
+    
+    def delete(self, uid: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM session_fields WHERE uid = ?", (uid,))
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT uid) FROM session_fields").fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+from metrics import PLAN_DRAFTS
+
+logger = logging.getLogger(__name__)
+
+# Drafts nobody collected within this many seconds are cancelled
+DEFAULT_DRAFT_TTL = float(os.getenv('SPECULATIVE_PLAN_TTL', '900'))
+
+
+class Draft(NamedTuple):
+    key: Hashable
+    task: asyncio.Task
+    started: float
+
+
+class PlanSpeculator:
+    """
+    Runs plan tools speculatively in the background, before the user asks for plans.
+
+    Each draft is stored per (uid, plan) with the key of the inputs it was
+    generated from. Starting a draft whose key matches the current one keeps
+    it; a different key cancels it and starts over. take() hands a draft over
+    only if its key still matches, so plan generation never uses a draft built
+    from stale inputs. Drafts run in an empty contextvars context, so they
+    never write into the stream of the turn that started them.
+
+    Disabled unless enabled is True or SPECULATIVE_PLANS is set.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, ttl: float = DEFAULT_DRAFT_TTL):
+        self.enabled = enabled if enabled is not None else os.getenv('SPECULATIVE_PLANS', '').lower() in ('1', 'true', 'yes')
+        self.ttl = ttl
+        self._drafts: "OrderedDict[Hashable, Dict[str, Draft]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'started': 0, 'kept': 0, 'restarted': 0, 'used': 0, 'missed': 0, 'stale': 0, 'expired': 0}
+
+    def _count(self, event: str):
+        self._stats[event] += 1
+        PLAN_DRAFTS.inc(event=event)
+
+    def speculate(self, uid: Hashable, name: str, key: Hashable, run: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        Start a draft of plan name for uid from inputs identified by key, unless
+        one from the same inputs is already running or done. Returns True if a
+        new draft was started.
+        """
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            drafts = self._drafts.setdefault(uid, {})
+            self._drafts.move_to_end(uid)
+            current = drafts.get(name)
+            if current is not None and current.key == key and not current.task.cancelled():
+                self._count('kept')
+                return False
+            if current is not None:
+                current.task.cancel()
+                self._count('restarted')
+            # A fresh context keeps the draft out of the current turn's stream
+            task = contextvars.Context().run(asyncio.ensure_future, run())
+            task.add_done_callback(_log_failure)
+            drafts[name] = Draft(key, task, now)
+            self._count('started')
+            return True
+
+    def take(self, uid: Hashable, name: str, key: Hashable) -> Optional[asyncio.Task]:
+        """
+        Remove and return the draft of plan name for uid if it was built from
+        inputs matching key, else cancel it and return None.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            drafts = self._drafts.get(uid)
+            draft = drafts.pop(name, None) if drafts is not None else None
+            if drafts is not None and not drafts:
+                del self._drafts[uid]
+            if draft is None:
+                self._count('missed')
+                return None
+            if draft.key != key or draft.task.cancelled():
+                draft.task.cancel()
+                self._count('stale')
+                self._count('missed')
+                return None
+            self._count('used')
+            return draft.task
+
+    def discard(self, uid: Hashable):
+        """
+        Cancel every draft for uid, e.g. when the session is reset.
+        """
+        with self._lock:
+            drafts = self._drafts.pop(uid, {})
+        for draft in drafts.values():
+            draft.task.cancel()
+
+    def _expire(self, now: float):
+        # Users are kept in order of their latest draft, so stop at the first fresh one
+        while self._drafts:
+            uid, drafts = next(iter(self._drafts.items()))
+            if any(now - draft.started < self.ttl for draft in drafts.values()):
+                break
+            del self._drafts[uid]
+            for draft in drafts.values():
+                draft.task.cancel()
+                self._count('expired')
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(drafts) for drafts in self._drafts.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        taken = stats['used'] + stats['missed']
+        stats['hit_rate'] = stats['used'] / taken if taken else 0.0
+        return stats
+
+
+def _log_failure(task: asyncio.Task):
+    # Retrieve the exception so a failed draft is logged once instead of warned about at exit
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Speculative plan draft failed: %r", task.exception())
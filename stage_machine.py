@@ -0,0 +1,226 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional, Tuple
+
+# Shielded stage work nobody collected within this many seconds is cancelled
+DEFAULT_BACKGROUND_TTL = float(os.getenv('STAGE_BACKGROUND_TTL', '900'))
+
+CANCEL = 'cancel'
+SHIELD = 'shield'
+
+
+class Stage(NamedTuple):
+    """
+    One row of the workflow's stage table.
+
+    handler: HealthWellnessWorkflow method that handles a turn in this stage.
+    budget: seconds the turn may take, or None for no deadline.
+    on_timeout: CANCEL stops the handler and keeps the user in this stage;
+        SHIELD lets it finish in the background and returns its result on
+        the user's next turn in this stage.
+    fallback: response sent instead when the budget runs out.
+    next: stages the handler may move the user to.
+    takes_input: whether the handler is passed the user's input.
+    args: extra arguments for the handler.
+    """
+    handler: str
+    budget: Optional[float]
+    on_timeout: str
+    fallback: str
+    next: Tuple[str, ...] = ()
+    takes_input: bool = True
+    args: Tuple = ()
+
+
+class Redirect(Exception):
+    """
+    Raised by a stage handler to hand the turn to another stage, which then
+    runs under that stage's own budget and timeout policy.
+    """
+
+    def __init__(self, stage: str):
+        super().__init__(stage)
+        self.stage = stage
+
+
+class _Watchdog:
+    """
+    One timer per event loop for every StageTimer on it. Entering and leaving
+    a stage only adds to and removes from a set; the loop is woken once, at
+    the earliest expiry, instead of scheduling and cancelling a timer per turn.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.timers: set = set()
+        self._handle: Optional[asyncio.TimerHandle] = None
+        # When the scheduled wake-up is due, or infinity if none is scheduled
+        self._when = float('inf')
+
+    def add(self, timer: "StageTimer"):
+        self.timers.add(timer)
+        if timer.expires < self._when:
+            self._schedule(timer.expires)
+
+    def _schedule(self, when: float):
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self.loop.call_at(when, self._fire)
+        self._when = when
+
+    def _fire(self):
+        self._handle = None
+        self._when = float('inf')
+        now = self.loop.time()
+        due = [timer for timer in self.timers if timer.expires <= now]
+        for timer in due:
+            self.timers.discard(timer)
+            timer._expire()
+        if self.timers:
+            self._schedule(min(timer.expires for timer in self.timers))
+
+
+_watchdogs: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Watchdog]" = weakref.WeakKeyDictionary()
+# The last loop's watchdog, checked before the weak dictionary: almost every turn runs on the same loop
+_last_watchdog: Optional[_Watchdog] = None
+
+
+def _watchdog_for(loop: asyncio.AbstractEventLoop) -> _Watchdog:
+    global _last_watchdog
+    watchdog = _last_watchdog
+    if watchdog is None or watchdog.loop is not loop:
+        watchdog = _watchdogs.get(loop)
+        if watchdog is None:
+            watchdog = _watchdogs[loop] = _Watchdog(loop)
+        _last_watchdog = watchdog
+    return watchdog
+
+
+class StageTimer:
+    """
+    Cancels the running task when budget seconds have passed, like
+    asyncio.timeout() on Python 3.11+. After the block, timed_out tells
+    whether the cancellation it ended with was the timer's; that one is
+    swallowed, any other cancellation propagates.
+    """
+
+    __slots__ = ('budget', 'expired', 'timed_out', 'expires', '_task', '_watchdog')
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expired = False
+        self.timed_out = False
+
+    def __enter__(self) -> "StageTimer":
+        loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self.expires = loop.time() + self.budget
+        self._watchdog = _watchdog_for(loop)
+        self._watchdog.add(self)
+        return self
+
+    def _expire(self):
+        self.expired = True
+        self._task.cancel()
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._watchdog.timers.discard(self)
+        if not self.expired:
+            return False
+        # Python 3.11+ counts cancellation requests; take back the one the timer made
+        uncancel = getattr(self._task, 'uncancel', None)
+        if uncancel is not None:
+            uncancel()
+        self.timed_out = exc_type is asyncio.CancelledError
+        return self.timed_out
+
+
+def stage_budget(stage: str, default: Optional[float]) -> Optional[float]:
+    """
+    Latency budget for a stage: STAGE_BUDGET_<STAGE> if set (0 or 'none'
+    turns the deadline off), else STAGE_BUDGET, else default.
+    """
+    value = os.getenv(f"STAGE_BUDGET_{stage.upper()}", os.getenv('STAGE_BUDGET'))
+    if value is None:
+        return default
+    if value.strip().lower() in ('', '0', 'none', 'off'):
+        return None
+    return float(value)
+
+
+class Background(NamedTuple):
+    stage: str
+    task: asyncio.Task
+    started: float
+
+
+class BackgroundStages:
+    """
+    Stage turns that ran past their budget under the SHIELD policy and keep
+    running, one per user. The next turn in the same stage collects the
+    result instead of starting the work again.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_BACKGROUND_TTL):
+        self.ttl = ttl
+        self._tasks: "OrderedDict[Hashable, Background]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def keep(self, uid: Hashable, stage: str, task: asyncio.Task):
+        now = time.monotonic()
+        task.add_done_callback(_retrieve_exception)
+        with self._lock:
+            self._expire(now)
+            previous = self._tasks.pop(uid, None)
+            self._tasks[uid] = Background(stage, task, now)
+        if previous is not None and previous.task is not task:
+            previous.task.cancel()
+
+    def take(self, uid: Hashable, stage: str) -> Optional[asyncio.Task]:
+        """
+        Remove and return uid's background work if it belongs to stage or
+        has finished (its handler may have moved the user on), else cancel it
+        and return None.
+        """
+        with self._lock:
+            if not self._tasks:
+                return None
+            background = self._tasks.pop(uid, None)
+        if background is None or background.task.cancelled():
+            return None
+        if background.stage != stage and not background.task.done():
+            background.task.cancel()
+            return None
+        return background.task
+
+    def discard(self, uid: Hashable):
+        """
+        Cancel uid's background work, e.g. when the session is reset.
+        """
+        with self._lock:
+            background = self._tasks.pop(uid, None)
+        if background is not None:
+            background.task.cancel()
+
+    def _expire(self, now: float):
+        # Kept in the order they were started, so stop at the first fresh one
+        while self._tasks:
+            uid, background = next(iter(self._tasks.items()))
+            if now - background.started < self.ttl:
+                break
+            del self._tasks[uid]
+            background.task.cancel()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tasks)
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # Mark a failure as retrieved so work nobody collects is not warned about at exit
+    if not task.cancelled():
+        task.exception()
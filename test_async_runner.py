@@ -0,0 +1,54 @@
+import asyncio
+import concurrent.futures
+import threading
+import pytest
+from utils.async_runner import BackgroundEventLoop, get_background_loop, run_async
+
+
+def test_run_async_reuses_one_loop_across_calls_and_threads():
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    first = run_async(current_loop())
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        loops = list(pool.map(lambda _: run_async(current_loop()), range(8)))
+    assert all(loop is first for loop in loops)
+    assert get_background_loop().loop is first
+
+
+def test_state_created_on_the_loop_stays_warm():
+    runner = BackgroundEventLoop()
+    try:
+        lock_holder = {}
+
+        async def create():
+            lock_holder['lock'] = asyncio.Lock()
+
+        async def use():
+            async with lock_holder['lock']:
+                return True
+
+        runner.run(create())
+        assert runner.run(use())
+    finally:
+        runner.stop()
+    assert not runner.is_running()
+
+
+def test_timeout_cancels_the_coroutine():
+    runner = BackgroundEventLoop()
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    try:
+        with pytest.raises(concurrent.futures.TimeoutError):
+            runner.run(hang(), timeout=0.05)
+        assert cancelled.wait(1)
+    finally:
+        runner.stop()
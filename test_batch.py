@@ -0,0 +1,60 @@
+import asyncio
+import json
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+from batch import BatchCheckpoint, record_uid, run_batch
+from test_session_manager import _shared_components
+
+
+def _write_input(path, records):
+    path.write_text("\n".join(records) + "\n")
+
+
+def test_batch_runs_records_and_streams_results(tmp_path):
+    input_path, output_path = tmp_path / 'intake.jsonl', tmp_path / 'results.jsonl'
+    record = {'initial': "i am fat", 'goals': "lose 5kg", 'profile': "beginner"}
+    _write_input(input_path, [json.dumps(dict(record, id=f"emp-{i}")) for i in range(5)] + ["", "not json"])
+    manager = SessionManager(components=_shared_components(), store=InMemorySessionStore())
+
+    report = asyncio.run(run_batch(str(input_path), str(output_path), manager=manager, concurrency=2))
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert sorted(result['line'] for result in results) == [0, 1, 2, 3, 4, 6]
+    done = [result for result in results if 'error' not in result]
+    assert len(done) == 5
+    assert all(result['meal_plan'] == ['meal day'] * 7 for result in done)
+    assert all(result['stage'] == 'real_time_delivery' for result in done)
+    assert report.succeeded == 5 and report.failed == 1
+    assert len(manager) == 0
+
+
+def test_batch_resumes_from_checkpoint(tmp_path):
+    input_path, output_path = tmp_path / 'intake.jsonl', tmp_path / 'results.jsonl'
+    checkpoint_path = str(tmp_path / 'results.ckpt')
+    _write_input(input_path, [json.dumps({'id': i, 'initial': "i am fat"}) for i in range(6)])
+
+    checkpoint = BatchCheckpoint(checkpoint_path)
+    for line_no in (0, 1, 4):
+        checkpoint.mark_done(line_no)
+    assert checkpoint.watermark == 2 and checkpoint.done == {4}
+
+    manager = SessionManager(components=_shared_components(), store=InMemorySessionStore())
+    report = asyncio.run(run_batch(str(input_path), str(output_path), manager=manager, checkpoint_path=checkpoint_path))
+
+    assert sorted(json.loads(line)['id'] for line in output_path.read_text().splitlines()) == [2, 3, 5]
+    assert report.skipped == 3
+    assert BatchCheckpoint(checkpoint_path).watermark == 6
+
+
+def test_kept_sessions_are_keyed_by_record_not_line(tmp_path):
+    input_path, output_path = tmp_path / 'intake.jsonl', tmp_path / 'results.jsonl'
+    _write_input(input_path, [json.dumps({'id': "emp-1", 'initial': "i am fat"}), json.dumps({'initial': "i am fat"})])
+    manager = SessionManager(components=_shared_components(), store=InMemorySessionStore())
+
+    asyncio.run(run_batch(str(input_path), str(output_path), manager=manager, keep_sessions=True))
+
+    first, second = sorted((json.loads(line) for line in output_path.read_text().splitlines()), key=lambda result: result['line'])
+    assert first['uid'] == record_uid({'id': "emp-1"}, 7, keep_sessions=True) != 0
+    assert manager.get_stage(first['uid']) == 'goal_collection'
+    assert "uid or id" in second['error']
+    assert record_uid({'uid': 42}, 0, keep_sessions=True) == 42 and record_uid({}, 3, keep_sessions=False) == 3
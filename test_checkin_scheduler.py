@@ -0,0 +1,203 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import pytest
+import checkin_scheduler
+from checkin_scheduler import (
+    CheckinDispatcher, CheckinSchedulerTool, CheckinStore, is_cancel_request, parse_schedule, session_dispatcher
+)
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+from test_session_manager import _shared_components
+
+# Sunday 18 October 2026, 10:30 local time
+NOW = time.mktime((2026, 10, 18, 10, 30, 0, 0, 0, -1))
+DAY = 86400.0
+
+
+def test_schedules_are_parsed_from_text():
+    monday = parse_schedule("remind me every Monday at 8am", NOW)
+    assert monday.interval == 7 * DAY and monday.due_ts == time.mktime((2026, 10, 19, 8, 0, 0, 0, 0, -1))
+    assert parse_schedule("check in daily at 7:30pm", NOW).due_ts == time.mktime((2026, 10, 18, 19, 30, 0, 0, 0, -1))
+    assert parse_schedule("every 3 days", NOW)[:2] == (NOW + 3 * DAY, 3 * DAY)
+    assert parse_schedule("in 2 hours", NOW)[:2] == (NOW + 7200, 0.0)
+    assert parse_schedule("schedule a check-in", NOW)[:2] == (NOW + 7 * DAY, 7 * DAY)
+
+
+def test_claims_are_at_most_once_across_restarts(tmp_path):
+    path = str(tmp_path / 'checkins.db')
+    store = CheckinStore(path)
+    store.add(1, NOW - 10)
+    store.add(2, NOW - 5, interval=DAY)
+    store.add(3, NOW + 60)
+
+    assert [c.uid for c in store.claim_due(NOW)] == [1, 2]
+    store.close()
+
+    # A restarted process sees the claims: the one-off is gone, the recurring one moved on
+    restarted = CheckinStore(path)
+    assert restarted.claim_due(NOW) == []
+    assert [(c.uid, c.due_ts) for c in restarted.for_user(2)] == [(2, NOW - 5 + DAY)]
+    # Missed occurrences are skipped rather than fired in a burst
+    assert [c.uid for c in restarted.claim_due(NOW + 3.5 * DAY)] == [3, 2]
+    assert restarted.for_user(2)[0].due_ts == NOW - 5 + 4 * DAY
+    assert restarted.next_due() == NOW - 5 + 4 * DAY
+
+
+def test_dispatcher_delivers_in_batches(tmp_path):
+    store = CheckinStore(str(tmp_path / 'checkins.db'))
+    store.add_many([(uid, NOW - uid, 0.0, "Check in") for uid in range(25)])
+    delivered = []
+
+    async def deliver(checkin):
+        if checkin.uid == 7:
+            raise RuntimeError("push failed")
+        delivered.append(checkin.uid)
+
+    dispatcher = CheckinDispatcher(store, deliver, batch_size=10, clock=lambda: NOW)
+    assert asyncio.run(dispatcher.dispatch_due()) == 24
+    assert delivered[0] == 24 and len(delivered) == 24
+    assert dispatcher.stats() == {'batches': 3, 'delivered': 24, 'failed': 1}
+    assert store.count() == 0
+
+    # run() sleeps until woken by a check-in scheduled through the same store
+    live = CheckinDispatcher(store, deliver, poll_interval=30.0)
+
+    async def run():
+        task = asyncio.create_task(live.run())
+        await asyncio.sleep(0.01)
+        store.add(99, time.time())
+        for _ in range(100):
+            if 99 in delivered:
+                break
+            await asyncio.sleep(0.01)
+        live.stop()
+        await asyncio.wait_for(task, timeout=1)
+
+    asyncio.run(run())
+    assert delivered[-1] == 99
+
+
+def test_checkins_are_scheduled_and_delivered_through_the_workflow(tmp_path):
+    store = CheckinStore(str(tmp_path / 'checkins.db'))
+    components = _shared_components()
+    components.tools['checkin_scheduler'] = CheckinSchedulerTool(store=store)
+    manager = SessionManager(components=components, store=InMemorySessionStore())
+    responses = {}
+
+    async def run():
+        workflow = manager.workflow_for(4)
+        workflow.current_stage = 'ongoing_support'
+        manager.save_workflow(4, workflow)
+        scheduled = await manager.process_input(4, "Please schedule a check-in every day")
+        dispatcher = session_dispatcher(manager, lambda uid, response: responses.update({uid: response}), store=store)
+        await dispatcher.dispatch_due(now=store.next_due())
+        return scheduled
+
+    scheduled = asyncio.run(run())
+    assert scheduled['response'].startswith("📅 Check-in scheduled: every day")
+    assert "wellness check-in" in responses[4]['response']
+    assert manager.get_stage(4) == 'progress_tracking'
+    assert len(store.for_user(4)) == 1
+
+
+def test_cancel_requests_and_repeated_rules(tmp_path):
+    store = CheckinStore(str(tmp_path / 'checkins.db'))
+    tool = CheckinSchedulerTool(store=store)
+    context = SimpleNamespace(uid=5)
+    assert asyncio.run(tool.run("remind me every Monday at 8am", context)).startswith("Check-in scheduled: every Monday")
+    assert asyncio.run(tool.run("check in every monday at 8am please", context)).startswith("You already have")
+    assert asyncio.run(tool.run("schedule a daily check-in", context)).startswith("Check-in scheduled: every day")
+    assert asyncio.run(tool.run("a daily check-in", context)).startswith("You already have")
+    assert len(store.for_user(5)) == 2
+
+    assert asyncio.run(tool.run("please cancel my check-ins", context)) == "Cancelled 2 check-ins."
+    assert store.for_user(5) == []
+    assert asyncio.run(tool.run("no more check-ins please", context)) == "You have no check-ins scheduled."
+    assert store.for_user(5) == []
+
+
+def test_only_requests_to_stop_check_ins_cancel_them():
+    for text in ("please cancel my check-ins", "no more check-ins please", "stop my daily check-ins",
+                 "turn my reminders off", "please don't schedule any more check-ins"):
+        assert is_cancel_request(text), text
+    for text in ("remind me at the end of each week", "remind me every day to stop snacking",
+                 "I don't want to fall off track, schedule a daily check-in",
+                 "schedule a check-in every friday so I do not need to remember"):
+        assert not is_cancel_request(text), text
+
+
+def test_checkins_wait_for_the_turn_in_flight():
+    components = _shared_components()
+    manager = SessionManager(components=components, store=InMemorySessionStore())
+    release = asyncio.Event()
+
+    async def slow_reply(prompt, context):
+        await release.wait()
+        return "Keep going!"
+
+    components.main_agent.run = AsyncMock(side_effect=slow_reply)
+
+    async def run():
+        workflow = manager.workflow_for(6)
+        workflow.current_stage = 'ongoing_support'
+        manager.save_workflow(6, workflow)
+        turn = asyncio.create_task(manager.process_input(6, "How am I doing?"))
+        await asyncio.sleep(0)
+        checkin = asyncio.create_task(manager.deliver_checkin(6, "Time for your wellness check-in!"))
+        await asyncio.sleep(0.01)
+        assert not checkin.done()
+        release.set()
+        await asyncio.gather(turn, checkin)
+
+    asyncio.run(run())
+    # The turn saved before the check-in ran, so the check-in's stage change is kept
+    assert manager.get_stage(6) == 'progress_tracking'
+
+
+def test_a_dispatcher_for_one_user_leaves_other_users_check_ins(tmp_path):
+    store = CheckinStore(str(tmp_path / 'checkins.db'))
+    store.add_many([(1, NOW - 10, 0.0, "Check in"), (2, NOW - 20, 0.0, "Check in"), (1, NOW + 60, 0.0, "Later")])
+    delivered = []
+
+    async def deliver(checkin):
+        delivered.append(checkin.uid)
+
+    dispatcher = CheckinDispatcher(store, deliver, clock=lambda: NOW, uid=1)
+    assert asyncio.run(dispatcher.dispatch_due()) == 1
+    assert delivered == [1] and [c.uid for c in store.for_user(2)] == [2]
+    assert store.next_due(1) == NOW + 60 and store.next_due() == NOW - 20
+
+
+def test_zero_intervals_and_stopped_dispatchers_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        parse_schedule("every 0 days", NOW)
+    store = CheckinStore(str(tmp_path / 'checkins.db'))
+    tool = CheckinSchedulerTool(store=store)
+    assert asyncio.run(tool.run("check in every 0 days", SimpleNamespace(uid=1))).startswith("I couldn't schedule that")
+    assert store.count() == 0
+
+    async def deliver(checkin):
+        pass
+
+    async def run():
+        dispatcher = CheckinDispatcher(store, deliver, poll_interval=30.0)
+        task = asyncio.create_task(dispatcher.run())
+        await asyncio.sleep(0)
+        assert len(store._listeners) == 1
+        dispatcher.stop()
+        await asyncio.wait_for(task, timeout=1)
+
+    asyncio.run(run())
+    assert store._listeners == []
+
+
+def test_the_default_store_is_only_reported_once_it_exists(tmp_path, monkeypatch):
+    monkeypatch.setenv('CHECKIN_DB_PATH', str(tmp_path / 'checkins.db'))
+    monkeypatch.setattr(checkin_scheduler, '_default_store', None)
+    assert not checkin_scheduler.has_default_store()
+    assert not (tmp_path / 'checkins.db').exists()
+
+    checkin_scheduler.get_default_store()
+    assert checkin_scheduler.has_default_store() and (tmp_path / 'checkins.db').exists()
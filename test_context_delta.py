@@ -0,0 +1,55 @@
+from context import UserSessionContext
+
+
+def test_assignment_bumps_version_and_records_field():
+    context = UserSessionContext()
+    assert context.version == 0
+    assert context.changes_since(0) == {}
+
+    context.goal = {'goal_type': 'lose', 'quantity': 20}
+    context.user_profile = "Beginner"
+    assert context.version == 2
+    assert context.changes_since(0) == {'goal': {'goal_type': 'lose', 'quantity': 20}, 'user_profile': "Beginner"}
+    assert context.changes_since(1) == {'user_profile': "Beginner"}
+    assert context.changes_since(2) == {}
+
+
+def test_in_place_mutations_bump_the_version():
+    context = UserSessionContext(goal={'goal_type': 'lose'})
+    context.handoff_logs.append("injury_support")
+    assert context.changes_since(0) == {'handoff_logs': ["injury_support"]}
+
+    version = context.version
+    context.goal['quantity'] = 5
+    context.progress_summary.update(weight={'latest': 80.0})
+    assert context.changes_since(version) == {'goal': {'goal_type': 'lose', 'quantity': 5}, 'progress_summary': {'weight': {'latest': 80.0}}}
+
+    # A copy made from a snapshot tracks its own changes
+    copy = UserSessionContext(**context.snapshot())
+    copy.handoff_logs.append("escalation")
+    assert context.handoff_logs == ["injury_support"]
+    assert copy.changes_since(0) == {'handoff_logs': ["injury_support", "escalation"]}
+
+
+def test_reassigning_same_object_is_not_a_change():
+    context = UserSessionContext()
+    plan = ["day 1"]
+    context.meal_plan = plan
+    version = context.version
+    context.meal_plan = plan
+    assert context.version == version
+
+    # Tracked fields compare contents, since assignment wraps them in a new container
+    goal = {'goal_type': 'lose'}
+    context.goal = goal
+    version = context.version
+    context.goal = goal
+    context.goal = dict(goal)
+    assert context.version == version
+    context.goal = {'goal_type': 'gain'}
+    assert context.changes_since(version) == {'goal': {'goal_type': 'gain'}}
+
+
+def test_snapshot_contains_every_field():
+    context = UserSessionContext(name="Sam")
+    assert context.snapshot() == context.model_dump()
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import random
+import pytest
+from fake_llm import FakeLLMClient, parse_latency, respond
+from llm_client import LLMError, get_llm_client
+from utils.streaming import stream_call
+
+
+def test_responses_match_the_prompt():
+    meal_plan = respond("Create meal plan for goals: {'goal_type': 'lose'}")
+    assert meal_plan.count("Day ") == 7 and "Breakfast:" in meal_plan
+    assert respond("Create workout plan for goals: lose").splitlines()[0].startswith("Monday:")
+    goal = json.loads(respond("Extract the goal as JSON: I want to lose 10 lbs in 3 months"))
+    assert goal == {'quantity': 10.0, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+    assert respond("hello") == respond("hello")
+
+
+def test_latency_distributions():
+    rng = random.Random(0)
+    assert parse_latency('fixed:0.2')(rng) == 0.2
+    assert all(0.1 <= parse_latency('uniform:0.1:0.5')(rng) <= 0.5 for _ in range(100))
+    samples = sorted(parse_latency('lognormal:0.8:0.4')(rng) for _ in range(2001))
+    assert 0.7 < samples[1000] < 0.9
+    with pytest.raises(ValueError):
+        parse_latency('zipf:1')
+
+
+def test_seeded_client_is_reproducible_and_injects_errors():
+    async def run(seed):
+        client = FakeLLMClient(latency='fixed:0', error_rate=0.3, seed=seed)
+        outcomes = []
+        for i in range(50):
+            try:
+                outcomes.append(await client.generate(f"question {i}"))
+            except LLMError as e:
+                outcomes.append(e.status_code)
+        return outcomes, client.stats()
+
+    first, stats = asyncio.run(run(7))
+    second, _ = asyncio.run(run(7))
+    assert first == second
+    assert 5 < first.count(503) < 30
+    assert stats['failures'] == first.count(503)
+    assert stats['in_flight'] == 0
+
+
+def test_stream_is_chunked_and_emitted():
+    async def run():
+        client = FakeLLMClient(latency='fixed:0.01', tokens_per_second=0, chunk_words=4)
+
+        async def call():
+            return ''.join([delta async for delta in client.stream("Create workout plan")])
+
+        return [chunk async for chunk in stream_call(call)]
+
+    chunks = asyncio.run(run())
+    deltas = [chunk['delta'] for chunk in chunks if chunk['type'] == 'text']
+    assert len(deltas) > 7
+    assert ''.join(deltas) == chunks[-1]['response'] == respond("Create workout plan")
+
+
+def test_backend_is_selected_by_configuration(monkeypatch):
+    monkeypatch.setenv('LLM_BACKEND', 'fake')
+    monkeypatch.setenv('FAKE_LLM_LATENCY', 'fixed:0')
+
+    async def run():
+        return get_llm_client(), await get_llm_client().generate("Create meal plan")
+
+    client, text = asyncio.run(run())
+    assert isinstance(client, FakeLLMClient)
+    assert text.startswith("Day 1:")
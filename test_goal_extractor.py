@@ -0,0 +1,47 @@
+import asyncio
+from unittest.mock import AsyncMock
+from goal_extractor import GoalExtractor, convert_weight
+from workflow_orchestrator import HealthWellnessWorkflow
+
+
+def test_fixed_shape_goals_are_extracted():
+    extractor = GoalExtractor()
+    assert extractor.extract("lose 20 pounds in 3 months").goal == {
+        'quantity': 20.0, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'
+    }
+    assert extractor.extract("Gain 5kg of muscle within six weeks").goal == {
+        'quantity': 5.0, 'metric': 'kg', 'duration': '6 weeks', 'goal_type': 'gain'
+    }
+    assert extractor.extract("drop 2 stone in a year").goal['quantity'] == 28.0
+    assert GoalExtractor(weight_unit='kg').extract("lose 20 pounds in 3 months").goal['quantity'] == 9.1
+    assert round(convert_weight(70, 'kg', 'lbs'), 1) == 154.3
+
+
+def test_ambiguous_goals_have_low_confidence():
+    extractor = GoalExtractor()
+    assert extractor.extract("I want to lose weight").goal is None
+    assert extractor.extract("lose 10 lbs and gain 2 kg in 3 months").confidence < extractor.min_confidence
+    assert extractor.extract("I don't want to lose 5 kg in a month").confidence < extractor.min_confidence
+    # Metrics GoalInput does not accept fail validation
+    assert extractor.extract("walk 5 miles in 2 weeks").goal is None
+
+
+def test_model_is_only_called_when_the_fast_path_misses():
+    workflow = HealthWellnessWorkflow()
+    analyzer = AsyncMock(return_value={'goals': {'goal_type': 'general wellness'}})
+    workflow.tools['goal_analyzer'] = type('Tool', (), {'run': analyzer})()
+
+    async def run():
+        workflow.current_stage = 'goal_collection'
+        await workflow.process_input("I want to lose 10 lbs in 2 months")
+        fast_goal = workflow.context.goal
+        workflow.current_stage = 'goal_collection'
+        await workflow.process_input("I'd like to feel healthier")
+        return fast_goal
+
+    fast_goal = asyncio.run(run())
+    assert fast_goal == {'quantity': 10.0, 'metric': 'lbs', 'duration': '2 months', 'goal_type': 'lose'}
+    assert analyzer.await_count == 1
+    assert workflow.context.goal == {'goal_type': 'general wellness'}
+    stats = workflow.goal_extractor.stats()
+    assert stats['attempts'] == 2 and stats['hit_rate'] == 0.5
@@ -0,0 +1,52 @@
+from intent_router import IntentRouter
+
+
+router = IntentRouter()
+
+
+def test_routes_to_specialized_agents():
+    assert router.route("My knee hurts after running", 'real_time_delivery').agent == 'injury_support'
+    assert router.route("What should I eat for dinner? Any meal ideas?", 'real_time_delivery').agent == 'nutrition_expert'
+    assert router.route("How am I doing this week?", 'real_time_delivery') is None
+
+
+def test_word_boundaries_and_synonyms():
+    # 'pain' inside 'painting' and 'meal' inside 'oatmealish' must not match
+    assert router.route("I enjoy painting on weekends", 'real_time_delivery') is None
+    assert router.route("oatmealish", 'real_time_delivery') is None
+    assert router.route("I have dietary restrictions", 'real_time_delivery').intent == 'nutrition'
+    assert router.route("I sprained my ankle", 'real_time_delivery').intent == 'injury'
+
+
+def test_weights_prefer_injury_over_nutrition():
+    match = router.route("my stomach hurts after that meal", 'real_time_delivery')
+    assert match.intent == 'injury'
+    assert router.scores("my stomach hurts after that meal", 'real_time_delivery') == {'injury': 2.0, 'nutrition': 1.0}
+
+
+def test_safety_intents_take_priority_over_weights():
+    text = "pain after my meal, food and diet advice"
+    assert router.scores(text, 'real_time_delivery') == {'injury': 2.0, 'nutrition': 3.0}
+    assert router.route(text, 'real_time_delivery').agent == 'injury_support'
+    assert router.route("Is this an emergency? I skipped a meal", 'real_time_delivery').agent == 'escalation'
+
+
+def test_routes_are_scoped_to_stages():
+    match = router.route("Please schedule a weekly check in", 'ongoing_support')
+    assert match.tool == 'checkin_scheduler'
+    assert match.score == 2.0
+    assert router.route("Please schedule a weekly check in", 'real_time_delivery') is None
+    assert router.route("my back hurts", 'ongoing_support') is None
+
+
+def test_excluded_intents_are_skipped():
+    assert router.route("retry please", 'real_time_delivery').intent == 'retry_plans'
+    assert router.route("retry please", 'real_time_delivery', exclude=('retry_plans',)) is None
+
+
+def test_custom_routes():
+    custom = IntentRouter([
+        {'intent': 'sleep', 'stages': None, 'agent': 'sleep_coach', 'terms': {'insomnia': 1.0, 'cannot sleep': 2.0}}
+    ])
+    assert custom.route("I cannot sleep at night").agent == 'sleep_coach'
+    assert custom.route("sleep is fine") is None
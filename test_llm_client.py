@@ -0,0 +1,207 @@
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from llm_client import LLMClient, LLMError, TokenBucket, get_llm_client
+from utils.async_runner import BackgroundEventLoop
+from utils.deadline import DeadlineExceeded, deadline
+from utils.streaming import stream_call
+
+
+class FakeGeminiServer:
+    """
+    Minimal local HTTP/1.1 server speaking the Gemini generateContent API.
+    Returns the queued error statuses first, then successful responses.
+    """
+
+    def __init__(self, statuses=(), delay=0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.requests = 0
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}/v1beta"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                key, value = line.decode().split(':', 1)
+                headers[key.lower()] = value.strip()
+            await reader.readexactly(int(headers.get('content-length', 0)))
+
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            await asyncio.sleep(self.delay)
+            self.active -= 1
+
+            status = self.statuses.pop(0) if self.statuses else 200
+            if status != 200:
+                payload, content_type = b'{"error": "busy"}', 'application/json'
+            elif b'streamGenerateContent' in request_line:
+                events = [{'candidates': [{'content': {'parts': [{'text': text}]}}]} for text in ("Day 1: oats\n", "Day 2: eggs\n")]
+                payload = b''.join(b'data: ' + json.dumps(event).encode() + b'\r\n\r\n' for event in events)
+                content_type = 'text/event-stream'
+            else:
+                payload = json.dumps({
+                    'candidates': [{'content': {'parts': [{'text': "Drink more water."}]}}],
+                    'usageMetadata': {'totalTokenCount': 42}
+                }).encode()
+                content_type = 'application/json'
+            writer.write(
+                f"HTTP/1.1 {status} Fake\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nRetry-After: 0\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        writer.close()
+
+
+def test_generate_retries_rate_limits_and_server_errors():
+    async def run():
+        async with FakeGeminiServer(statuses=(429, 503)) as server:
+            client = LLMClient(api_key='test', base_url=server.base_url)
+            text = await client.generate("How much water?")
+            await client.generate("And sleep?")
+            await client.aclose()
+            return text, client.stats(), server
+
+    text, stats, server = asyncio.run(run())
+    assert text == "Drink more water."
+    assert stats['retries'] == 2
+    assert stats['requests'] == server.requests == 4
+    assert stats['tokens'] == 84
+    # Keep-alive: every request reused one pooled connection
+    assert server.connections == 1
+
+
+def test_client_errors_are_not_retried():
+    async def run():
+        async with FakeGeminiServer(statuses=(400,)) as server:
+            client = LLMClient(api_key='test', base_url=server.base_url)
+            with pytest.raises(LLMError) as error:
+                await client.generate("hello")
+            await client.aclose()
+            return error.value, server
+
+    error, server = asyncio.run(run())
+    assert error.status_code == 400
+    assert server.requests == 1
+
+
+def test_concurrency_cap_queues_requests():
+    async def run():
+        async with FakeGeminiServer(delay=0.02) as server:
+            client = LLMClient(api_key='test', base_url=server.base_url, max_concurrency=2, requests_per_minute=6000)
+            await asyncio.gather(*(client.generate(f"question {i}") for i in range(6)))
+            await client.aclose()
+            return client.stats(), server
+
+    stats, server = asyncio.run(run())
+    assert server.max_active <= 2
+    assert stats['max_queue_depth'] >= 4
+    assert stats['queue_depth'] == stats['in_flight'] == 0
+    assert stats['max_wait_seconds'] > 0
+
+
+def test_stream_yields_and_emits_text():
+    async def run():
+        async with FakeGeminiServer(statuses=(500,)) as server:
+            client = LLMClient(api_key='test', base_url=server.base_url)
+
+            async def call():
+                return ''.join([delta async for delta in client.stream("Plan my meals")])
+
+            chunks = [chunk async for chunk in stream_call(call)]
+            await client.aclose()
+            return chunks
+
+    chunks = asyncio.run(run())
+    assert [chunk['delta'] for chunk in chunks if chunk['type'] == 'text'] == ["Day 1: oats\n", "Day 2: eggs\n"]
+    assert chunks[-1]['response'] == "Day 1: oats\nDay 2: eggs\n"
+
+
+def test_token_bucket_limits_rate():
+    async def run():
+        bucket = TokenBucket(rate_per_minute=6000, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 100 tokens per second: the four requests after the first wait about 10 ms each
+    assert asyncio.run(run()) >= 0.035
+
+
+def test_token_bucket_waiters_keep_arrival_order():
+    async def run():
+        bucket = TokenBucket(rate_per_minute=6000, capacity=1)
+        await bucket.acquire()
+        finished = []
+
+        async def take(name):
+            await bucket.acquire()
+            finished.append(name)
+
+        waiters = [asyncio.create_task(take(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        waiters[1].cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return finished
+
+    assert asyncio.run(run()) == ["a", "c"]
+
+
+def test_shared_clients_close_with_their_loop(monkeypatch):
+    monkeypatch.setenv('LLM_BACKEND', 'gemini')
+
+    async def client():
+        return get_llm_client()
+
+    shared = asyncio.run(client())
+    assert shared._http.is_closed
+
+    background = BackgroundEventLoop()
+    shared = background.run(client())
+    assert background.run(client()) is shared and not shared._http.is_closed
+    background.stop()
+    assert shared._http.is_closed
+
+
+def test_retries_stop_at_the_stage_deadline():
+    requests = []
+
+    def busy(request):
+        requests.append(request)
+        return httpx.Response(503, headers={'Retry-After': '5'})
+
+    async def run():
+        client = LLMClient(api_key='test', base_url='http://llm.test/v1beta', transport=httpx.MockTransport(busy))
+        start = time.monotonic()
+        with deadline(1.0):
+            with pytest.raises(DeadlineExceeded):
+                await client.generate("hello")
+        await client.aclose()
+        return time.monotonic() - start, client.stats()
+
+    elapsed, stats = asyncio.run(run())
+    # Waiting 5s for a retry would blow the 1s deadline, so the client gives up at once
+    assert len(requests) == 1 and elapsed < 0.5
+    assert stats['retries'] == 0 and stats['failures'] == 1
@@ -0,0 +1,69 @@
+import asyncio
+from unittest.mock import AsyncMock
+from context import UserSessionContext
+from meal_catalog import CatalogMealPlannerTool, get_catalog, nutrition_targets, parse_dietary
+import workflow_orchestrator
+from workflow_orchestrator import HealthWellnessWorkflow
+
+GOAL = {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+
+
+def test_targets_and_dietary_constraints():
+    lose, gain, maintain = nutrition_targets(GOAL), nutrition_targets({'goal_type': 'gain'}), nutrition_targets(None)
+    assert lose.kcal < maintain.kcal < gain.kcal
+    assert round(lose.protein * 4 / lose.kcal, 2) == 0.3
+    dietary = parse_dietary("Vegetarian, no nuts, and I'm lactose intolerant")
+    assert dietary.preference == 'vegetarian' and dietary.allergies == ['dairy', 'nuts']
+    assert parse_dietary("I'm celiac and allergic to shrimp").allergies == ['gluten', 'shellfish']
+    assert parse_dietary("I love eggs").allergies == []
+
+
+def test_dietary_negation_and_clause_boundaries():
+    assert parse_dietary("I eat no meat but love eggs").allergies == []
+    assert parse_dietary("I don't eat pork but dairy is fine").allergies == []
+    assert parse_dietary("vegetarian, no problem with gluten").allergies == []
+    assert parse_dietary("no tree nuts or shellfish").allergies == ['nuts', 'shellfish']
+    assert parse_dietary("I am not vegan").preference == 'none'
+    assert parse_dietary("not vegan, but vegetarian").preference == 'vegetarian'
+
+
+def test_only_weight_goals_set_the_calorie_pace():
+    waist = nutrition_targets({'quantity': 10, 'metric': 'cm', 'duration': '1 month', 'goal_type': 'lose'})
+    assert waist == nutrition_targets({'goal_type': 'lose'})
+    assert nutrition_targets({'quantity': 10, 'metric': 'kg', 'duration': '1 month', 'goal_type': 'lose'}).kcal < waist.kcal
+
+
+def test_plans_respect_constraints_and_are_reproducible():
+    catalog = get_catalog()
+    dietary = parse_dietary("vegan, gluten-free")
+    targets = nutrition_targets(GOAL)
+    plan = catalog.assemble_week(dietary, targets, seed=7)
+    assert len(plan) == 7 and all(day.startswith(f"Day {n}:") for n, day in enumerate(plan, 1))
+    allowed = {meal.name for meal in catalog.meals if meal.diet == 'vegan' and 'gluten' not in meal.allergens}
+    for day in plan:
+        meals = day.split(' (')[0].split(': ', 1)[1]
+        assert all(part.split(': ', 1)[1] in allowed for part in meals.split(', '))
+    assert catalog.assemble_week(dietary, targets, seed=7) == plan
+    assert catalog.assemble_week(dietary, targets, seed=8) != plan
+
+
+def test_workflow_meal_plans_need_no_model_call(monkeypatch):
+    import llm_client
+    monkeypatch.setattr(llm_client, 'complete', AsyncMock(side_effect=AssertionError("model called")))
+    monkeypatch.setitem(workflow_orchestrator.TOOLS, 'meal_planner', workflow_orchestrator.LOCAL_TOOLS['meal_planner'])
+    workflow = HealthWellnessWorkflow()
+    workflow.context.goal = GOAL
+    workflow.context.diet_preferences = "pescatarian, no dairy"
+    planner = workflow.tools['meal_planner']
+    plan = asyncio.run(planner.run("Create meal plan", workflow.context))
+    assert len(plan) == 7
+    # The seed comes from the inputs, so another user asking for the same plan gets it too
+    other = UserSessionContext(uid=99, goal=GOAL, diet_preferences="Pescatarian, no dairy")
+    assert asyncio.run(planner.run("Create meal plan", other)) == plan
+
+    # Rewording keeps the catalog plan when the answer loses days
+    tool = CatalogMealPlannerTool(reword=True)
+    tool.generate = AsyncMock(return_value="Day 1: something lovely")
+    context = UserSessionContext(name="Sam", uid=2, goal=GOAL)
+    assert asyncio.run(tool.run("Create meal plan", context))[0].startswith("Day 1: Breakfast:")
+    tool.generate.assert_awaited_once()
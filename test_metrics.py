@@ -0,0 +1,64 @@
+import asyncio
+import urllib.request
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import pytest
+from metrics import ERRORS, HANDOFFS, STAGE_LATENCY, TOOL_LATENCY, Metered, MetricsRegistry
+from workflow_orchestrator import HealthWellnessWorkflow
+
+
+def test_histogram_renders_prometheus_text():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('demo_seconds', "Demo latency", ('stage',), buckets=(0.1, 1.0))
+    counter = registry.counter('demo_total', "Demo count", ('name',))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage='plan "generation"')
+    counter.inc(2, name='x')
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="plan \\"generation\\"",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="plan \\"generation\\"",le="1"} 2' in text
+    assert 'demo_seconds_bucket{stage="plan \\"generation\\"",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="plan \\"generation\\""} 3' in text
+    assert 'demo_total{name="x"} 2' in text
+
+
+def test_registry_serves_and_writes_metrics(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter('served_total', "Served").inc()
+
+    server = registry.serve(0)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+    finally:
+        server.shutdown()
+    assert 'served_total 1' in body
+
+    path = tmp_path / 'metrics.prom'
+    registry.write(str(path))
+    assert 'served_total 1' in path.read_text()
+
+
+def test_workflow_records_stage_tool_and_handoff_metrics():
+    workflow = HealthWellnessWorkflow()
+    tool = SimpleNamespace(name="Tracker", run=AsyncMock(side_effect=RuntimeError("tracker down")))
+    workflow.tools['progress_tracker'] = Metered(tool, 'tool', 'test_tracker')
+    workflow.specialized_agents['injury_support'] = SimpleNamespace(run=AsyncMock(return_value="Rest your knee"))
+    stages_before = STAGE_LATENCY.count(stage='progress_tracking')
+    handoffs_before = HANDOFFS.value(agent='injury_support')
+    errors_before = ERRORS.value(component='stage', name='progress_tracking')
+
+    workflow.current_stage = 'progress_tracking'
+    with pytest.raises(RuntimeError):
+        asyncio.run(workflow.process_input("walked 5k"))
+    workflow.current_stage = 'real_time_delivery'
+    asyncio.run(workflow.process_input("my knee hurts"))
+
+    assert STAGE_LATENCY.count(stage='progress_tracking') == stages_before + 1
+    assert TOOL_LATENCY.count(tool='test_tracker') == 1
+    assert ERRORS.value(component='tool', name='test_tracker') == 1
+    assert ERRORS.value(component='stage', name='progress_tracking') == errors_before + 1
+    assert HANDOFFS.value(agent='injury_support') == handoffs_before + 1
+    assert Metered(tool, 'tool', 'test_tracker').name == "Tracker"
@@ -0,0 +1,89 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from workflow_orchestrator import HealthWellnessWorkflow
+
+mock_meal_plan = ['Breakfast: Oatmeal, Lunch: Salad, Dinner: Salmon'] * 7
+mock_workout_plan = ['**Monday:**\n* Squats: 3 sets of 10-12 reps'] * 7
+
+
+def _workflow_at_plan_generation():
+    workflow = HealthWellnessWorkflow()
+    workflow.context.goal = {'quantity': 20, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose'}
+    workflow.current_stage = 'plan_generation'
+    return workflow
+
+
+def test_plans_generated_concurrently():
+    workflow = _workflow_at_plan_generation()
+    
+    def slow(result):
+        async def run(*args):
+            await asyncio.sleep(0.2)
+            return result
+        return run
+    
+    workflow.tools['meal_planner'] = SimpleNamespace(run=AsyncMock(side_effect=slow(mock_meal_plan)))
+    workflow.tools['workout_recommender'] = SimpleNamespace(run=AsyncMock(side_effect=slow(mock_workout_plan)))
+    
+    async def run():
+        start = asyncio.get_running_loop().time()
+        response = await workflow.process_input("generate plans")
+        return response, asyncio.get_running_loop().time() - start
+    
+    response, elapsed = asyncio.run(run())
+    assert elapsed < 0.35
+    assert response['stage'] == 'real_time_delivery'
+    assert response['pending_plans'] == []
+    assert workflow.context.meal_plan == mock_meal_plan
+    assert workflow.context.workout_plan == mock_workout_plan
+
+
+def test_partial_result_marks_missing_plan_for_retry():
+    workflow = _workflow_at_plan_generation()
+    workflow.PLAN_TOOLS = {name: dict(spec, timeout=0.05) for name, spec in workflow.PLAN_TOOLS.items()}
+    
+    async def hang(*args):
+        await asyncio.sleep(1)
+    
+    workflow.tools['meal_planner'] = SimpleNamespace(run=AsyncMock(return_value=mock_meal_plan))
+    workflow.tools['workout_recommender'] = SimpleNamespace(run=AsyncMock(side_effect=hang))
+    
+    response = asyncio.run(workflow.process_input("generate plans"))
+    assert response['stage'] == 'real_time_delivery'
+    assert response['pending_plans'] == ['workout_recommender']
+    assert workflow.context.meal_plan == mock_meal_plan
+    assert workflow.context.workout_plan is None
+    assert 'Retry pending plans' in response['next_actions']
+    
+    # Retrying only calls the tool that is still missing
+    workflow.tools['meal_planner'].run.reset_mock()
+    workflow.tools['workout_recommender'] = SimpleNamespace(run=AsyncMock(return_value=mock_workout_plan))
+    response = asyncio.run(workflow.process_input("retry"))
+    workflow.tools['meal_planner'].run.assert_not_called()
+    assert response['pending_plans'] == []
+    assert workflow.context.workout_plan == mock_workout_plan
+
+
+def test_total_failure_stays_in_plan_generation():
+    workflow = _workflow_at_plan_generation()
+    workflow.tools['meal_planner'] = SimpleNamespace(run=AsyncMock(side_effect=RuntimeError("boom")))
+    workflow.tools['workout_recommender'] = SimpleNamespace(run=AsyncMock(side_effect=RuntimeError("boom")))
+    
+    response = asyncio.run(workflow.process_input("generate plans"))
+    assert response['stage'] == 'plan_generation'
+    assert sorted(response['pending_plans']) == ['meal_planner', 'workout_recommender']
+
+
+def test_failed_retry_keeps_the_plan_that_exists():
+    workflow = _workflow_at_plan_generation()
+    workflow.current_stage = 'real_time_delivery'
+    workflow.context.meal_plan = mock_meal_plan
+    workflow.context.pending_plans = ['workout_recommender']
+    workflow.tools['workout_recommender'] = SimpleNamespace(run=AsyncMock(side_effect=RuntimeError("boom")))
+    
+    response = asyncio.run(workflow.process_input("retry"))
+    # The meal plan is still there, so the user stays in real-time delivery with the retry option
+    assert response['stage'] == 'real_time_delivery'
+    assert response['pending_plans'] == ['workout_recommender']
+    assert 'Retry pending plans' in response['next_actions']
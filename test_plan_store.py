@@ -0,0 +1,63 @@
+import gc
+import json
+from context import UserSessionContext
+from plan_store import Plan, PlanStore, get_plan_store
+from session_store import decode_session, encode_session
+from workout_library import adapt_plan, get_library, settings_for
+
+
+def test_identical_plans_and_days_are_stored_once_and_freed():
+    store = PlanStore()
+    first = store.intern(["Day 1: oats", "Day 2: eggs", "Day 3: oats"])
+    second = store.intern(["Day 1: oats", "Day 2: eggs", "Day 3: oats"])
+    other = store.intern(["Day 1: oats", "Day 2: tofu", "Day 3: oats"])
+    assert first is second and first is not other
+    assert first == ["Day 1: oats", "Day 2: eggs", "Day 3: oats"] and ("Day 1: oats", "Day 2: tofu", "Day 3: oats") == other
+    assert len(first) == 3 and first[-1] == "Day 3: oats" and first[1:] == ["Day 2: eggs", "Day 3: oats"]
+    assert repr(first) == repr(["Day 1: oats", "Day 2: eggs", "Day 3: oats"])
+    stats = store.stats()
+    assert (stats['plans'], stats['days'], stats['shared']) == (2, 4, 1)
+    # Values that are not lists of strings are left alone
+    assert store.intern(None) is None and store.intern("one plan as text") == "one plan as text"
+
+    del first, second
+    gc.collect()
+    assert store.stats()['days'] == 3 and other[1] == "Day 2: tofu"
+    del other
+    gc.collect()
+    assert len(store) == 0 and store.stats()['days'] == 0
+
+
+def test_sessions_share_plans_and_serialize_them_as_lists():
+    plan = ["Monday: squats", "Tuesday: rest"]
+    first = UserSessionContext(uid=1)
+    first.workout_plan = list(plan)
+    second = UserSessionContext(uid=2)
+    second.workout_plan = list(plan)
+    assert isinstance(first.workout_plan, Plan) and first.workout_plan is second.workout_plan
+    assert first.snapshot()['workout_plan'] == plan and type(first.snapshot()['workout_plan']) is list
+    assert first.changes_since(0) == {'workout_plan': plan}
+    json.dumps(first.changes_since(0))
+
+    restored, stage = decode_session(encode_session(first, 'real_time_delivery'))
+    assert restored.workout_plan is first.workout_plan and stage == 'real_time_delivery'
+    # Setting the same plan again is not a change
+    version = first.version
+    first.workout_plan = list(plan)
+    assert first.version == version
+
+
+def test_rebuilt_workout_days_share_the_unchanged_ones():
+    context = UserSessionContext(uid=7, goal={'goal_type': 'lose'}, user_profile="Beginner, no equipment")
+    context.workout_plan = get_library().weekly_plan(settings_for(context))
+    original = context.workout_plan
+    days_before = get_plan_store().stats()['days']
+
+    context.injury_notes = "my knee hurts"
+    plan, rebuilt = adapt_plan(context.workout_plan, context)
+    context.workout_plan = plan
+    assert rebuilt and isinstance(context.workout_plan, Plan)
+    assert [day for index, day in enumerate(context.workout_plan) if index not in rebuilt] == \
+        [day for index, day in enumerate(original) if index not in rebuilt]
+    # Only the rebuilt days were added to the store
+    assert get_plan_store().stats()['days'] <= days_before + len(rebuilt)
@@ -0,0 +1,73 @@
+import asyncio
+from unittest.mock import AsyncMock
+from progress_analytics import analyze, analyze_many
+from progress_store import DAY_SECONDS, ProgressStore
+from workflow_orchestrator import HealthWellnessWorkflow
+
+NOW = 1_700_000_000.0
+GOAL = {'quantity': 10, 'metric': 'pounds', 'duration': '3 months', 'goal_type': 'lose weight'}
+
+
+def _store(days, start=200.0, per_day=-0.2, metric='lbs'):
+    store = ProgressStore()
+    for day in days:
+        store.append(metric, start + per_day * day, timestamp=NOW - (29 - day) * DAY_SECONDS)
+    return store
+
+
+def test_rolling_average_trend_projection_and_streaks():
+    # Days 0-29 except day 20: a 9-day streak ending today, a 20-day streak before it
+    analysis = analyze(_store([day for day in range(30) if day != 20]), GOAL, now=NOW)
+    lbs = analysis['metrics']['lbs']
+    assert lbs['latest'] == 194.2
+    assert lbs['rolling_mean'] == 194.8
+    assert lbs['weekly_change'] == -1.4
+    assert analysis['goal'] == {'metric': 'lbs', 'target': 190.0, 'reached': False, 'projected_date': '2023-12-05'}
+    assert analysis['streak'] == {'current_days': 9, 'longest_days': 20, 'last_logged': '2023-11-14'}
+
+    gaining = analyze(_store(range(30), per_day=0.1), GOAL, now=NOW)
+    assert gaining['goal']['projected_date'] is None and not gaining['goal']['reached']
+    assert analyze(_store(range(30), per_day=-0.5), GOAL, now=NOW)['goal']['reached']
+    lapsed = analyze(_store(range(10)), None, now=NOW)
+    assert lapsed['goal'] is None and lapsed['streak']['current_days'] == 0
+
+
+def test_batch_matches_single_user_results():
+    stores = {
+        'a': _store(range(30)),
+        'b': _store(range(0, 30, 3), start=90, per_day=-0.1, metric='kg'),
+        'c': ProgressStore(),
+        'd': _store([29])
+    }
+    stores['b'].append('steps', 8000, timestamp=NOW)
+    goals = {'a': GOAL, 'b': {'quantity': 85, 'metric': 'kg', 'goal_type': 'target weight'}}
+    batch = analyze_many(stores, goals, now=NOW)
+    for uid, store in stores.items():
+        assert batch[uid] == analyze(store, goals.get(uid), now=NOW)
+    assert batch['b']['goal']['target'] == 85.0 and batch['b']['goal']['projected_date'] is not None
+    assert batch['c']['metrics'] == {} and batch['c']['streak']['longest_days'] == 0
+    assert batch['d']['metrics']['lbs']['weekly_change'] is None
+
+
+def test_numeric_questions_skip_the_model():
+    workflow = HealthWellnessWorkflow()
+    workflow.main_agent = type('Agent', (), {'run': AsyncMock(return_value="Keep going!")})()
+    tracker = AsyncMock(return_value="Logged")
+    workflow.tools['progress_tracker'] = type('Tool', (), {'run': tracker})()
+    workflow.context.goal = dict(GOAL)
+    workflow.context.progress_store = _store(range(30))
+
+    async def run():
+        workflow.current_stage = 'real_time_delivery'
+        answer = await workflow.process_input("Am I on track to reach my goal?")
+        workflow.current_stage = 'progress_tracking'
+        streak = await workflow.process_input("What's my streak?")
+        logged = await workflow.process_input("Weighed 194 lbs today")
+        return answer, streak, logged
+
+    answer, streak, logged = asyncio.run(run())
+    assert "reach 190 lbs around" in answer['response']
+    assert answer['progress_analytics']['goal']['target'] == 190.0
+    assert "streak" in streak['response']
+    assert workflow.main_agent.run.await_count == 0
+    assert tracker.await_count == 1 and "Progress Updated" in logged['response']
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from context import UserSessionContext
+from progress_store import DAY_SECONDS, ProgressStore, parse_measurements
+from session_store import decode_session, encode_session
+from workflow_orchestrator import HealthWellnessWorkflow
+
+NOW = 1_700_000_000.0
+
+
+def test_parse_measurements():
+    assert parse_measurements("Weighed 180.5 lbs and walked 8000 steps") == [('lbs', 180.5), ('steps', 8000.0)]
+    assert parse_measurements("down to 82,4 kg!") == [('kg', 82.4)]
+    assert parse_measurements("felt great in the morning") == []
+
+
+def test_parse_measurements_thousands_and_relative_changes():
+    assert parse_measurements("walked 8,000 steps and 1,5 km") == [('steps', 8000.0), ('km', 1.5)]
+    assert parse_measurements("12,345.5 steps") == [('steps', 12345.5)]
+    # Changes are not readings, but "down to" is
+    assert parse_measurements("I lost 5 pounds this week") == []
+    assert parse_measurements("up another 2 kg, now at 84 kg") == [('kg', 84.0)]
+    assert parse_measurements("dropped to 179 lbs") == [('lbs', 179.0)]
+
+
+def test_append_and_summary():
+    store = ProgressStore()
+    for day in range(10):
+        store.append('lbs', 200 - day, timestamp=NOW - (9 - day) * DAY_SECONDS)
+    summary = store.summary(window_days=7, now=NOW)['lbs']
+    assert summary['latest'] == 191
+    assert summary['window_count'] == 8
+    assert summary['window_change'] == -7
+
+
+def test_old_points_are_downsampled_and_size_is_bounded():
+    store = ProgressStore(max_points=100, raw_days=30, bucket_days=7, retention_days=None)
+    for day in range(365):
+        store.append('lbs', 200 - day * 0.05, timestamp=NOW - (364 - day) * DAY_SECONDS)
+    store.compact(now=NOW)
+    assert len(store) <= 75
+    timestamps, values = store.series('lbs')
+    # The last 30 days stay at daily resolution
+    assert sum(1 for ts in timestamps if ts >= NOW - 30 * DAY_SECONDS) == 31
+    assert list(timestamps) == sorted(timestamps)
+
+
+def test_retention_drops_expired_points():
+    store = ProgressStore(retention_days=30)
+    store.append('kg', 90, timestamp=NOW - 60 * DAY_SECONDS)
+    store.append('kg', 85, timestamp=NOW)
+    store.compact(now=NOW)
+    assert list(store.values) == [85]
+
+
+def test_round_trip_through_session_encoding():
+    context = UserSessionContext(uid=5)
+    context.progress_store.append('kg', 85, timestamp=NOW)
+    restored, stage = decode_session(encode_session(context, 'progress_tracking'))
+    assert stage == 'progress_tracking'
+    assert list(restored.progress_store.values) == [85]
+    assert restored.progress_store.metrics == ['kg']
+
+
+def test_progress_tracking_keeps_context_bounded():
+    workflow = HealthWellnessWorkflow()
+    workflow.tools['progress_tracker'] = SimpleNamespace(run=AsyncMock(return_value="Logged"))
+    workflow.current_stage = 'progress_tracking'
+    for day in range(UserSessionContext.MAX_PROGRESS_LOGS + 10):
+        response = asyncio.run(workflow.process_input(f"I weigh {200 - day} lbs today"))
+    assert len(workflow.context.progress_logs) == UserSessionContext.MAX_PROGRESS_LOGS
+    assert len(workflow.context.progress_store) == UserSessionContext.MAX_PROGRESS_LOGS + 10
+    assert response['context']['progress_summary']['lbs']['latest'] == 171
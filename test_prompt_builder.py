@@ -0,0 +1,81 @@
+import asyncio
+from unittest.mock import AsyncMock
+from context import UserSessionContext
+from prompt_builder import PromptBuilder, estimate_tokens, truncate
+from workflow_orchestrator import HealthWellnessWorkflow
+
+
+def _long_session() -> UserSessionContext:
+    context = UserSessionContext(uid=1)
+    context.goal = {'quantity': 10, 'metric': 'lbs', 'duration': '3 months', 'goal_type': 'lose', 'notes': None}
+    context.diet_preferences = "vegetarian, no nuts"
+    context.user_profile = "Works night shifts and trains at home. " * 200
+    for i in range(100):
+        context.add_handoff_log(f"nutrition_expert handoff {i}")
+    for i in range(30):
+        context.add_progress_log({'input': f"walked {i}000 steps", 'result': 'ok'})
+    context.progress_summary = {'weight_lbs': {'latest': 180.0, 'window_days': 7, 'window_change': -1.5}}
+    return context
+
+
+def test_context_is_compacted_to_the_budget():
+    builder = PromptBuilder(budget=150, profile_tokens=60)
+    prompt = builder.build(_long_session(), "What should I eat tonight?")
+
+    instruction, context_text = prompt.split("\n\nUser context:\n")
+    assert instruction == "What should I eat tonight?"
+    assert estimate_tokens(context_text) <= 150
+    # Structured fields are verbatim, history is summarized
+    assert 'Goal: {"duration": "3 months", "goal_type": "lose", "metric": "lbs", "quantity": 10}' in context_text
+    assert "Diet preferences: vegetarian, no nuts" in context_text
+    assert "weight_lbs 180 (-1.5 over 7 days)" in context_text
+    assert "walked 29000 steps" in context_text and "(plus 17 earlier)" in context_text
+    assert builder.stats()['dropped_tokens'] > 0
+    assert truncate("one two three four", 2) == "one two…"
+
+
+def test_compaction_is_cached_until_fields_change():
+    builder = PromptBuilder()
+    context = _long_session()
+    first = builder.build(context, "hello")
+    assert builder.build(context, "hello") == first
+    assert builder.stats()['compactions'] == 3 and builder.stats()['cache_hits'] == 3
+
+    context.add_handoff_log("escalation handoff")
+    assert "escalation handoff" in builder.build(context, "hello")
+    assert builder.stats()['compactions'] == 4
+
+    context.handoff_logs.append("appended in place")
+    assert "appended in place" in builder.build(context, "hello")
+
+
+def test_workflow_prompts_are_budgeted():
+    workflow = HealthWellnessWorkflow()
+    workflow.main_agent = type('Agent', (), {'run': AsyncMock(return_value="Noted")})()
+    planner = AsyncMock(return_value=['Day 1: oats'])
+    workflow.tools['meal_planner'] = type('Tool', (), {'run': planner})()
+    workflow.tools['workout_recommender'] = type('Tool', (), {'run': AsyncMock(return_value=['Day 1: walk'])})()
+    workflow.context.goal = {'goal_type': 'lose', 'quantity': 10}
+    for i in range(50):
+        workflow.context.add_handoff_log(f"handoff {i}")
+    profile = "Beginner with a desk job. " * 500
+
+    async def run():
+        await workflow.handle_profile_setup(profile)
+        await workflow.handle_plan_generation()
+
+    asyncio.run(run())
+    profile_prompt = workflow.main_agent.run.call_args.args[0]
+    assert workflow.context.user_profile == profile
+    assert estimate_tokens(profile_prompt) < 1000 < estimate_tokens(profile)
+    plan_prompt = planner.call_args.args[0]
+    assert plan_prompt.startswith("Create meal plan") and '"goal_type": "lose"' in plan_prompt
+    assert "handoff" not in plan_prompt
+
+
+def test_first_message_is_sent_once():
+    workflow = HealthWellnessWorkflow()
+    workflow.main_agent = type('Agent', (), {'run': AsyncMock(return_value="Hi")})()
+    asyncio.run(workflow.process_input("I want to feel stronger"))
+    assert workflow.main_agent.run.call_args.args[0] == "I want to feel stronger"
+    assert workflow.context.user_profile == "I want to feel stronger"
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+from speculation import PlanSpeculator
+from tool_cache import ToolResultCache
+from workflow_orchestrator import WorkflowComponents
+
+
+def _shared_components():
+    # Real components with the agent and plan tools stubbed, so new fields reach every test
+    components = WorkflowComponents(tool_cache=ToolResultCache())
+    components.main_agent = SimpleNamespace(run=AsyncMock(return_value="Mock agent response"))
+    components.tools['goal_analyzer'] = SimpleNamespace(run=AsyncMock(return_value={'goals': {'goal_type': 'lose'}}))
+    components.tools['meal_planner'] = SimpleNamespace(run=AsyncMock(return_value=['meal day'] * 7))
+    components.tools['workout_recommender'] = SimpleNamespace(run=AsyncMock(return_value=['workout day'] * 7))
+    components.speculator = PlanSpeculator(enabled=False)
+    return components
+
+
+def test_sessions_share_components_but_not_state():
+    components = _shared_components()
+    manager = SessionManager(components=components, store=InMemorySessionStore())
+
+    async def run():
+        await manager.process_input(1, "i am fat")
+        await manager.process_input(1, "I want to lose weight")
+        await manager.process_input(2, "hello")
+
+    asyncio.run(run())
+    assert manager.get_stage(1) == 'profile_setup'
+    assert manager.get_stage(2) == 'goal_collection'
+    assert manager.get_context(1).goal == {'goal_type': 'lose'}
+    assert manager.get_context(2).goal is None
+    assert manager.workflow_for(1).tools is manager.workflow_for(2).tools
+    assert manager.stats()['created'] == 2
+
+
+def test_idle_sessions_are_evicted_and_restored():
+    store = InMemorySessionStore()
+    manager = SessionManager(components=_shared_components(), store=store, idle_timeout=60)
+    asyncio.run(manager.process_input(7, "i am fat"))
+
+    assert manager.evict_idle(now=10**9) == 1
+    assert len(manager) == 0
+    assert len(store) == 1
+
+    assert manager.get_stage(7) == 'goal_collection'
+    assert manager.get_context(7).user_profile == "i am fat"
+    assert manager.stats()['restored'] == 1
+
+
+def test_session_memory_is_reported():
+    manager = SessionManager(components=_shared_components(), store=InMemorySessionStore())
+    manager.get_context(3).user_profile = "Beginner"
+    assert 0 < manager.session_memory(3) < 16 * 1024
+    assert manager.session_memory(4) == 0
+
+    # Plans are shared, so they count towards the plan store rather than the session
+    before = manager.stats()['plan_store_bytes']
+    plan = [f"Day {day}: a long walk and {day * 1000} steps" for day in range(1, 8)]
+    manager.get_context(3).meal_plan = plan
+    manager.get_context(4).meal_plan = list(plan)
+    stats = manager.stats()
+    assert stats['plan_store_bytes'] - before > sum(len(day) for day in plan)
+    assert stats['avg_plan_bytes'] == stats['plan_store_bytes'] / 2
+
+
+def test_turns_stay_serialized_when_the_session_is_evicted_mid_turn():
+    components = _shared_components()
+    manager = SessionManager(components=components, store=InMemorySessionStore(), idle_timeout=0.0)
+    release = asyncio.Event()
+
+    async def slow_reply(prompt, context):
+        await release.wait()
+        return "Keep going!"
+
+    components.main_agent.run = AsyncMock(side_effect=slow_reply)
+
+    async def run():
+        workflow = manager.workflow_for(7)
+        workflow.current_stage = 'ongoing_support'
+        manager.save_workflow(7, workflow)
+        turn = asyncio.create_task(manager.process_input(7, "How am I doing?"))
+        await asyncio.sleep(0)
+        manager.evict_idle(now=time.monotonic() + 1)
+        checkin = asyncio.create_task(manager.deliver_checkin(7, "Time for your wellness check-in!"))
+        await asyncio.sleep(0.01)
+        assert not checkin.done()
+        release.set()
+        await asyncio.gather(turn, checkin)
+
+    asyncio.run(run())
+    assert manager.get_stage(7) == 'progress_tracking'
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from unittest.mock import patch
+from context import UserSessionContext
+from session_manager import SessionManager
+from session_store import SQLiteSessionStore
+from test_session_manager import _shared_components
+
+
+def test_sqlite_store_round_trips_a_session(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    context = UserSessionContext(uid=5, name="Sam")
+    context.goal = {'goal_type': 'lose', 'quantity': 5}
+    context.progress_store.append('weight', 80.0, timestamp=1000.0)
+
+    store.save(5, context, 'real_time_delivery')
+    restored, stage = store.load(5)
+
+    assert stage == 'real_time_delivery'
+    assert restored.name == "Sam"
+    assert restored.goal == {'goal_type': 'lose', 'quantity': 5}
+    assert list(restored.progress_store.series('weight')[1]) == [80.0]
+    assert store.load(6) is None
+
+
+def test_save_changes_only_writes_changed_fields(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    context = UserSessionContext(uid=1)
+    store.save(1, context, 'goal_collection')
+
+    version = context.version
+    context.meal_plan = ["Day 1: oats"]
+    with patch.object(store, '_write', wraps=store._write) as write:
+        store.save_changes(1, context, 'goal_collection', version, stage_changed=False)
+    assert list(write.call_args.args[1]) == ['meal_plan']
+
+    assert store.load(1)[0].meal_plan == ["Day 1: oats"]
+
+
+def test_manager_restores_sessions_after_restart(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    manager = SessionManager(components=_shared_components(), store=SQLiteSessionStore(path))
+
+    async def run():
+        await manager.process_input(9, "i am fat")
+        await manager.process_input(9, "I want to lose weight")
+
+    asyncio.run(run())
+
+    restarted = SessionManager(components=_shared_components(), store=SQLiteSessionStore(path))
+    assert len(restarted) == 0
+    assert restarted.get_stage(9) == 'profile_setup'
+    assert restarted.get_context(9).goal == {'goal_type': 'lose'}
+    assert restarted.stats()['restored'] == 1
+
+
+def test_turns_write_the_store_off_the_event_loop(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    manager = SessionManager(components=_shared_components(), store=store)
+    writers = []
+    save = store.save
+
+    def recording_save(*args, **kwargs):
+        writers.append(threading.get_ident())
+        save(*args, **kwargs)
+
+    async def run():
+        with patch.object(store, 'save', side_effect=recording_save):
+            await manager.process_input(3, "i am fat")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert writers and loop_thread not in writers
+    assert store.load(3)[1] == manager.get_stage(3)
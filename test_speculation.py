@@ -0,0 +1,98 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import pytest
+from meal_catalog import CatalogMealPlannerTool
+from metrics import PLAN_DRAFTS
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+from speculation import PlanSpeculator
+from test_session_manager import _shared_components
+from workflow_orchestrator import HealthWellnessWorkflow
+from workout_library import LibraryWorkoutRecommenderTool
+
+
+def test_drafts_are_kept_restarted_or_rejected_by_key():
+    speculator = PlanSpeculator(enabled=True)
+    runs = []
+
+    async def draft(value):
+        runs.append(value)
+        return value
+
+    async def run():
+        assert speculator.speculate(1, 'meal_planner', 'goal', lambda: draft('a'))
+        assert not speculator.speculate(1, 'meal_planner', 'goal', lambda: draft('b'))
+        assert speculator.speculate(1, 'meal_planner', 'goal+profile', lambda: draft('c'))
+        used = await speculator.take(1, 'meal_planner', 'goal+profile')
+        speculator.speculate(2, 'meal_planner', 'old goal', lambda: draft('d'))
+        stale = speculator.take(2, 'meal_planner', 'new goal')
+        return used, stale
+
+    used, stale = asyncio.run(run())
+    assert used == 'c' and stale is None and 'b' not in runs
+    stats = speculator.stats()
+    assert (stats['started'], stats['kept'], stats['restarted'], stats['used'], stats['stale']) == (3, 1, 1, 1, 1)
+    assert stats['hit_rate'] == 0.5 and speculator.pending() == 0
+    assert PlanSpeculator(enabled=False).speculate(1, 'meal_planner', 'goal', lambda: draft('x')) is False
+
+
+def test_plan_generation_uses_drafts_started_during_onboarding():
+    components = _shared_components()
+    components.speculator = PlanSpeculator(enabled=True)
+    manager = SessionManager(components=components, store=InMemorySessionStore())
+    meal_planner = components.tools['meal_planner'].run
+
+    async def run():
+        await manager.process_input(3, "hello")
+        await manager.process_input(3, "I want to lose 10 lbs in 2 months")
+        await manager.process_input(3, "Beginner, vegetarian")
+        # Let the drafts finish while the user reads the reply
+        await asyncio.sleep(0)
+        calls = meal_planner.await_count
+        response = await manager.process_input(3, "generate plans")
+        return calls, response
+
+    calls_before, response = asyncio.run(run())
+    assert meal_planner.await_count == calls_before
+    assert response['pending_plans'] == [] and manager.get_context(3).meal_plan == ['meal day'] * 7
+    stats = components.speculator.stats()
+    # The profile changes the plan prompts, so the drafts started with the goal were restarted
+    assert stats['used'] == 2 and stats['restarted'] == 2 and stats['hit_rate'] == 1.0
+
+
+def test_local_planners_keep_drafts_when_the_profile_does_not_change_them():
+    goal = {'goal_type': 'lose', 'quantity': 10}
+    before = SimpleNamespace(uid=1, goal=goal, user_profile="hi, I want to get fit", diet_preferences=None, injury_notes=None)
+    after = SimpleNamespace(**{**vars(before), 'user_profile': "I work long hours and sleep badly"})
+    vegan = SimpleNamespace(**{**vars(before), 'user_profile': "I'm vegan"})
+    meals, workouts = CatalogMealPlannerTool(), LibraryWorkoutRecommenderTool()
+    assert meals.plan_key(before) == meals.plan_key(after) != meals.plan_key(vegan)
+    assert workouts.plan_key(before) == workouts.plan_key(after)
+
+
+def test_a_draft_and_its_replacement_share_the_plan_timeout():
+    components = _shared_components()
+    components.speculator = PlanSpeculator(enabled=True)
+    workflow = HealthWellnessWorkflow(components=components)
+    workflow.PLAN_TOOLS = {name: dict(spec, timeout=0.1) for name, spec in workflow.PLAN_TOOLS.items()}
+
+    async def slow_plan(prompt, context):
+        await asyncio.sleep(0.08)
+        return ['meal day'] * 7
+
+    components.tools['meal_planner'].run = AsyncMock(side_effect=slow_plan)
+    used = PLAN_DRAFTS.value(event='used')
+
+    async def run():
+        key = workflow._plan_key('meal_planner', workflow.context)
+        components.speculator.speculate(workflow.context.uid, 'meal_planner', key, lambda: asyncio.Event().wait())
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await workflow._generate_plan('meal_planner')
+        return time.monotonic() - started
+
+    # The draft used up the timeout, so generating again gets no fresh one
+    assert asyncio.run(run()) < 0.15
+    assert PLAN_DRAFTS.value(event='used') == used + 1
@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from metrics import ERRORS, STAGE_FALLBACKS, STAGE_TIMEOUTS
+from session_manager import SessionManager
+from session_store import InMemorySessionStore
+from test_session_manager import _shared_components
+from utils.deadline import remaining
+from workflow_orchestrator import HealthWellnessWorkflow
+
+
+def _with_budget(monkeypatch, stage, budget):
+    stages = HealthWellnessWorkflow.STAGES
+    monkeypatch.setitem(stages, stage, stages[stage]._replace(budget=budget))
+
+
+def test_stage_table_covers_every_stage():
+    workflow = HealthWellnessWorkflow(components=_shared_components())
+    for name, stage in workflow.STAGES.items():
+        assert callable(getattr(workflow, stage.handler))
+        assert stage.on_timeout in ('cancel', 'shield') and stage.fallback
+        assert all(next_stage in workflow.STAGES for next_stage in stage.next)
+    for name in ('user_starts_chat', 'goal_collection', 'profile_setup', 'plan_generation',
+                 'real_time_delivery', 'progress_tracking', 'specialized_help', 'ongoing_support'):
+        assert name in workflow.STAGES
+
+
+def test_hung_agent_is_cancelled_with_the_fallback(monkeypatch):
+    _with_budget(monkeypatch, 'specialized_help', 0.05)
+    workflow = HealthWellnessWorkflow(components=_shared_components(), current_stage='specialized_help')
+    cancelled = []
+    seen_deadline = []
+
+    async def hang(prompt, context):
+        seen_deadline.append(remaining())
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    workflow.specialized_agents['escalation'] = SimpleNamespace(run=hang)
+    timeouts = STAGE_TIMEOUTS.value(stage='specialized_help', policy='cancel')
+    fallbacks = STAGE_FALLBACKS.value(stage='specialized_help', reason='timeout')
+    errors = ERRORS.value(component='stage', name='specialized_help')
+
+    response = asyncio.run(workflow.process_input("my chest hurts"))
+    assert response['degraded'] is True
+    assert response['response'] == workflow.STAGES['specialized_help'].fallback
+    assert response['stage'] == 'specialized_help'
+    # The deadline reached the agent, which was cancelled when it ran out
+    assert 0 < seen_deadline[0] <= 0.05 and cancelled == [True]
+    assert STAGE_TIMEOUTS.value(stage='specialized_help', policy='cancel') == timeouts + 1
+    assert STAGE_FALLBACKS.value(stage='specialized_help', reason='timeout') == fallbacks + 1
+    # A fallback is a degraded answer, not an error
+    assert ERRORS.value(component='stage', name='specialized_help') == errors
+
+
+def test_plan_generation_keeps_running_and_arrives_on_the_next_turn(monkeypatch):
+    _with_budget(monkeypatch, 'plan_generation', 0.05)
+    components = _shared_components()
+    manager = SessionManager(components=components, store=InMemorySessionStore())
+
+    async def slow_plan(prompt, context):
+        await asyncio.sleep(0.1)
+        return ['meal day'] * 7
+
+    meal_planner = components.tools['meal_planner'] = SimpleNamespace(run=AsyncMock(side_effect=slow_plan))
+    timeouts = STAGE_TIMEOUTS.value(stage='plan_generation', policy='shield')
+
+    async def run():
+        await manager.process_input(5, "hello")
+        await manager.process_input(5, "I want to lose 10 lbs in 2 months")
+        await manager.process_input(5, "Beginner, vegetarian")
+        first = await manager.process_input(5, "generate plans")
+        stage_after_first = manager.get_stage(5)
+        await asyncio.sleep(0.1)
+        second = await manager.process_input(5, "are they ready?")
+        return first, stage_after_first, second
+
+    first, stage_after_first, second = asyncio.run(run())
+    assert first['degraded'] is True and stage_after_first == 'plan_generation'
+    assert STAGE_TIMEOUTS.value(stage='plan_generation', policy='shield') == timeouts + 1
+    # The second turn collected the first run instead of starting the plans again
+    assert meal_planner.run.await_count == 1
+    assert second['stage'] == manager.get_stage(5) == 'real_time_delivery'
+    assert 'degraded' not in second and second['pending_plans'] == []
+    assert second['context']['meal_plan'] == ['meal day'] * 7
+    assert len(components.background_stages) == 0
+
+
+def test_plan_retry_runs_under_the_plan_generation_budget(monkeypatch):
+    _with_budget(monkeypatch, 'plan_generation', 0.05)
+    components = _shared_components()
+    workflow = HealthWellnessWorkflow(components=components, current_stage='real_time_delivery')
+    workflow.context.workout_plan = ['workout day'] * 7
+    workflow.context.pending_plans = ['meal_planner']
+
+    async def slow_plan(prompt, context):
+        await asyncio.sleep(0.1)
+        return ['meal day'] * 7
+
+    meal_planner = components.tools['meal_planner'] = SimpleNamespace(run=AsyncMock(side_effect=slow_plan))
+    timeouts = STAGE_TIMEOUTS.value(stage='plan_generation', policy='shield')
+
+    async def run():
+        first = await workflow.process_input("retry")
+        stage_after_first = workflow.current_stage
+        await asyncio.sleep(0.1)
+        return first, stage_after_first, await workflow.process_input("anything yet?")
+
+    first, stage_after_first, second = asyncio.run(run())
+    # The slow retry was shielded, not cancelled under real-time delivery's budget
+    assert first['degraded'] is True and stage_after_first == 'plan_generation'
+    assert STAGE_TIMEOUTS.value(stage='plan_generation', policy='shield') == timeouts + 1
+    assert meal_planner.run.await_count == 1
+    assert second['stage'] == 'real_time_delivery' and second['context']['meal_plan'] == ['meal day'] * 7
@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from utils.streaming import PlanDayAccumulator, emit_text, measure_stream, unstreamed_text
+from workflow_orchestrator import HealthWellnessWorkflow
+
+
+def _streaming_tool(days, delay=0.01):
+    async def run(input, context):
+        for day in days:
+            for token in day.split(' '):
+                emit_text(token + ' ')
+                await asyncio.sleep(delay)
+            emit_text('\n')
+        return days
+    return SimpleNamespace(run=AsyncMock(side_effect=run))
+
+
+def test_accumulator_splits_days_across_deltas():
+    accumulator = PlanDayAccumulator()
+    days = []
+    for delta in ["Here is your plan\n**Mon", "day:**\n* Squats\n", "**Tuesday:**\n* Rest\n", "Day 3\nYoga"]:
+        days += accumulator.feed(delta)
+    days += accumulator.flush()
+    assert days == ["**Monday:**\n* Squats", "**Tuesday:**\n* Rest", "Day 3\nYoga"]
+
+
+def test_plan_days_stream_before_the_result():
+    workflow = HealthWellnessWorkflow()
+    workflow.context.goal = {'goal_type': 'lose'}
+    workflow.current_stage = 'plan_generation'
+    meal_days = [f"Day {i} Oatmeal, salad, salmon" for i in range(1, 8)]
+    workflow.tools['meal_planner'] = _streaming_tool(meal_days)
+    workflow.tools['workout_recommender'] = SimpleNamespace(run=AsyncMock(return_value=['Squats'] * 7))
+
+    timings, chunks = asyncio.run(measure_stream(workflow.process_input_stream("generate plans")))
+
+    types = [chunk['type'] for chunk in chunks]
+    assert types[-1] == 'result'
+    assert {'type': 'stage', 'stage': 'real_time_delivery'} in chunks
+    meal_chunks = [chunk for chunk in chunks if chunk['type'] == 'plan_day' and chunk['plan'] == 'meal_plan']
+    assert [chunk['text'] for chunk in meal_chunks] == meal_days
+    assert [chunk['day'] for chunk in meal_chunks] == list(range(1, 8))
+    workout_chunks = [chunk for chunk in chunks if chunk['type'] == 'plan_day' and chunk['plan'] == 'workout_plan']
+    assert len(workout_chunks) == 7
+    assert timings['time_to_first_token'] < timings['total'] / 5
+    assert chunks[-1]['response']['stage'] == 'real_time_delivery'
+
+
+def test_emit_text_outside_a_stream_is_a_no_op():
+    emit_text("nobody is listening")
+
+
+def test_text_the_workflow_adds_around_streamed_output_is_kept():
+    response = "✅ Profile updated! Sounds like a plan.\n\n🏗️ Now I'll generate personalized plans for you."
+    assert unstreamed_text(response, streamed=["Sounds like a plan. "]) == \
+        "✅ Profile updated!\n\n🏗️ Now I'll generate personalized plans for you."
+    plans = "🍽️ **Meal Plan Generated:**\n['Day 1']\n\n🏋️ **Workout Plan Generated:**\n['Day 1']\n\n🚀 Ready!"
+    assert unstreamed_text(plans, skip_sections=["🍽️ **Meal Plan Generated:**"]) == \
+        "🏋️ **Workout Plan Generated:**\n['Day 1']\n\n🚀 Ready!"
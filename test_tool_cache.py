@@ -0,0 +1,139 @@
+import asyncio
+from context import UserSessionContext
+from tool_base import Tool
+from tool_cache import ToolResultCache, CachedTool, make_cache_key, with_cache
+
+
+class CountingTool(Tool):
+    def __init__(self):
+        super().__init__(name="CountingTool", description="Counts calls")
+        self.calls = 0
+
+    async def run(self, input, context):
+        self.calls += 1
+        return [f"plan {self.calls}"]
+
+
+def _context(**fields):
+    defaults = {'goal': {'goal_type': 'lose', 'quantity': 20}, 'user_profile': 'Beginner, no restrictions'}
+    defaults.update(fields)
+    return UserSessionContext(**defaults)
+
+
+def test_cache_key_is_canonical():
+    a = make_cache_key("MealPlanner", "Create plan", _context(user_profile="Beginner,  NO restrictions"))
+    b = make_cache_key("MealPlanner", "create   plan", _context(user_profile="beginner, no restrictions"))
+    c = make_cache_key("MealPlanner", "create plan", _context(injury_notes="bad knee"))
+    assert a == b
+    assert a != c
+
+
+def test_cached_tool_hits_and_misses():
+    tool = CountingTool()
+    cache = ToolResultCache(max_entries=8)
+    cached = CachedTool(tool, cache)
+
+    first = asyncio.run(cached.run("Create plan", _context()))
+    second = asyncio.run(cached.run("Create plan", _context()))
+    asyncio.run(cached.run("Create plan", _context(diet_preferences="vegan")))
+
+    assert first == second == ["plan 1"]
+    assert tool.calls == 2
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+
+
+def test_lru_eviction_and_ttl():
+    cache = ToolResultCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.stats()['evictions'] == 1
+
+    expiring = ToolResultCache(ttl=0)
+    expiring.set("a", 1)
+    assert expiring.get("a") == (False, None)
+    assert expiring.stats()['expirations'] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ToolResultCache(disk_path=path).set("key", ["day 1", "day 2"])
+
+    restarted = ToolResultCache(disk_path=path)
+    assert restarted.get("key") == (True, ["day 1", "day 2"])
+    assert restarted.stats()['disk_hits'] == 1
+
+
+def test_opted_out_tools_are_not_wrapped():
+    tool = CountingTool()
+    tool.cacheable = False
+    assert with_cache(tool, ToolResultCache()) is tool
+    assert isinstance(with_cache(CountingTool(), ToolResultCache()), CachedTool)
+
+
+class SlowTool(Tool):
+    def __init__(self, failures=0):
+        super().__init__(name="SlowTool", description="Slow plan generator")
+        self.calls = 0
+        self.failures = failures
+
+    async def run(self, input, context):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.calls <= self.failures:
+            raise RuntimeError("provider unavailable")
+        return ["day 1", "day 2"]
+
+
+def test_identical_in_flight_requests_are_coalesced():
+    tool = SlowTool()
+    cache = ToolResultCache()
+    cached = CachedTool(tool, cache)
+
+    async def run():
+        return await asyncio.gather(*(cached.run("Create plan", _context()) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert tool.calls == 1
+    assert all(result == ["day 1", "day 2"] for result in results)
+    assert results[0] is not results[1]
+    assert cache.stats()['coalesced'] == 9
+    assert cache.stats()['in_flight'] == 0
+
+
+def test_waiters_retry_when_the_shared_call_fails():
+    tool = SlowTool(failures=1)
+    cache = ToolResultCache()
+    cached = CachedTool(tool, cache)
+
+    async def run():
+        return await asyncio.gather(*(cached.run("Create plan", _context()) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    # The first caller gets the error; the waiters retry together with one more call
+    assert isinstance(results[0], RuntimeError)
+    assert results[1:] == [["day 1", "day 2"]] * 4
+    assert tool.calls == 2
+    assert cache.stats()['shared_failures'] == 4
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    tool = SlowTool()
+    cache = ToolResultCache()
+    cached = CachedTool(tool, cache)
+
+    async def run():
+        leader = asyncio.ensure_future(cached.run("Create plan", _context()))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cached.run("Create plan", _context()))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(run()) == ["day 1", "day 2"]
+    assert tool.calls == 2
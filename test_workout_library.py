@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import workflow_orchestrator
+from workflow_orchestrator import HealthWellnessWorkflow
+from workout_library import AREA_BITS, WEEKDAYS, adapt_plan, get_library, parse_fitness, parse_injuries, settings_for
+
+
+def _context(**fields):
+    defaults = {'uid': 1, 'goal': {'goal_type': 'lose', 'quantity': 10}, 'user_profile': "intermediate, I have dumbbells",
+                'injury_notes': None}
+    return SimpleNamespace(**{**defaults, **fields})
+
+
+def test_injuries_and_profile_are_parsed():
+    assert parse_injuries("I sprained my ankle and my lower back hurts")[1] == ['back', 'ankle']
+    assert parse_injuries("I'll be back tomorrow")[1] == []
+    level, equipment = parse_fitness("Advanced lifter, I train at the gym")
+    assert level == 3 and equipment == 0b11111
+    assert parse_fitness("beginner, no equipment") == (1, 1)
+
+
+def test_plans_exclude_contraindicated_exercises():
+    library = get_library()
+    plan = library.weekly_plan(settings_for(_context(injury_notes="bad knee")))
+    assert [day.split('\n')[0] for day in plan] == [f"**{day}:**" for day in WEEKDAYS]
+    assert not any(library.conflicts(day, AREA_BITS['knee']) for day in plan)
+    assert library.weekly_plan(settings_for(_context())) == library.weekly_plan(settings_for(_context(uid=2)))
+
+
+def test_injury_rebuilds_only_affected_days():
+    library = get_library()
+    plan = library.weekly_plan(settings_for(_context()))
+    affected = [day for day, text in enumerate(plan) if library.conflicts(text, AREA_BITS['shoulder'])]
+    updated, rebuilt = adapt_plan(plan, _context(injury_notes="shoulder pain"))
+    assert rebuilt == affected and rebuilt
+    assert all(updated[day] == plan[day] for day in range(7) if day not in rebuilt)
+    assert not any(library.conflicts(day, AREA_BITS['shoulder']) for day in updated)
+
+
+def test_workflow_adapts_the_plan_when_an_injury_is_reported(monkeypatch):
+    import llm_client
+    monkeypatch.setattr(llm_client, 'complete', AsyncMock(side_effect=AssertionError("model called")))
+    monkeypatch.setitem(workflow_orchestrator.TOOLS, 'workout_recommender', workflow_orchestrator.LOCAL_TOOLS['workout_recommender'])
+    workflow = HealthWellnessWorkflow()
+    workflow.context.goal = {'goal_type': 'lose', 'quantity': 10}
+    workflow.context.workout_plan = asyncio.run(workflow.tools['workout_recommender'].run("", workflow.context))
+    before = list(workflow.context.workout_plan)
+    workflow.specialized_agents['injury_support'] = SimpleNamespace(run=AsyncMock(return_value="Rest that knee."))
+
+    workflow.current_stage = 'real_time_delivery'
+    response = asyncio.run(workflow.process_input("My knee hurts after running"))
+    assert workflow.context.injury_notes == "My knee hurts after running"
+    assert "Rest that knee." in response['response'] and "in your workout plan" in response['response']
+    assert workflow.context.workout_plan != before
+    assert not any(get_library().conflicts(day, AREA_BITS['knee']) for day in workflow.context.workout_plan)
+
+
+def test_model_written_plans_are_left_to_the_injury_agent():
+    workflow = HealthWellnessWorkflow()
+    workflow.tools['workout_recommender'] = SimpleNamespace(run=AsyncMock())
+    workflow.specialized_agents['injury_support'] = SimpleNamespace(run=AsyncMock(return_value="Rest that knee."))
+    workflow.context.workout_plan = ["Day 1: squats and lunges"] * 7
+
+    workflow.current_stage = 'real_time_delivery'
+    response = asyncio.run(workflow.process_input("My knee hurts after running"))
+    assert workflow.context.injury_notes == "My knee hurts after running"
+    assert response['response'] == "Rest that knee."
+    assert list(workflow.context.workout_plan) == ["Day 1: squats and lunges"] * 7
+
+
+def test_negated_equipment_and_recovered_areas():
+    assert parse_fitness("I don't have a gym") == (1, 1)
+    assert parse_fitness("no machines, but I have dumbbells") == (1, 0b101)
+    assert parse_fitness("no barbell or machine, only bands") == (1, 0b11)
+    assert parse_injuries("my knee feels better now") == (0, [])
+    assert parse_injuries("bad knee; my knee feels better now") == (0, [])
+    assert parse_injuries("my knee isn't better yet") == (AREA_BITS['knee'], ['knee'])
+    assert parse_injuries("my knee feels good but my back hurts")[1] == ['back']
+
+
+def test_recovery_lifts_the_restriction():
+    workflow = HealthWellnessWorkflow()
+    workflow.context.injury_notes = "bad knee"
+    assert "again" in workflow._adapt_workout_plan("my knee doesn't hurt anymore")
+    assert settings_for(workflow.context).injuries == 0
@@ -0,0 +1,295 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from metrics import COALESCED
+from tool_base import Tool
+
+# Context fields that change what an LLM-backed tool would return
+CACHE_KEY_FIELDS = ('goal', 'diet_preferences', 'user_profile', 'injury_notes')
+
+_MISSING = object()
+
+
+def _canonical(value):
+    """
+    Normalize a value so equivalent inputs produce the same cache key.
+    Strings are lower-cased with whitespace collapsed; containers are normalized recursively.
+    """
+    if isinstance(value, str):
+        return ' '.join(value.lower().split())
+    if isinstance(value, dict):
+        return {str(k).lower(): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def make_cache_key(tool_name: str, input: Any, context) -> str:
+    """
+    Build a cache key from the tool name, its input and the relevant context fields.
+    """
+    payload = {
+        'tool': tool_name,
+        'input': _canonical(input),
+        'context': {field: _canonical(getattr(context, field, None)) for field in CACHE_KEY_FIELDS}
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class DiskCacheTier:
+    """
+    SQLite-backed cache tier that survives process restarts.
+    Values are stored as JSON; results that cannot be encoded are kept in memory only.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM tool_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return _MISSING
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return _MISSING
+        return json.loads(row[0])
+    
+    def set(self, key: str, value: Any, ttl: float):
+        try:
+            encoded = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, encoded, time.time() + ttl)
+            )
+            self._conn.commit()
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache")
+            self._conn.commit()
+
+
+class _LeaderCancelled(Exception):
+    """
+    The call other requests were waiting on was cancelled.
+    """
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls.
+    
+    While a call for a key is in flight, later callers wait on its result
+    instead of starting their own. If the shared call fails, each waiter
+    retries once on its own (coalescing again with the other waiters), and
+    the error is raised if that attempt fails too.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self.coalesced = 0
+        self.shared_failures = 0
+    
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]], retry_on_error: bool = True) -> Any:
+        # Futures belong to one event loop, so calls only coalesce within a loop
+        flight = (asyncio.get_running_loop(), key)
+        future = self._calls.get(flight)
+        if future is not None:
+            self.coalesced += 1
+            COALESCED.inc()
+            try:
+                # Shield so a waiter being cancelled does not cancel the shared call
+                return await asyncio.shield(future)
+            except Exception:
+                self.shared_failures += 1
+                if not retry_on_error:
+                    raise
+            return await self.do(key, call, retry_on_error=False)
+        
+        future = asyncio.get_running_loop().create_future()
+        # Waiters handle the outcome; do not log it as never retrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[flight] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled(key))
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[flight]
+    
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class ToolResultCache:
+    """
+    Two-tier cache for tool results: an in-memory LRU with TTL, backed by an
+    optional on-disk tier. Tracks hit/miss/eviction counters. Misses for the
+    same key that arrive while the first is being computed are coalesced.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk = DiskCacheTier(disk_path) if disk_path else None
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flights = SingleFlight()
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a key. Returns (hit, value).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+        
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not _MISSING:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return True, value
+        
+        with self._lock:
+            self.misses += 1
+        return False, None
+    
+    def set(self, key: str, value: Any):
+        self._remember(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value, self.ttl)
+    
+    def _remember(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk is not None:
+            self.disk.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'coalesced': self.flights.coalesced,
+                'shared_failures': self.flights.shared_failures,
+                'in_flight': self.flights.in_flight()
+            }
+
+
+class CachedTool(Tool):
+    """
+    Wraps a tool so identical requests are answered from the cache.
+    Identical requests made while one is still running share its result.
+    Exceptions are never cached.
+    """
+    
+    def __init__(self, tool: Tool, cache: ToolResultCache):
+        super().__init__(name=tool.name, description=tool.description)
+        self.tool = tool
+        self.cache = cache
+    
+    async def run(self, input, context):
+        key = make_cache_key(self.name, input, context)
+        hit, value = self.cache.get(key)
+        if hit:
+            return copy.deepcopy(value)
+        
+        result = await self.cache.flights.do(key, lambda: self._run_and_store(key, input, context))
+        return copy.deepcopy(result)
+    
+    async def _run_and_store(self, key: str, input, context):
+        result = await self.tool.run(input, context)
+        self.cache.set(key, result)
+        return result
+    
+    def __getattr__(self, name):
+        # Expose the wrapped tool's extra attributes
+        if name == 'tool':
+            raise AttributeError(name)
+        return getattr(self.tool, name)
+
+
+def with_cache(tool: Tool, cache: Optional[ToolResultCache]) -> Tool:
+    """
+    Wrap a tool with the cache unless caching is disabled or the tool opted out.
+    """
+    if cache is None or not getattr(tool, 'cacheable', True):
+        return tool
+    return CachedTool(tool, cache)
+
+
+_default_cache: Optional[ToolResultCache] = None
+
+
+def get_default_cache() -> ToolResultCache:
+    """
+    Process-wide cache configured from TOOL_CACHE_SIZE, TOOL_CACHE_TTL and TOOL_CACHE_PATH.
+    Setting TOOL_CACHE_PATH enables the on-disk tier.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ToolResultCache(
+            max_entries=int(os.getenv('TOOL_CACHE_SIZE', '1024')),
+            ttl=float(os.getenv('TOOL_CACHE_TTL', '3600')),
+            disk_path=os.getenv('TOOL_CACHE_PATH') or None
+        )
+    return _default_cache
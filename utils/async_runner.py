@@ -0,0 +1,111 @@
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+
+class BackgroundEventLoop:
+    """
+    A long-lived asyncio event loop running in a daemon thread.
+    
+    Synchronous code (such as a Streamlit script) submits coroutines from any
+    thread and waits for their results. Because the loop outlives each call,
+    HTTP connection pools, client sessions and caches created on it stay warm
+    across reruns and across users.
+    """
+    
+    def __init__(self, name: str = "workflow-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+    
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """
+        Schedule a coroutine on the loop and return a thread-safe future.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and block until it finishes.
+        The coroutine is cancelled if it does not finish within timeout seconds.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("run() cannot be called from the event loop thread")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+    
+    def iterate(self, agen: AsyncIterator, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Iterate an async generator on the loop from synchronous code,
+        yielding each item as soon as it is produced.
+        """
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+        finally:
+            if not self.loop.is_closed():
+                self.submit(agen.aclose())
+    
+    def is_running(self) -> bool:
+        return self._thread.is_alive()
+    
+    def stop(self, timeout: float = 5.0):
+        """
+        Cancel outstanding work, stop the loop and wait for the thread to exit.
+        """
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+
+_background_loop: Optional[BackgroundEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundEventLoop:
+    """
+    Return the process-wide background event loop, starting it on first use.
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None or not _background_loop.is_running():
+            _background_loop = BackgroundEventLoop()
+            atexit.register(_background_loop.stop)
+        return _background_loop
+
+
+def run_async(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared background loop and wait for its result.
+    """
+    return get_background_loop().run(coro, timeout)
+
+
+def iterate_async(agen: AsyncIterator, timeout: Optional[float] = None) -> Iterator[Any]:
+    """
+    Iterate an async generator on the shared background loop from synchronous code.
+    """
+    return get_background_loop().iterate(agen, timeout)
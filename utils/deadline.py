@@ -0,0 +1,71 @@
+import contextvars
+import time
+from typing import Optional
+
+# Like the response stream, the deadline of the current stage travels in a
+# context variable: agents, tools and the LLM client read remaining() to bound
+# their own waits without a timeout argument on every signature. Tasks copy
+# the context they are created in, so the deadline follows the stage into
+# everything it awaits. Outside a deadline remaining() is None.
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar('current_deadline', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised by code that gives up because the current deadline has passed,
+    or would pass before it could finish.
+    """
+
+
+class deadline:
+    """
+    Run the block under a deadline seconds from now. A nested deadline can
+    only shorten the one already in force. None leaves the deadline unchanged.
+    """
+
+    # A class rather than @contextmanager: every stage turn enters one, and a
+    # generator-based context manager costs several times as much
+    __slots__ = ('seconds', '_token')
+
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds
+        self._token = None
+
+    def __enter__(self) -> None:
+        if self.seconds is None:
+            return
+        expires = time.monotonic() + self.seconds
+        current = _current_deadline.get()
+        self._token = _current_deadline.set(expires if current is None or expires < current else current)
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._token is not None:
+            _current_deadline.reset(self._token)
+            self._token = None
+        return False
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left before the current deadline (negative once it has passed),
+    or None when no deadline is set.
+    """
+    expires = _current_deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def clamp_timeout(timeout: float) -> float:
+    """
+    Shorten timeout to the time left before the current deadline.
+    """
+    left = remaining()
+    return timeout if left is None else max(min(timeout, left), 0.0)
+
+
+def check_deadline(what: str = 'call'):
+    """
+    Raise DeadlineExceeded if the current deadline has already passed.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline passed before {what} could start")
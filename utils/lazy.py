@@ -0,0 +1,64 @@
+import importlib
+import threading
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+def load_object(spec: str) -> Any:
+    """
+    Import an object from a 'package.module:Name' spec.
+    """
+    module_name, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class LazyRegistry(MutableMapping):
+    """
+    A mapping of names to objects that are imported and built on first access.
+    
+    Specs are 'package.module:ClassName' strings; the class is imported and
+    called with no arguments the first time its name is looked up, and the
+    optional wrap callable can post-process the instance (e.g. add caching).
+    Entries can also be assigned directly, which is how tests inject mocks.
+    """
+    
+    def __init__(self, specs: Dict[str, str], wrap: Optional[Callable[[str, Any], Any]] = None):
+        self._specs = dict(specs)
+        self._wrap = wrap
+        self._built: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+    
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return self._built[name]
+        except KeyError:
+            pass
+        spec = self._specs[name]
+        with self._lock:
+            if name not in self._built:
+                instance = load_object(spec)()
+                self._built[name] = self._wrap(name, instance) if self._wrap else instance
+            return self._built[name]
+    
+    def __setitem__(self, name: str, value: Any):
+        self._built[name] = value
+    
+    def __delitem__(self, name: str):
+        found = self._specs.pop(name, None) is not None
+        found = self._built.pop(name, None) is not None or found
+        if not found:
+            raise KeyError(name)
+    
+    def __contains__(self, name: object) -> bool:
+        # Checking membership must not trigger an import
+        return name in self._specs or name in self._built
+    
+    def __iter__(self) -> Iterator[str]:
+        yield from self._specs
+        yield from (name for name in self._built if name not in self._specs)
+    
+    def __len__(self) -> int:
+        return len(self._specs.keys() | self._built.keys())
+    
+    def is_built(self, name: str) -> bool:
+        return name in self._built
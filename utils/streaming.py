@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import contextvars
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Streaming works through context variables: while a workflow call runs under
+# stream_call(), anything it awaits (agents, tools, the LLM client) can emit
+# chunks with emit_text()/emit_stage()/emit_plan() without threading a
+# callback through every signature. Outside a stream these calls do nothing.
+_current_stream: contextvars.ContextVar = contextvars.ContextVar('current_stream', default=None)
+_current_source: contextvars.ContextVar = contextvars.ContextVar('current_source', default=(None, None))
+
+# A plan day starts with a "Day N" or weekday heading at the start of a line
+_DAY_HEADER = re.compile(
+    r'^[ \t>*#_-]*(?:day\s+\d+|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+class PlanDayAccumulator:
+    """
+    Splits streamed plan text into days.
+    
+    A day is complete once the heading of the next day arrives, or when the
+    stream ends. Text before the first heading is ignored.
+    """
+    
+    def __init__(self):
+        self._buffer = ''
+        self._day_start: Optional[int] = None
+    
+    def feed(self, delta: str) -> List[str]:
+        # Re-scan from just before the new text in case a heading spans two deltas
+        scan_from = max(len(self._buffer) - 32, 0)
+        self._buffer += delta
+        completed = []
+        for match in _DAY_HEADER.finditer(self._buffer, scan_from):
+            if self._day_start is None:
+                self._day_start = match.start()
+            elif match.start() > self._day_start:
+                # Only split on headings followed by more text, so a heading cut mid-word is not used
+                if match.end() == len(self._buffer):
+                    break
+                completed.append(self._buffer[self._day_start:match.start()].strip())
+                self._day_start = match.start()
+        if self._day_start is None:
+            self._buffer = self._buffer[-32:]
+        elif self._day_start:
+            self._buffer = self._buffer[self._day_start:]
+            self._day_start = 0
+        return [day for day in completed if day]
+    
+    def flush(self) -> List[str]:
+        if self._day_start is None:
+            return []
+        day = self._buffer[self._day_start:].strip()
+        self._buffer, self._day_start = '', None
+        return [day] if day else []
+
+
+class ChunkStream:
+    """
+    Queue of chunks produced by one streamed workflow call.
+    """
+    
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._accumulators: Dict[str, PlanDayAccumulator] = {}
+        self._days_emitted: Dict[str, int] = {}
+    
+    def put(self, chunk: Dict[str, Any]):
+        self.queue.put_nowait(chunk)
+    
+    def text(self, delta: str, source: Optional[str], plan: Optional[str]):
+        self.put({'type': 'text', 'source': source, 'delta': delta})
+        if plan is not None:
+            accumulator = self._accumulators.setdefault(plan, PlanDayAccumulator())
+            for day in accumulator.feed(delta):
+                self._put_day(plan, day)
+    
+    def plan(self, plan: str, days: List[str]):
+        """
+        Finish a plan: flush any streamed day still open, then emit days
+        from the final plan that were not streamed.
+        """
+        accumulator = self._accumulators.pop(plan, None)
+        if accumulator is not None:
+            for day in accumulator.flush():
+                self._put_day(plan, day)
+        for day in days[self._days_emitted.get(plan, 0):]:
+            self._put_day(plan, day)
+    
+    def _put_day(self, plan: str, text: str):
+        self._days_emitted[plan] = self._days_emitted.get(plan, 0) + 1
+        self.put({'type': 'plan_day', 'plan': plan, 'day': self._days_emitted[plan], 'text': text})
+
+
+def emit_text(delta: str):
+    """
+    Emit a text delta from the code currently running, e.g. an LLM token.
+    """
+    stream = _current_stream.get()
+    if stream is not None and delta:
+        source, plan = _current_source.get()
+        stream.text(delta, source, plan)
+
+
+def emit_stage(stage: str):
+    """
+    Emit a workflow stage transition.
+    """
+    stream = _current_stream.get()
+    if stream is not None:
+        stream.put({'type': 'stage', 'stage': stage})
+
+
+def emit_plan(plan: str, days: Any):
+    """
+    Emit the days of a finished plan that were not already streamed.
+    """
+    stream = _current_stream.get()
+    if stream is not None and isinstance(days, (list, tuple)):
+        stream.plan(plan, [str(day) for day in days])
+
+
+@contextlib.contextmanager
+def stream_source(source: str, plan: Optional[str] = None):
+    """
+    Label text emitted inside the block with its source, and split it into
+    plan days if it belongs to a plan.
+    """
+    token = _current_source.set((source, plan))
+    try:
+        yield
+    finally:
+        _current_source.reset(token)
+
+
+async def stream_call(call: Callable[[], Awaitable[Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run a coroutine function and yield the chunks it emits while it runs,
+    followed by a final {'type': 'result', 'response': ...} chunk.
+    
+    If the consumer stops iterating early the call is cancelled.
+    """
+    stream = ChunkStream()
+    token = _current_stream.set(stream)
+    try:
+        # The task copies the current context, so it sees the stream
+        task = asyncio.ensure_future(call())
+    finally:
+        _current_stream.reset(token)
+    
+    getter = None
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(stream.queue.get())
+            done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                chunk, getter = getter.result(), None
+                yield chunk
+                continue
+            getter.cancel()
+            getter = None
+            while not stream.queue.empty():
+                yield stream.queue.get_nowait()
+            break
+        yield {'type': 'result', 'response': task.result()}
+    finally:
+        if getter is not None:
+            getter.cancel()
+        if not task.done():
+            task.cancel()
+
+
+def unstreamed_text(response: str, streamed: Iterable[str] = (), skip_sections: Iterable[str] = ()) -> str:
+    """
+    What is left of a final response once the text already streamed is cut
+    out, e.g. the prompts and notes a workflow adds around an agent's answer.
+    Sections (paragraphs) starting with one of skip_sections are dropped
+    too, e.g. plans whose days were already shown.
+    """
+    for text in streamed:
+        text = text.strip()
+        if text:
+            response = response.replace(text, '', 1)
+    skip = tuple(skip_sections)
+    sections = (section.strip() for section in response.split('\n\n'))
+    return '\n\n'.join(section for section in sections if section and not (skip and section.startswith(skip)))
+
+
+async def measure_stream(chunks: AsyncIterator[Dict[str, Any]]) -> Tuple[Dict[str, float], List[Dict[str, Any]]]:
+    """
+    Consume a chunk stream and time it.
+    
+    Returns ({'time_to_first_token', 'time_to_first_plan_day', 'total'}, chunks);
+    times are in seconds and None when that kind of chunk never arrived.
+    """
+    start = time.perf_counter()
+    timings: Dict[str, Optional[float]] = {'time_to_first_token': None, 'time_to_first_plan_day': None}
+    collected = []
+    async for chunk in chunks:
+        elapsed = time.perf_counter() - start
+        if chunk['type'] in ('text', 'plan_day') and timings['time_to_first_token'] is None:
+            timings['time_to_first_token'] = elapsed
+        if chunk['type'] == 'plan_day' and timings['time_to_first_plan_day'] is None:
+            timings['time_to_first_plan_day'] = elapsed
+        collected.append(chunk)
+    timings['total'] = time.perf_counter() - start
+    return timings, collected
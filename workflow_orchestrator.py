@@ -1,15 +1,96 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
 import asyncio
+import logging
+import os
 from context import UserSessionContext
-from agents.agent import WellnessPlannerAgent
-from tools.goal_analyzer import GoalAnalyzerTool
-from tools.meal_planner import MealPlannerTool
-from tools.workout_recommender import WorkoutRecommenderTool
-from tools.tracker import ProgressTrackerTool
-from tools.scheduler import CheckinSchedulerTool
-from agents.injury_support_agent import InjurySupportAgent
-from agents.nutrition_expert_agent import NutritionExpertAgent
-from agents.escalation_agent import EscalationAgent
+from metrics import HANDOFFS, STAGE_FALLBACKS, STAGE_TIMEOUTS, Metered, measure
+from tool_cache import ToolResultCache, get_default_cache, with_cache
+from intent_router import IntentRouter
+from goal_extractor import GoalExtractor
+from progress_store import parse_measurements
+from prompt_builder import PromptBuilder
+from speculation import PlanSpeculator
+from stage_machine import CANCEL, SHIELD, BackgroundStages, Redirect, Stage, StageTimer, stage_budget
+from utils.deadline import DeadlineExceeded, clamp_timeout, deadline
+from utils.lazy import LazyRegistry, load_object
+from utils.streaming import emit_plan, emit_stage, stream_call, stream_source
+
+# Agents and tools are referenced by 'module:Class' and only imported when first
+# used, so importing the workflow does not pull in the LLM SDKs they depend on.
+MAIN_AGENT = 'agents.agent:WellnessPlannerAgent'
+
+SPECIALIZED_AGENTS = {
+    'injury_support': 'agents.injury_support_agent:InjurySupportAgent',
+    'nutrition_expert': 'agents.nutrition_expert_agent:NutritionExpertAgent',
+    'escalation': 'agents.escalation_agent:EscalationAgent'
+}
+
+# Model-free tools built on local data. LOCAL_TOOLS=1 makes them the defaults in
+# place of the model-backed tools; a per-tool variable such as MEAL_PLANNER still wins.
+LOCAL_TOOLS = {
+    'meal_planner': 'meal_catalog:CatalogMealPlannerTool',
+    'workout_recommender': 'workout_library:LibraryWorkoutRecommenderTool',
+    'checkin_scheduler': 'checkin_scheduler:CheckinSchedulerTool'
+}
+USE_LOCAL_TOOLS = os.getenv('LOCAL_TOOLS', '').lower() in ('1', 'true', 'yes')
+
+
+def _tool_spec(name: str, env: str, spec: str) -> str:
+    return os.getenv(env) or (LOCAL_TOOLS[name] if USE_LOCAL_TOOLS else spec)
+
+
+TOOLS = {
+    'goal_analyzer': 'tools.goal_analyzer:GoalAnalyzerTool',
+    'meal_planner': _tool_spec('meal_planner', 'MEAL_PLANNER', 'tools.meal_planner:MealPlannerTool'),
+    'workout_recommender': _tool_spec('workout_recommender', 'WORKOUT_RECOMMENDER', 'tools.workout_recommender:WorkoutRecommenderTool'),
+    'progress_tracker': 'tools.tracker:ProgressTrackerTool',
+    'checkin_scheduler': _tool_spec('checkin_scheduler', 'CHECKIN_SCHEDULER', 'tools.scheduler:CheckinSchedulerTool')
+}
+
+# Stage banners are logged at INFO; set LOG_LEVEL=WARNING to silence them under load
+logger = logging.getLogger(__name__)
+
+class WorkflowComponents:
+    """
+    The stateless agents and tools used by the workflow.
+    
+    Agents and tools keep no per-user state (everything lives in
+    UserSessionContext), so one instance can be shared by any number of sessions.
+    Each one is imported and built on first use, and wrapped so its run()
+    latency and errors are recorded in the metrics registry. The prompt
+    builder caches compacted context on each session's context, not on itself,
+    and the plan speculator and background stages key their work by user id.
+    """
+    
+    # Stateful tools whose results must never come from the result cache
+    UNCACHED_TOOLS = ('progress_tracker', 'checkin_scheduler')
+    
+    def __init__(self, tool_cache: Optional[ToolResultCache] = None):
+        self._main_agent = None
+        self.specialized_agents = LazyRegistry(SPECIALIZED_AGENTS, wrap=lambda name, agent: Metered(agent, 'agent', name))
+        self.tool_cache = tool_cache if tool_cache is not None else get_default_cache()
+        self.tools = LazyRegistry(TOOLS, wrap=self._wrap_tool)
+        self.intent_router = IntentRouter()
+        self.prompt_builder = PromptBuilder()
+        self.goal_extractor = GoalExtractor()
+        self.speculator = PlanSpeculator()
+        self.background_stages = BackgroundStages()
+    
+    @property
+    def main_agent(self):
+        if self._main_agent is None:
+            self._main_agent = Metered(load_object(MAIN_AGENT)(), 'agent', 'main')
+        return self._main_agent
+    
+    @main_agent.setter
+    def main_agent(self, agent):
+        self._main_agent = agent
+    
+    def _wrap_tool(self, name: str, tool):
+        if name in self.UNCACHED_TOOLS:
+            tool.cacheable = False
+        # Meter inside the cache so tool latency only counts real runs
+        return with_cache(Metered(tool, 'tool', name), self.tool_cache)
 
 class HealthWellnessWorkflow:
     """
@@ -26,53 +107,171 @@ class HealthWellnessWorkflow:
     8. Ongoing Support
     """
     
-    def __init__(self):
-        self.context = UserSessionContext()
-        self.main_agent = WellnessPlannerAgent()
-        self.specialized_agents = {
-            'injury_support': InjurySupportAgent(),
-            'nutrition_expert': NutritionExpertAgent(),
-            'escalation': EscalationAgent()
+    # Plan tools run concurrently during plan generation, each with its own timeout (seconds).
+    # Plan prompts carry the goal, preferences and profile but no history, within prompt_tokens.
+    PLAN_TOOLS = {
+        'meal_planner': {
+            'field': 'meal_plan',
+            'label': 'meal plan',
+            'heading': "🍽️ **Meal Plan Generated:**",
+            'prompt': "Create meal plan for the user's goals",
+            'prompt_tokens': 400,
+            'timeout': 60.0
+        },
+        'workout_recommender': {
+            'field': 'workout_plan',
+            'label': 'workout plan',
+            'heading': "🏋️ **Workout Plan Generated:**",
+            'prompt': "Create workout plan for the user's goals",
+            'prompt_tokens': 400,
+            'timeout': 60.0
         }
-        self.tools = {
-            'goal_analyzer': GoalAnalyzerTool(),
-            'meal_planner': MealPlannerTool(),
-            'workout_recommender': WorkoutRecommenderTool(),
-            'progress_tracker': ProgressTrackerTool(),
-            'checkin_scheduler': CheckinSchedulerTool()
-        }
-        self.current_stage = 'user_starts_chat'
+    }
+    
+    # Each turn runs the handler of the current stage under the stage's latency budget
+    # (STAGE_BUDGET_<STAGE> to tune). When the budget runs out the user gets the fallback.
+    # Unknown stages are handled as real-time delivery.
+    STAGES = {
+        'user_starts_chat': Stage(
+            handler='start_workflow',
+            budget=stage_budget('user_starts_chat', 30.0),
+            on_timeout=CANCEL,
+            fallback="⏳ I'm taking longer than usual to get started. Please send your message again in a moment.",
+            next=('goal_collection', 'profile_setup')
+        ),
+        'goal_collection': Stage(
+            handler='handle_goal_collection',
+            budget=stage_budget('goal_collection', 30.0),
+            on_timeout=CANCEL,
+            fallback="⏳ I couldn't analyze your goal in time. Could you restate it, e.g. 'lose 10 pounds in 2 months'?",
+            next=('profile_setup',)
+        ),
+        'profile_setup': Stage(
+            handler='handle_profile_setup',
+            budget=stage_budget('profile_setup', 30.0),
+            on_timeout=CANCEL,
+            fallback="⏳ I couldn't save your profile in time. Please send it again in a moment.",
+            next=('plan_generation',)
+        ),
+        # Plans are too costly to throw away: they keep generating and arrive with the next message
+        'plan_generation': Stage(
+            handler='handle_plan_generation',
+            budget=stage_budget('plan_generation', 30.0),
+            on_timeout=SHIELD,
+            fallback="⏳ Your plans are still being prepared. Send any message in a moment to see them.",
+            next=('real_time_delivery',),
+            takes_input=False
+        ),
+        'real_time_delivery': Stage(
+            handler='handle_real_time_delivery',
+            budget=stage_budget('real_time_delivery', 30.0),
+            on_timeout=CANCEL,
+            fallback="⏳ I'm taking longer than usual to answer. Please ask again in a moment; your plans are unchanged.",
+            next=('plan_generation', 'specialized_help')
+        ),
+        'progress_tracking': Stage(
+            handler='handle_progress_tracking',
+            budget=stage_budget('progress_tracking', 20.0),
+            on_timeout=CANCEL,
+            fallback="⏳ I couldn't record your progress in time. Please send your update again in a moment."
+        ),
+        'specialized_help': Stage(
+            handler='handle_specialized_help',
+            budget=stage_budget('specialized_help', 45.0),
+            on_timeout=CANCEL,
+            fallback="⏳ Our specialist is taking longer than usual. Please try again in a moment. If this is urgent, contact a healthcare professional.",
+            args=('escalation',)
+        ),
+        'ongoing_support': Stage(
+            handler='handle_ongoing_support',
+            budget=stage_budget('ongoing_support', 30.0),
+            on_timeout=CANCEL,
+            fallback="⏳ I'm taking longer than usual to answer. Please try again in a moment.",
+            next=('progress_tracking',)
+        )
+    }
+    
+    # Payload keys _build_response fills in; anything else a handler passed as extra
+    _PAYLOAD_KEYS = frozenset({'stage', 'response', 'context', 'context_delta', 'context_version', 'next_actions'})
+    
+    def __init__(
+        self,
+        tool_cache: Optional[ToolResultCache] = None,
+        response_mode: str = 'full',
+        components: Optional[WorkflowComponents] = None,
+        context: Optional[UserSessionContext] = None,
+        current_stage: str = 'user_starts_chat'
+    ):
+        """
+        response_mode: 'full' returns the whole context with every response,
+        'delta' returns only the context fields changed since the last response.
+        
+        Pass shared components (and an existing context and stage) to run a
+        session without building its own agents and tools.
+        """
+        if response_mode not in ('full', 'delta'):
+            raise ValueError("response_mode must be 'full' or 'delta'")
+        self.context = context if context is not None else UserSessionContext()
+        self.components = components if components is not None else WorkflowComponents(tool_cache)
+        self.specialized_agents = self.components.specialized_agents
+        self.tools = self.components.tools
+        self.tool_cache = self.components.tool_cache
+        self.intent_router = self.components.intent_router
+        self.prompt_builder = self.components.prompt_builder
+        self.goal_extractor = self.components.goal_extractor
+        self.speculator = self.components.speculator
+        self.background_stages = self.components.background_stages
+        self.current_stage = current_stage
         self.workflow_complete = False
+        self.response_mode = response_mode
+        self._sent_version = 0
+        self._send_full_context = False
+    
+    @property
+    def current_stage(self) -> str:
+        return self._current_stage
+    
+    @current_stage.setter
+    def current_stage(self, stage: str):
+        if stage != getattr(self, '_current_stage', None):
+            emit_stage(stage)
+        self._current_stage = stage
+    
+    @property
+    def main_agent(self):
+        return self.components.main_agent
+    
+    @main_agent.setter
+    def main_agent(self, agent):
+        self.components.main_agent = agent
     
     async def start_workflow(self, initial_input: str) -> Dict[str, Any]:
         """
         Starts the complete workflow based on user input.
         """
-        print(f"🚀 Starting Health & Wellness Workflow")
-        print(f"📝 Initial Input: {initial_input}")
+        logger.info("🚀 Starting Health & Wellness Workflow")
+        logger.info("📝 Initial Input: %s", initial_input)
         
         # Stage 1: User Starts Chat
         response = await self._handle_user_starts_chat(initial_input)
         
-        return {
-            'stage': self.current_stage,
-            'response': response,
-            'context': self.context.__dict__,
-            'next_actions': self._get_next_actions()
-        }
+        return self._build_response(response)
     
     async def _handle_user_starts_chat(self, input_text: str) -> str:
         """
         Stage 1: Handle initial user interaction and determine next steps.
         """
         self.current_stage = 'user_starts_chat'
-        print(f"🎯 Stage 1: User Starts Chat")
+        logger.info("🎯 Stage 1: User Starts Chat")
         
+        # Build the prompt before the input becomes the profile, so it is not sent twice
+        prompt = self.prompt_builder.build(self.context, input_text)
+
         # Set user profile based on initial input
         self.context.user_profile = input_text
-        
+
         # Use main agent to understand user intent
-        response = await self.main_agent.run(input_text, self.context)
+        response = await self.main_agent.run(prompt, self.context)
         
         # Convert response to string if it's a dict
         if isinstance(response, dict):
@@ -84,6 +283,7 @@ class HealthWellnessWorkflow:
         if self.context.goal:
             # Goal was detected, move to profile setup
             self.current_stage = 'profile_setup'
+            self._speculate_plans()
             return f"{response_text}\n\n📋 Now let's set up your profile. Could you share your current fitness level, dietary preferences, and any health considerations?"
         else:
             # No goal detected, move to goal collection
@@ -95,10 +295,15 @@ class HealthWellnessWorkflow:
         Stage 2: Collect and analyze user goals.
         """
         self.current_stage = 'goal_collection'
-        print(f"🎯 Stage 2: Goal Collection")
+        logger.info("🎯 Stage 2: Goal Collection")
         
-        # Use GoalAnalyzerTool to process goals
-        goals_result = await self.tools['goal_analyzer'].run(goals_input, self.context)
+        # Fixed-shape goals ("lose 20 pounds in 3 months") are extracted without a model
+        # call; GoalAnalyzerTool only handles inputs the extractor is unsure about
+        goal = self.goal_extractor.fast_path(goals_input)
+        if goal is not None:
+            goals_result = {'goals': goal}
+        else:
+            goals_result = await self.tools['goal_analyzer'].run(goals_input, self.context)
         
         # Update context with analyzed goals
         if isinstance(goals_result, dict) and 'goal' in goals_result:
@@ -114,175 +319,330 @@ class HealthWellnessWorkflow:
                 'goal_type': 'weight loss'
             }
         
-        # Move to profile setup
+        # Move to profile setup; plan drafts can start while the user writes their profile
         self.current_stage = 'profile_setup'
+        self._speculate_plans()
         
-        return {
-            'stage': self.current_stage,
-            'response': f"✅ Great! I've analyzed your goals: {goals_result}\n\n📋 Now let's set up your profile. Could you share your current fitness level, dietary preferences, and any health considerations?",
-            'context': self.context.__dict__,
-            'next_actions': self._get_next_actions()
-        }
+        return self._build_response(f"✅ Great! I've analyzed your goals: {goals_result}\n\n📋 Now let's set up your profile. Could you share your current fitness level, dietary preferences, and any health considerations?")
     
     async def handle_profile_setup(self, profile_input: str) -> Dict[str, Any]:
         """
         Stage 3: Set up user profile and preferences.
         """
         self.current_stage = 'profile_setup'
-        print(f"🎯 Stage 3: Profile Setup")
-        
-        # Process profile information
-        profile_response = await self.main_agent.run(f"Profile setup: {profile_input}", self.context)
+        logger.info("🎯 Stage 3: Profile Setup")
         
-        # Update user profile in context
+        # Update user profile in context; the prompt carries it truncated to the profile budget
         self.context.user_profile = profile_input
+        # Keep drafts the profile does not affect, restart the others to overlap with the agent call
+        self._speculate_plans()
+        
+        # Process profile information
+        profile_prompt = self.prompt_builder.build(self.context, "Profile setup: the user shared the profile below.")
+        profile_response = await self.main_agent.run(profile_prompt, self.context)
         
         # Move to plan generation
         self.current_stage = 'plan_generation'
         
-        return {
-            'stage': self.current_stage,
-            'response': f"✅ Profile updated! {profile_response}\n\n🏗️ Now I'll generate personalized plans for you.",
-            'context': self.context.__dict__,
-            'next_actions': self._get_next_actions()
-        }
+        return self._build_response(f"✅ Profile updated! {profile_response}\n\n🏗️ Now I'll generate personalized plans for you.")
     
     async def handle_plan_generation(self) -> Dict[str, Any]:
         """
         Stage 4: Generate personalized meal and workout plans.
+
+        Both plans are generated concurrently, each under its own timeout.
+        If only one plan succeeds it is returned and the other is recorded in
+        ``context.pending_plans`` so the next call only retries what is missing.
         """
         self.current_stage = 'plan_generation'
-        print(f"🎯 Stage 4: Plan Generation")
+        logger.info("🎯 Stage 4: Plan Generation")
         
-        # Generate meal plan
-        meal_plan = await self.tools['meal_planner'].run(
-            f"Create meal plan for goals: {self.context.goal}", 
-            self.context
+        # Only regenerate plans that are missing from a previous partial run
+        plan_names = list(self.context.pending_plans) or list(self.PLAN_TOOLS)
+        results = await asyncio.gather(
+            *(self._generate_plan(name) for name in plan_names),
+            return_exceptions=True
         )
         
-        # Generate workout plan
-        workout_plan = await self.tools['workout_recommender'].run(
-            f"Create workout plan for goals: {self.context.goal}", 
-            self.context
-        )
+        # Update context with the plans that succeeded, keep the rest pending
+        pending = []
+        for name, result in zip(plan_names, results):
+            if isinstance(result, BaseException):
+                logger.warning("⚠️ %s failed: %r", name, result)
+                pending.append(name)
+            else:
+                setattr(self.context, self.PLAN_TOOLS[name]['field'], result)
+        self.context.pending_plans = pending
         
-        # Update context with plans
-        self.context.meal_plan = meal_plan
-        self.context.workout_plan = workout_plan
+        if len(pending) == len(self.PLAN_TOOLS):
+            # No plan exists yet, stay in plan generation so the next input retries
+            return self._build_response("⚠️ I couldn't generate your plans right now. Send any message to try again.", pending_plans=pending)
         
         # Move to real-time delivery
         self.current_stage = 'real_time_delivery'
         
-        return {
-            'stage': self.current_stage,
-            'response': f"🍽️ **Meal Plan Generated:**\n{meal_plan}\n\n🏋️ **Workout Plan Generated:**\n{workout_plan}\n\n🚀 Your personalized plans are ready! Let's start your journey.",
-            'context': self.context.__dict__,
-            'next_actions': self._get_next_actions()
-        }
+        sections = []
+        for spec in self.PLAN_TOOLS.values():
+            plan = getattr(self.context, spec['field'])
+            if plan is not None:
+                sections.append(f"{spec['heading']}\n{plan}")
+        if pending:
+            missing = ' and '.join(self.PLAN_TOOLS[name]['label'] for name in pending)
+            sections.append(f"⏳ Your {missing} is taking longer than expected. Say 'retry' to try again.")
+        else:
+            sections.append("🚀 Your personalized plans are ready! Let's start your journey.")
+        
+        return self._build_response("\n\n".join(sections), pending_plans=pending)
+    
+    async def _generate_plan(self, name: str):
+        """
+        Run a single plan tool under its configured timeout. Waiting for a
+        speculative draft and generating the plan again if the draft fails
+        share that one timeout.
+        """
+        spec = self.PLAN_TOOLS[name]
+        draft = None
+        if self.speculator.enabled:
+            draft = self.speculator.take(self.context.uid, name, self._plan_key(name, self.context))
+        with deadline(spec['timeout']), stream_source(name, plan=spec['field']):
+            plan = None
+            if draft is not None:
+                try:
+                    plan = await asyncio.wait_for(draft, timeout=clamp_timeout(spec['timeout']))
+                except Exception as error:
+                    logger.warning("⚠️ Speculative %s draft failed, generating again: %r", name, error)
+            if plan is None:
+                plan = await asyncio.wait_for(
+                    self.tools[name].run(self._plan_prompt(spec), self.context),
+                    timeout=clamp_timeout(spec['timeout'])
+                )
+            emit_plan(spec['field'], plan)
+        return plan
+    
+    def _plan_prompt(self, spec: Dict[str, Any], context: Optional[UserSessionContext] = None) -> str:
+        context = context if context is not None else self.context
+        return self.prompt_builder.build(context, spec['prompt'], sections=('profile',), budget=spec['prompt_tokens'])
+    
+    def _plan_key(self, name: str, context: UserSessionContext):
+        """
+        What a plan depends on: the tool's plan_key(context) if it has one,
+        otherwise the prompt it would be given.
+        """
+        plan_key = getattr(self.tools[name], 'plan_key', None)
+        return plan_key(context) if callable(plan_key) else self._plan_prompt(self.PLAN_TOOLS[name], context)
+    
+    def _speculate_plans(self):
+        """
+        Start background drafts of both plans from a copy of the context as it is
+        now, when speculative plans are enabled; handle_plan_generation uses a
+        draft if the inputs it depends on have not changed since.
+        """
+        if not self.speculator.enabled:
+            return
+        snapshot = UserSessionContext(**self.context.snapshot())
+        for name, spec in self.PLAN_TOOLS.items():
+            self.speculator.speculate(
+                snapshot.uid, name, self._plan_key(name, snapshot),
+                lambda name=name, spec=spec: self.tools[name].run(self._plan_prompt(spec, snapshot), snapshot)
+            )
     
     async def handle_real_time_delivery(self, user_input: str) -> Dict[str, Any]:
         """
         Stage 5: Provide real-time support and guidance.
         """
         self.current_stage = 'real_time_delivery'
-        print(f"🎯 Stage 5: Real-Time Delivery")
+        logger.info("🎯 Stage 5: Real-Time Delivery")
         
-        # Check if user needs specialized help
-        if any(keyword in user_input.lower() for keyword in ['injury', 'pain', 'hurt']):
-            self.current_stage = 'specialized_help'
-            return await self.handle_specialized_help(user_input, 'injury_support')
+        # Plans can only be retried while some are still pending
+        exclude = () if self.context.pending_plans else ('retry_plans',)
+        match = self.intent_router.route(user_input, self.current_stage, exclude=exclude)
+        
+        if match is not None and match.handler == 'plan_generation':
+            # Retries are plan generation turns, shielded under that stage's budget
+            raise Redirect('plan_generation')
+        if match is not None and match.handler == 'progress_analytics':
+            return await self.handle_progress_question()
         
-        if any(keyword in user_input.lower() for keyword in ['nutrition', 'diet', 'meal', 'food']):
+        # Check if user needs specialized help
+        if match is not None and match.agent:
             self.current_stage = 'specialized_help'
-            return await self.handle_specialized_help(user_input, 'nutrition_expert')
+            return await self.handle_specialized_help(user_input, match.agent)
         
         # Regular real-time support
-        response = await self.main_agent.run(user_input, self.context)
+        response = await self.main_agent.run(self.prompt_builder.build(self.context, user_input), self.context)
         
-        return {
-            'stage': self.current_stage,
-            'response': response,
-            'context': self.context.__dict__,
-            'next_actions': self._get_next_actions()
-        }
+        return self._build_response(response)
     
     async def handle_progress_tracking(self, progress_input: str) -> Dict[str, Any]:
         """
         Stage 6: Track and analyze user progress.
         """
         self.current_stage = 'progress_tracking'
-        print(f"🎯 Stage 6: Progress Tracking")
+        logger.info("🎯 Stage 6: Progress Tracking")
+        
+        # Record numeric measurements (e.g. "180 lbs") in the compact progress store
+        measurements = parse_measurements(progress_input)
+        
+        # Numeric questions are answered from the measurements, without the tracker tool
+        if not measurements:
+            match = self.intent_router.route(progress_input, self.current_stage)
+            if match is not None and match.handler == 'progress_analytics':
+                return await self.handle_progress_question()
+        
+        for metric, value in measurements:
+            self.context.progress_store.append(metric, value)
         
         # Use ProgressTrackerTool
         progress_result = await self.tools['progress_tracker'].run(progress_input, self.context)
         
-        # Update context with progress
-        if not hasattr(self.context, 'progress_history'):
-            self.context.progress_history = []
-        self.context.progress_history.append(progress_result)
+        # Update context with progress: a bounded text log plus a summary of recent measurements
+        self.context.add_progress_log({'input': progress_input, 'result': str(progress_result)})
+        if measurements:
+            self.context.progress_summary = self.context.progress_store.summary()
         
-        return {
-            'stage': self.current_stage,
-            'response': f"📊 Progress Updated: {progress_result}\n\n🎯 Keep up the great work! Your consistency is key to achieving your goals.",
-            'context': self.context.__dict__,
-            'next_actions': self._get_next_actions()
-        }
+        return self._build_response(f"📊 Progress Updated: {progress_result}\n\n🎯 Keep up the great work! Your consistency is key to achieving your goals.")
+    
+    async def handle_progress_question(self) -> Dict[str, Any]:
+        """
+        Answer a numeric progress question (averages, trend, goal date, streaks)
+        from the logged measurements, with no model call.
+        """
+        # Imported here so NumPy only loads once someone asks about their progress
+        from progress_analytics import analyze, describe
+        analysis = analyze(self.context.progress_store, self.context.goal)
+        return self._build_response(describe(analysis), progress_analytics=analysis)
     
     async def handle_specialized_help(self, user_input: str, agent_type: str) -> Dict[str, Any]:
         """
         Stage 7: Provide specialized help through expert agents.
         """
         self.current_stage = 'specialized_help'
-        print(f"🎯 Stage 7: Specialized Help - {agent_type}")
+        logger.info("🎯 Stage 7: Specialized Help - %s", agent_type)
         
         # Route to appropriate specialized agent
-        if agent_type in self.specialized_agents:
-            response = await self.specialized_agents[agent_type].run(user_input, self.context)
-        else:
-            response = await self.specialized_agents['escalation'].run(user_input, self.context)
-        
-        return {
-            'stage': self.current_stage,
-            'response': response,
-            'context': self.context.__dict__,
-            'next_actions': self._get_next_actions()
-        }
+        if agent_type not in self.specialized_agents:
+            agent_type = 'escalation'
+        HANDOFFS.inc(agent=agent_type)
+        # Injuries update the workout plan before the agent answers, so its prompt sees the notes
+        plan_update = self._adapt_workout_plan(user_input) if agent_type == 'injury_support' else ''
+        response = await self.specialized_agents[agent_type].run(self.prompt_builder.build(self.context, user_input), self.context)
+        if plan_update:
+            response = f"{response}\n\n{plan_update}"
+        
+        return self._build_response(response)
+    
+    def _adapt_workout_plan(self, injury_report: str) -> str:
+        """
+        Record the body areas an injury report names in context.injury_notes and, if
+        the workout recommender can adapt plans (the local library can), rebuild only
+        the workout plan days with exercises that conflict with them, with no model call.
+        Reports that an area has recovered are recorded too, which lifts its restriction
+        for plans built from then on. Returns a note for the user, or '' if nothing changed.
+        """
+        # Imported here so NumPy only loads once an injury is reported
+        from workout_library import WEEKDAYS, parse_injuries, parse_recoveries
+        _, areas = parse_injuries(injury_report)
+        recovered = parse_recoveries(injury_report)
+        if not areas and not recovered:
+            return ''
+        notes = self.context.injury_notes
+        self.context.injury_notes = f"{notes}; {injury_report}" if notes else injury_report
+        if not areas:
+            return f"🏋️ Glad to hear it. New workout plans can include exercises for your {' and '.join(recovered)} again."
+        if not self.context.workout_plan:
+            return ''
+        adapt_plan = getattr(self.tools['workout_recommender'], 'adapt_plan', None)
+        if not callable(adapt_plan):
+            return ''
+        plan, rebuilt = adapt_plan(self.context.workout_plan, self.context)
+        if not rebuilt:
+            return ''
+        self.context.workout_plan = plan
+        days = ', '.join(WEEKDAYS[day] for day in rebuilt)
+        return f"🏋️ I've updated {days} in your workout plan to go easy on your {' and '.join(areas)}."
     
     async def handle_ongoing_support(self, user_input: str) -> Dict[str, Any]:
         """
         Stage 8: Provide ongoing support and check-ins.
         """
         self.current_stage = 'ongoing_support'
-        print(f"🎯 Stage 8: Ongoing Support")
+        logger.info("🎯 Stage 8: Ongoing Support")
         
         # Schedule check-ins if needed
-        if 'schedule' in user_input.lower() or 'checkin' in user_input.lower():
-            checkin_result = await self.tools['checkin_scheduler'].run(user_input, self.context)
-            response = f"📅 Check-in scheduled: {checkin_result}"
+        match = self.intent_router.route(user_input, self.current_stage)
+        if match is not None and match.handler == 'progress_analytics':
+            return await self.handle_progress_question()
+        if match is not None and match.tool:
+            tool_result = await self.tools[match.tool].run(user_input, self.context)
+            response = (match.response or "{result}").format(result=tool_result)
         else:
-            response = await self.main_agent.run(user_input, self.context)
+            response = await self.main_agent.run(self.prompt_builder.build(self.context, user_input), self.context)
         
-        return {
-            'stage': self.current_stage,
-            'response': response,
-            'context': self.context.__dict__,
-            'next_actions': self._get_next_actions()
-        }
+        return self._build_response(response)
+    
+    async def handle_checkin(self, message: str) -> Dict[str, Any]:
+        """
+        Deliver a scheduled check-in. Users who already have their plans are
+        moved to progress tracking so their reply is recorded as progress.
+        """
+        logger.info("📅 Check-in")
+        if self.current_stage in ('real_time_delivery', 'ongoing_support'):
+            self.current_stage = 'progress_tracking'
+        return self._build_response(
+            f"📅 {message}\n\nHow are things going? Share an update like 'weighed 180 lbs' or 'walked 8000 steps'."
+        )
     
     def clear_context(self):
         """
         Clear the current workflow context and reset to initial state.
         """
-        print("🔄 Clearing workflow context and resetting to initial state...")
+        logger.info("🔄 Clearing workflow context and resetting to initial state...")
         
-        # Reset context
-        self.context = UserSessionContext()
+        # Reset context, keeping the session's user id
+        self.speculator.discard(self.context.uid)
+        self.background_stages.discard(self.context.uid)
+        self.context = UserSessionContext(uid=self.context.uid)
         
         # Reset workflow state
         self.current_stage = 'user_starts_chat'
         self.workflow_complete = False
+        self._sent_version = 0
+        self._send_full_context = True
+        
+        logger.info("✅ Context cleared! Ready for a new session.")
+    
+    def get_context_snapshot(self) -> Dict[str, Any]:
+        """
+        Return the full context with its version, e.g. to resync a delta-mode caller.
+        """
+        self._sent_version = self.context.version
+        return {
+            'context': self.context.snapshot(),
+            'context_version': self.context.version
+        }
+    
+    def _build_response(self, response: Any, **extra: Any) -> Dict[str, Any]:
+        """
+        Build the response payload for the current turn.
+        
+        In delta mode only the context fields changed since the previous response
+        are included, together with the context version they bring the caller to.
+        """
+        self.context.trim_logs()
+        payload = {'stage': self.current_stage, 'response': response}
+        payload.update(extra)
+        
+        if self.response_mode == 'delta' and not self._send_full_context:
+            payload['context'] = self.context.changes_since(self._sent_version)
+            payload['context_delta'] = True
+        else:
+            payload['context'] = self.context.snapshot()
+        payload['context_version'] = self.context.version
+        payload['next_actions'] = self._get_next_actions()
         
-        print("✅ Context cleared! Ready for a new session.")
+        self._sent_version = self.context.version
+        self._send_full_context = False
+        return payload
     
     def _get_next_actions(self) -> List[str]:
         """
@@ -298,28 +658,106 @@ class HealthWellnessWorkflow:
             'specialized_help': ['Return to real-time delivery', 'Get more specialized help'],
             'ongoing_support': ['Schedule next check-in', 'Update goals', 'Continue support']
         }
-        return next_actions.get(self.current_stage, ['Continue conversation'])
+        actions = next_actions.get(self.current_stage, ['Continue conversation'])
+        if self.context.pending_plans:
+            actions = ['Retry pending plans'] + actions
+        return actions
     
-    async def process_input(self, user_input: str) -> Dict[str, Any]:
+    async def process_input_stream(self, user_input: str, full_context: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process user input like process_input, yielding chunks as they are produced:
+        
+        - {'type': 'stage', 'stage': ...} on every stage transition
+        - {'type': 'text', 'source': ..., 'delta': ...} for text streamed by agents and tools
+        - {'type': 'plan_day', 'plan': 'meal_plan' | 'workout_plan', 'day': n, 'text': ...}
+          as soon as each plan day is complete
+        - {'type': 'result', 'response': ...} last, with the same payload process_input returns
+        """
+        async for chunk in stream_call(lambda: self.process_input(user_input, full_context)):
+            yield chunk
+    
+    async def process_input(self, user_input: str, full_context: bool = False) -> Dict[str, Any]:
         """
         Process user input based on current workflow stage.
+        
+        Pass full_context=True to get a complete context snapshot even in delta mode.
         """
-        if self.current_stage == 'user_starts_chat':
-            return await self.start_workflow(user_input)
-        elif self.current_stage == 'goal_collection':
-            return await self.handle_goal_collection(user_input)
-        elif self.current_stage == 'profile_setup':
-            return await self.handle_profile_setup(user_input)
-        elif self.current_stage == 'plan_generation':
-            return await self.handle_plan_generation()
-        elif self.current_stage == 'real_time_delivery':
-            return await self.handle_real_time_delivery(user_input)
-        elif self.current_stage == 'progress_tracking':
-            return await self.handle_progress_tracking(user_input)
-        elif self.current_stage == 'specialized_help':
-            return await self.handle_specialized_help(user_input, 'escalation')
-        elif self.current_stage == 'ongoing_support':
-            return await self.handle_ongoing_support(user_input)
-        else:
-            # Default to real-time delivery
-            return await self.handle_real_time_delivery(user_input)
+        if full_context:
+            self._send_full_context = True
+        
+        stage = self.current_stage
+        with measure('stage', stage):
+            return await self._run_stage(stage, user_input)
+    
+    async def _run_stage(self, stage_name: str, user_input: str) -> Dict[str, Any]:
+        """
+        Run one turn of a stage from the STAGES table under its latency budget.
+        
+        Under CANCEL the handler and everything it awaits share the stage's
+        deadline; when it runs out the handler is cancelled and the user stays
+        in the stage. Under SHIELD the handler keeps running without a deadline
+        and the next turn in the stage collects its result. Either way the turn
+        gets the stage's fallback response. A handler that raises Redirect
+        hands the turn to another stage's row.
+        """
+        stage = self.STAGES.get(stage_name) or self.STAGES['real_time_delivery']
+        task = self.background_stages.take(self.context.uid, stage_name)
+        collected = task is not None
+        if task is None:
+            args = ((user_input,) if stage.takes_input else ()) + stage.args
+            call = getattr(self, stage.handler)(*args)
+            if stage.budget is None:
+                return await call
+            if stage.on_timeout == SHIELD:
+                # Without the stage deadline, so the work can outlive the turn. A coroutine
+                # cannot move to another task once started, so it gets its own task up front;
+                # that and the shield cost a few loop iterations (tens of µs) per turn, noise
+                # next to the model calls plan generation waits for.
+                task = asyncio.ensure_future(call)
+        
+        try:
+            # Under CANCEL the handler runs in this task: no extra task or wait per turn
+            with StageTimer(stage.budget) as timer, deadline(stage.budget if task is None else None):
+                payload = await (call if task is None else asyncio.shield(task))
+        except Redirect as redirect:
+            self.current_stage = redirect.stage
+            return await self._run_stage(redirect.stage, user_input)
+        except DeadlineExceeded as error:
+            logger.warning("⏱️ %s gave up on its deadline: %s", stage_name, error)
+            self.current_stage = stage_name
+            return self._fallback(stage_name, stage, 'deadline')
+        except asyncio.CancelledError:
+            if task is not None and not task.done():
+                self.background_stages.keep(self.context.uid, stage_name, task)
+            raise
+        
+        if timer.timed_out:
+            STAGE_TIMEOUTS.inc(stage=stage_name, policy=stage.on_timeout)
+            logger.warning("⏱️ %s ran past its %.1fs budget (%s)", stage_name, stage.budget, stage.on_timeout)
+            if task is not None:
+                self.background_stages.keep(self.context.uid, stage_name, task)
+            else:
+                # The cancelled handler may have moved on already; keep the user where the turn started
+                self.current_stage = stage_name
+            return self._fallback(stage_name, stage, 'timeout')
+        
+        if collected:
+            return self._adopt(payload)
+        if self.current_stage != stage_name and self.current_stage not in stage.next:
+            logger.warning("⚠️ Unexpected transition %s -> %s", stage_name, self.current_stage)
+        return payload
+    
+    def _fallback(self, stage_name: str, stage: Stage, reason: str) -> Dict[str, Any]:
+        STAGE_FALLBACKS.inc(stage=stage_name, reason=reason)
+        return self._build_response(stage.fallback, degraded=True)
+    
+    def _adopt(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rebuild the response of a turn that finished in the background. The
+        workflow that built it may not be this one, and the caller only got
+        the fallback, so take its stage and resend the full context.
+        """
+        self.current_stage = payload['stage']
+        self._send_full_context = True
+        extra = {key: value for key, value in payload.items() if key not in self._PAYLOAD_KEYS}
+        return self._build_response(payload['response'], **extra)
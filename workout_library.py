@@ -0,0 +1,398 @@
+import re
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from tool_base import Tool
+
+# Body areas an exercise can aggravate; injuries are matched to these in free text
+BODY_AREAS = ('knee', 'back', 'shoulder', 'wrist', 'ankle', 'hip', 'neck', 'elbow')
+AREA_BITS = {area: 1 << bit for bit, area in enumerate(BODY_AREAS)}
+
+EQUIPMENT = ('bodyweight', 'bands', 'dumbbells', 'barbell', 'machine')
+EQUIPMENT_BITS = {item: 1 << bit for bit, item in enumerate(EQUIPMENT)}
+
+GOAL_KINDS = ('lose', 'gain', 'maintain')
+GOAL_BITS = {kind: 1 << bit for bit, kind in enumerate(GOAL_KINDS)}
+
+PATTERNS = ('squat', 'hinge', 'lunge', 'push', 'pull', 'core', 'cardio', 'mobility')
+# Pattern to use instead when injuries or equipment leave no exercise for one
+_FALLBACK_PATTERNS = {
+    'squat': 'hinge', 'lunge': 'hinge', 'hinge': 'core', 'push': 'core',
+    'pull': 'core', 'core': 'mobility', 'cardio': 'mobility', 'mobility': None
+}
+_CONDITIONING = ('cardio', 'mobility')
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+class Exercise(NamedTuple):
+    name: str
+    pattern: str
+    equipment: str
+    level: int
+    contraindications: Tuple[str, ...] = ()
+    goals: Tuple[str, ...] = GOAL_KINDS
+    # Prescription for timed exercises; rep-based ones use the goal's sets and reps
+    dose: Optional[str] = None
+
+
+EXERCISES = (
+    Exercise("Bodyweight Squats", 'squat', 'bodyweight', 1, ('knee',)),
+    Exercise("Goblet Squats", 'squat', 'dumbbells', 1, ('knee',)),
+    Exercise("Box Squats", 'squat', 'bodyweight', 1, ('knee',)),
+    Exercise("Wall Sit", 'squat', 'bodyweight', 1, ('knee',), dose="3 sets, hold for 30-45 seconds"),
+    Exercise("Barbell Back Squats", 'squat', 'barbell', 3, ('knee', 'back'), ('gain', 'maintain')),
+    Exercise("Leg Press", 'squat', 'machine', 2, ('knee',), ('gain', 'maintain')),
+
+    Exercise("Glute Bridges", 'hinge', 'bodyweight', 1),
+    Exercise("Single-leg Glute Bridges", 'hinge', 'bodyweight', 2, ('hip',)),
+    Exercise("Hip Thrusts", 'hinge', 'dumbbells', 2),
+    Exercise("Romanian Deadlifts", 'hinge', 'dumbbells', 2, ('back',)),
+    Exercise("Band Good Mornings", 'hinge', 'bands', 1, ('back',)),
+    Exercise("Deadlifts", 'hinge', 'barbell', 3, ('back',), ('gain', 'maintain')),
+
+    Exercise("Lunges (alternating legs)", 'lunge', 'bodyweight', 1, ('knee', 'ankle')),
+    Exercise("Reverse Lunges", 'lunge', 'dumbbells', 2, ('knee',)),
+    Exercise("Step-ups", 'lunge', 'dumbbells', 1, ('knee', 'ankle')),
+    Exercise("Lateral Lunges", 'lunge', 'bodyweight', 2, ('knee', 'hip')),
+    Exercise("Bulgarian Split Squats", 'lunge', 'dumbbells', 3, ('knee', 'hip')),
+
+    Exercise("Push-ups", 'push', 'bodyweight', 1, ('wrist', 'shoulder')),
+    Exercise("Incline Push-ups", 'push', 'bodyweight', 1, ('wrist',)),
+    Exercise("Band Chest Press", 'push', 'bands', 1),
+    Exercise("Dumbbell Bench Press", 'push', 'dumbbells', 2, ('shoulder',)),
+    Exercise("Overhead Press", 'push', 'dumbbells', 2, ('shoulder', 'neck', 'back')),
+    Exercise("Triceps Extensions", 'push', 'dumbbells', 1, ('elbow',)),
+    Exercise("Chest Press Machine", 'push', 'machine', 1, ('shoulder',)),
+    Exercise("Barbell Bench Press", 'push', 'barbell', 3, ('shoulder', 'wrist'), ('gain', 'maintain')),
+    Exercise("Dips", 'push', 'bodyweight', 3, ('shoulder', 'elbow', 'wrist'), ('gain', 'maintain')),
+
+    Exercise("Band Rows", 'pull', 'bands', 1),
+    Exercise("Face Pulls", 'pull', 'bands', 1),
+    Exercise("Dumbbell Rows", 'pull', 'dumbbells', 1, ('back',)),
+    Exercise("Bicep Curls", 'pull', 'dumbbells', 1, ('elbow', 'wrist')),
+    Exercise("Lat Pulldown", 'pull', 'machine', 1, ('shoulder',)),
+    Exercise("Seated Cable Rows", 'pull', 'machine', 1, ('back',)),
+    Exercise("Barbell Rows", 'pull', 'barbell', 3, ('back',), ('gain', 'maintain')),
+    Exercise("Superman Holds", 'pull', 'bodyweight', 1, ('back', 'neck'), dose="3 sets, hold for 20-30 seconds"),
+
+    Exercise("Plank", 'core', 'bodyweight', 1, ('wrist', 'shoulder'), dose="3 sets, hold for 30-60 seconds"),
+    Exercise("Dead Bug", 'core', 'bodyweight', 1),
+    Exercise("Bird Dog", 'core', 'bodyweight', 1),
+    Exercise("Side Plank", 'core', 'bodyweight', 2, ('shoulder',), dose="3 sets, hold for 20-40 seconds per side"),
+    Exercise("Russian Twists", 'core', 'bodyweight', 2, ('back',)),
+    Exercise("Crunches", 'core', 'bodyweight', 1, ('neck', 'back')),
+    Exercise("Pallof Press", 'core', 'bands', 1),
+
+    Exercise("Brisk Walking", 'cardio', 'bodyweight', 1, dose="30-45 minutes"),
+    Exercise("Jogging", 'cardio', 'bodyweight', 2, ('knee', 'ankle'), ('lose', 'maintain'), dose="20-30 minutes"),
+    Exercise("Jump Rope Intervals", 'cardio', 'bodyweight', 2, ('knee', 'ankle'), ('lose', 'maintain'), dose="10 rounds of 1 minute on, 1 minute off"),
+    Exercise("HIIT Circuit", 'cardio', 'bodyweight', 3, ('knee', 'ankle', 'back'), ('lose',), dose="20 minutes"),
+    Exercise("Stationary Cycling", 'cardio', 'machine', 1, dose="30-45 minutes"),
+    Exercise("Elliptical", 'cardio', 'machine', 1, dose="30 minutes"),
+    Exercise("Rowing Machine", 'cardio', 'machine', 2, ('back',), dose="20-30 minutes"),
+    Exercise("Swimming", 'cardio', 'bodyweight', 1, ('shoulder',), dose="30 minutes"),
+
+    Exercise("Yoga Flow", 'mobility', 'bodyweight', 1, ('wrist',), dose="20-30 minutes"),
+    Exercise("Dynamic Stretching", 'mobility', 'bodyweight', 1, dose="10-15 minutes"),
+    Exercise("Foam Rolling", 'mobility', 'bodyweight', 1, dose="10 minutes"),
+    Exercise("Cat-Cow Stretch", 'mobility', 'bodyweight', 1, dose="2 sets of 10 slow reps"),
+    Exercise("Easy Walk", 'mobility', 'bodyweight', 1, dose="20-30 minutes")
+)
+
+# Weekly splits per goal: (day title, movement patterns); no patterns is a rest day
+SPLITS = {
+    'lose': (
+        ("Full Body Circuit", ('squat', 'push', 'pull', 'lunge', 'core')),
+        ("Cardio", ('cardio',)),
+        ("Upper Body Strength", ('push', 'pull', 'push', 'core')),
+        ("Cardio", ('cardio',)),
+        ("Lower Body Strength", ('squat', 'hinge', 'lunge', 'core')),
+        ("Active Rest", ('mobility', 'cardio')),
+        ("Rest", ())
+    ),
+    'gain': (
+        ("Lower Body Strength", ('squat', 'hinge', 'lunge', 'core')),
+        ("Upper Body Push", ('push', 'push', 'push', 'core')),
+        ("Active Rest", ('mobility',)),
+        ("Upper Body Pull", ('pull', 'pull', 'pull', 'core')),
+        ("Full Body Strength", ('squat', 'push', 'hinge', 'pull')),
+        ("Cardio", ('cardio',)),
+        ("Rest", ())
+    ),
+    'maintain': (
+        ("Full Body Strength", ('squat', 'push', 'pull', 'core')),
+        ("Cardio", ('cardio',)),
+        ("Full Body Strength", ('hinge', 'push', 'lunge', 'pull')),
+        ("Active Rest", ('mobility',)),
+        ("Full Body Strength", ('squat', 'pull', 'push', 'core')),
+        ("Cardio", ('cardio', 'mobility')),
+        ("Rest", ())
+    )
+}
+SETS_AND_REPS = {'lose': "3 sets of 12-15 reps", 'gain': "4 sets of 6-10 reps", 'maintain': "3 sets of 10-12 reps"}
+REST_DAY = "* Rest: Complete rest or very light activity like a short walk."
+
+_AREA_PATTERNS = {
+    'knee': r'knees?|acl|mcl|meniscus|patella',
+    'back': r'(?:lower|upper|my|bad) back|back (?:pain|injury|spasms?|hurts)|spine|spinal|(?:slipped|herniated) disc|lumbar|sciatica',
+    'shoulder': r'shoulders?|rotator cuff',
+    'wrist': r'wrists?|carpal tunnel',
+    'ankle': r'ankles?|achilles',
+    'hip': r'hips?',
+    'neck': r'neck',
+    'elbow': r'elbows?'
+}
+_AREA_REGEXES = {area: re.compile(r'\b(?:' + pattern + r')\b') for area, pattern in _AREA_PATTERNS.items()}
+# Up to three words of the same clause, with no negation, between a body area and news that it has recovered
+_RECOVERED_AFTER = re.compile(
+    r"\s+(?:(?!(?:but|though|although|however|yet|while|and|not|never|still|\w+n't)\b)[\w']+\s+){0,3}?"
+    r"(?:better|fine|healed|recovered|okay|ok|good|back to normal|no longer (?:hurts|sore|painful)|"
+    r"(?:doesn't|does not|don't|do not) hurt|stopped hurting)\b"
+)
+_RECOVERED_BEFORE = re.compile(r"\b(?:recovered from|healed)\s+(?:(?:a|an|my|the)\s+)?$")
+_LEVEL_REGEXES = (
+    (3, re.compile(r'\b(?:advanced|athlete|experienced|competitive)\b')),
+    (2, re.compile(r'\b(?:intermediate|moderately active|very active)\b'))
+)
+_EQUIPMENT_REGEXES = {
+    'bands': re.compile(r'\bbands?\b'),
+    'dumbbells': re.compile(r'\b(?:dumbbells?|kettlebells?|free weights)\b'),
+    'barbell': re.compile(r'\bbarbells?\b'),
+    'machine': re.compile(r'\b(?:machines?|treadmill|bike)\b')
+}
+_GYM = re.compile(r'\bgym\b')
+# "no", "without", "don't have a", ... up to three words of the same clause before a mention
+_NEGATED_BEFORE = re.compile(
+    r"(?:\bno|\bnot|\bnever|\bwithout|n't)\s+"
+    r"(?:(?!(?:but|though|although|however|yet|except|whereas|while|only|just)\b)[\w']+\s+){0,3}?$"
+)
+# "  * Exercise name: 3 sets of ..." lines of a plan day
+_EXERCISE_LINE = re.compile(r'^\s+\* ([^:\n]+):', re.MULTILINE)
+
+
+class WorkoutSettings(NamedTuple):
+    goal: str
+    level: int
+    equipment: int
+    injuries: int
+    seed: int
+
+
+def goal_kind(goal: Optional[Dict[str, Any]]) -> str:
+    goal_type = str((goal or {}).get('goal_type') or '').lower()
+    if 'lose' in goal_type or 'loss' in goal_type:
+        return 'lose'
+    if 'gain' in goal_type or 'muscle' in goal_type or 'build' in goal_type:
+        return 'gain'
+    return 'maintain'
+
+
+def _area_states(text: Optional[str]) -> Dict[str, bool]:
+    """
+    Whether each body area named in the text is injured (True) or has recovered
+    (False). Mentions are read in order, so a later "my knee feels better" lifts
+    an earlier knee injury in the same notes.
+    """
+    lowered = (text or '').lower()
+    mentions = sorted(
+        (match.start(), area,
+         not (_RECOVERED_AFTER.match(lowered, match.end()) or _RECOVERED_BEFORE.search(lowered, 0, match.start())))
+        for area, regex in _AREA_REGEXES.items() for match in regex.finditer(lowered)
+    )
+    return {area: injured for _, area, injured in mentions}
+
+
+def parse_injuries(text: Optional[str]) -> Tuple[int, List[str]]:
+    """
+    Body areas injured according to injury notes, as (contraindication bits, area names).
+    """
+    states = _area_states(text)
+    areas = [area for area in BODY_AREAS if states.get(area)]
+    return sum(AREA_BITS[area] for area in areas), areas
+
+
+def parse_recoveries(text: Optional[str]) -> List[str]:
+    """
+    Body areas the text says have recovered.
+    """
+    states = _area_states(text)
+    return [area for area in BODY_AREAS if states.get(area) is False]
+
+
+def _mentioned(regex, text: str) -> bool:
+    return any(not _NEGATED_BEFORE.search(text, 0, match.start()) for match in regex.finditer(text))
+
+
+def parse_fitness(text: Optional[str]) -> Tuple[int, int]:
+    """
+    Fitness level (1-3, beginner by default) and available equipment bits from a profile.
+    Bodyweight is always available; "gym" means every kind of equipment. Negated
+    mentions such as "I don't have a gym" or "no machines" unlock nothing.
+    """
+    lowered = (text or '').lower()
+    level = next((level for level, regex in _LEVEL_REGEXES if _mentioned(regex, lowered)), 1)
+    if _mentioned(_GYM, lowered):
+        return level, sum(EQUIPMENT_BITS.values())
+    equipment = [item for item, regex in _EQUIPMENT_REGEXES.items() if _mentioned(regex, lowered)]
+    return level, EQUIPMENT_BITS['bodyweight'] + sum(EQUIPMENT_BITS[item] for item in equipment)
+
+
+def settings_for(context) -> WorkoutSettings:
+    """
+    Plan settings for a session: goal, level and equipment from the profile, injuries
+    from context.injury_notes. The seed depends on the goal, level and equipment only:
+    users with the same inputs get the same plan, and days that no injury affects
+    come out the same when the plan is rebuilt.
+    """
+    level, equipment = parse_fitness(context.user_profile)
+    injuries, _ = parse_injuries(context.injury_notes)
+    seed = zlib.crc32(f"{sorted((context.goal or {}).items())}|{level}|{equipment}".encode('utf-8'))
+    return WorkoutSettings(goal_kind(context.goal), level, equipment, injuries, seed)
+
+
+class WorkoutLibrary:
+    """
+    Local exercise library indexed by goal, fitness level, equipment and
+    movement pattern, with contraindications stored as body-area bitmasks.
+
+    The exercises allowed for a set of settings are found with one vectorized
+    mask over the whole library and cached per (goal, level, equipment,
+    injuries). Weekly plans follow the goal's split; each day is built from
+    its own seeded generator, so any single day can be rebuilt on its own,
+    which is how rebuild() replaces only the days an injury affects.
+    """
+
+    def __init__(self, exercises: Tuple[Exercise, ...] = EXERCISES):
+        self.exercises = list(exercises)
+        self.by_name = {exercise.name.lower(): index for index, exercise in enumerate(self.exercises)}
+        self.contraindication_bits = np.array(
+            [sum(AREA_BITS[area] for area in e.contraindications) for e in self.exercises], dtype=np.int64
+        )
+        self.equipment_bits = np.array([EQUIPMENT_BITS[e.equipment] for e in self.exercises], dtype=np.int64)
+        self.goal_bits = np.array([sum(GOAL_BITS[goal] for goal in e.goals) for e in self.exercises], dtype=np.int64)
+        self.levels = np.array([e.level for e in self.exercises], dtype=np.int64)
+        self.patterns = np.array([PATTERNS.index(e.pattern) for e in self.exercises], dtype=np.int64)
+        self._allowed: Dict[Tuple[str, int, int, int], Dict[str, List[int]]] = {}
+
+    def allowed(self, settings: WorkoutSettings) -> Dict[str, List[int]]:
+        """
+        Indices of the exercises allowed by the settings, per movement pattern.
+        """
+        key = (settings.goal, settings.level, settings.equipment, settings.injuries)
+        allowed = self._allowed.get(key)
+        if allowed is None:
+            mask = (
+                ((self.contraindication_bits & settings.injuries) == 0)
+                & ((self.equipment_bits & settings.equipment) != 0)
+                & ((self.goal_bits & GOAL_BITS[settings.goal]) != 0)
+                & (self.levels <= settings.level)
+            )
+            indices = np.flatnonzero(mask)
+            patterns = self.patterns[indices].tolist()
+            allowed = {pattern: [] for pattern in PATTERNS}
+            for index, pattern in zip(indices.tolist(), patterns):
+                allowed[PATTERNS[pattern]].append(index)
+            self._allowed[key] = allowed
+        return allowed
+
+    def build_day(self, settings: WorkoutSettings, day: int) -> str:
+        """
+        One day of the weekly split (0 is Monday) as plan text.
+        """
+        title, patterns = SPLITS[settings.goal][day]
+        allowed = self.allowed(settings)
+        rng = np.random.default_rng([settings.seed, day])
+        chosen: List[int] = []
+        for pattern in patterns:
+            while pattern is not None:
+                options = [index for index in allowed[pattern] if index not in chosen]
+                if options:
+                    chosen.append(options[int(rng.integers(len(options)))])
+                    break
+                pattern = _FALLBACK_PATTERNS[pattern]
+
+        header = f"**{WEEKDAYS[day]}:**"
+        if not chosen:
+            return f"{header}\n{REST_DAY}"
+        lines = [f"    * {self.exercises[index].name}: {self.exercises[index].dose or SETS_AND_REPS[settings.goal]}"
+                 for index in chosen]
+        strength = any(self.exercises[index].pattern not in _CONDITIONING for index in chosen)
+        if not strength:
+            return '\n'.join([header, f"* {title}:", *lines])
+        return '\n'.join([
+            header, "* Warm-up (5 min cardio, dynamic stretching)", f"* {title}:", *lines,
+            "* Cool-down (5 min static stretching)"
+        ])
+
+    def weekly_plan(self, settings: WorkoutSettings) -> List[str]:
+        return [self.build_day(settings, day) for day in range(len(WEEKDAYS))]
+
+    def conflicts(self, day_text: str, injuries: int) -> bool:
+        """
+        Whether a plan day includes a library exercise contraindicated for the injuries.
+        Exercises the library does not know (e.g. from a model-written plan) are ignored.
+        """
+        for name in _EXERCISE_LINE.findall(day_text):
+            index = self.by_name.get(name.strip().lower())
+            if index is not None and self.contraindication_bits[index] & injuries:
+                return True
+        return False
+
+    def rebuild(self, plan: List[str], settings: WorkoutSettings) -> Tuple[List[str], List[int]]:
+        """
+        Rebuild only the days of a plan that conflict with settings.injuries.
+        Returns the new plan and the indices of the rebuilt days.
+        """
+        rebuilt = [day for day, text in enumerate(plan[:len(WEEKDAYS)]) if self.conflicts(text, settings.injuries)]
+        if not rebuilt:
+            return plan, []
+        updated = list(plan)
+        for day in rebuilt:
+            updated[day] = self.build_day(settings, day)
+        return updated, rebuilt
+
+
+_default_library: Optional[WorkoutLibrary] = None
+
+
+def get_library() -> WorkoutLibrary:
+    global _default_library
+    if _default_library is None:
+        _default_library = WorkoutLibrary()
+    return _default_library
+
+
+def adapt_plan(plan: List[str], context) -> Tuple[List[str], List[int]]:
+    """
+    Rebuild the days of a workout plan that conflict with context.injury_notes, with no model call.
+    """
+    return get_library().rebuild(plan, settings_for(context))
+
+
+class LibraryWorkoutRecommenderTool(Tool):
+    """
+    Workout recommender that builds weekly splits from the local exercise
+    library instead of writing them with the model. The goal comes from
+    context.goal, level and equipment from the profile, and exercises that
+    conflict with context.injury_notes are left out.
+    """
+
+    def __init__(self, library: Optional[WorkoutLibrary] = None):
+        super().__init__("WorkoutRecommender", "Create weekly workout plans from the local exercise library")
+        self.library = library if library is not None else get_library()
+
+    def plan_key(self, context) -> WorkoutSettings:
+        """
+        Everything the plan depends on; profile changes that leave it equal do not change the plan.
+        """
+        return settings_for(context)
+
+    def adapt_plan(self, plan: List[str], context) -> Tuple[List[str], List[int]]:
+        """
+        Rebuild the plan days that conflict with context.injury_notes; see adapt_plan().
+        """
+        return self.library.rebuild(plan, settings_for(context))
+
+    async def run(self, input, context):
+        return self.library.weekly_plan(settings_for(context))